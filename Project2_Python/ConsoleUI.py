@@ -1,7 +1,25 @@
+import gc
 import sys
 import os
-from datetime import datetime
+import threading
+from collections import namedtuple
+from datetime import date, datetime, timedelta
 from classes import Customer, Store, Rental
+from quotes import QuoteCache
+from rental_table import ActiveRentalTable, to_micros
+from due_queue import DueQueue
+from reservations import ReservationBook
+from analytics import RentalAnalytics
+from sinks import ConsoleSink, NullSink
+from tariffs import load_tariff, set_tariff
+from discounts import active_registry
+
+
+InventoryView = namedtuple(
+    "InventoryView",
+    ["version", "business_day", "skis", "snowboards", "ski_fleet", "snowboard_fleet",
+     "open_rentals", "daily_skis", "daily_snowboards", "revenue", "total_revenue"],
+)
 
 
 class RentalUILogic:
@@ -10,22 +28,65 @@ class RentalUILogic:
     rental creation, return processing, and revenue tracking.
     """
 
-    def __init__(self):
+    PERIOD_UNITS = {1: timedelta(hours=1), 2: timedelta(days=1), 3: timedelta(weeks=1)}
+    MAX_RENTAL_PERIOD = timedelta(days=366)
+    TIMED_OPERATIONS = ("new_rental", "return_rental", "estimate", "is_inventory_sufficient",
+                        "is_reservation_available")
+
+    def __init__(self, quote_cache_size: int = 256, journal=None, storage=None,
+                 partitions=None, output=None, invoices=None):
         """
         Initializes the RentalUILogic.
 
+        Args:
+            quote_cache_size (int): Maximum number of estimates kept in the quote cache.
+            journal (RentalJournal, optional): Journal that records every state change.
+            storage (SQLiteRentalStore, optional): Database that records rentals and returns.
+            partitions (PartitionStore, optional): Where sealed days are kept. Defaults
+                to an in-memory store, created when a day is first sealed.
+            output (sink, optional): Receives messages from the Store, Customer and
+                Rental classes (see sinks.py). Defaults to printing them.
+            invoices (InvoiceArchive, optional): Keeps every summary and invoice
+                for reprinting, even for quiet calls.
+
         Attributes:
             shop (Store): The Store instance representing inventory of skis and snowboards.
-            customer_rentals (dict): Active rentals keyed by customer ID.
+            customer_rentals (ActiveRentalTable): Active rentals keyed by customer ID.
             daily_ski_rentals (int): Count of skis rented today.
             daily_snowboard_rentals (int): Count of snowboards rented today.
-            revenu (float): Total revenue collected from completed rentals.
+            revenu (float): Revenue collected from rentals returned today.
+            quotes (QuoteCache): Cache of rendered estimates.
+            due_queue (DueQueue): Open rentals ordered by expected return time.
+            reservations (ReservationBook): Future bookings, created with the shop.
+            analytics (RentalAnalytics): Today's hourly, per-type and per-code aggregates.
+            business_day (str): ISO date of the day being traded.
+            partitions (PartitionStore | None): Sealed previous days, once there are any.
+            metrics (Metrics | None): Operation latencies, while timing is on.
+            output (sink): Where discount and stock messages go.
+            invoices (InvoiceArchive | None): Archive of printed documents, if enabled.
+            view (InventoryView | None): Latest published inventory and totals.
+                Each change publishes a new one; a published view never changes.
+            journal (RentalJournal | None): Write-ahead journal, if persistence is enabled.
+            storage (SQLiteRentalStore | None): Queryable rental history, if enabled.
         """
         self.shop: Store
-        self.customer_rentals = {}
+        self.customer_rentals = ActiveRentalTable()
         self.daily_ski_rentals = 0
         self.daily_snowboard_rentals = 0
         self.revenu: float = 0.0
+        self.quotes = QuoteCache(quote_cache_size)
+        self.due_queue = DueQueue()
+        self.analytics = RentalAnalytics()
+        self.business_day = date.today().isoformat()
+        self.partitions = partitions
+        self.journal = journal
+        self.storage = storage
+        self.metrics = None
+        self.output = output if output is not None else ConsoleSink()
+        self.invoices = invoices
+        self.view = None
+        self._version = 0
+        self._lock = threading.Lock()
 
     def get_rental_type_str_from_int(self, rental_type: int) -> str:
         """
@@ -68,15 +129,38 @@ class RentalUILogic:
 
     def get_current_skis(self) -> int:
         """
-        Returns the number of skis currently available.
+        Returns the number of skis available as of the latest view.
         """
-        return self.shop.CurrentSki
+        return self.view.skis
 
     def get_current_snowboards(self) -> int:
         """
-        Returns the number of snowboards currently available.
+        Returns the number of snowboards available as of the latest view.
+        """
+        return self.view.snowboards
+
+    def snapshot(self) -> InventoryView:
+        """
+        Returns the latest published inventory and totals without taking any lock.
+
+        Readers hold on to a view for as long as they like; writers publish
+        a new one instead of changing it, so a report never sees half of a
+        rental and never holds up the counter.
         """
-        return self.shop.CurrentSnow
+        return self.view
+
+    def _publish(self) -> None:
+        """
+        Publishes a new view of the inventory and totals. Called by writers
+        with the lock held (or before other threads can see this instance).
+        """
+        self._version += 1
+        shop = self.shop
+        self.view = InventoryView(self._version, self.business_day, shop.CurrentSki,
+                                  shop.CurrentSnow, shop.SkiInventory, shop.SnowboardInventory,
+                                  len(self.customer_rentals), self.daily_ski_rentals,
+                                  self.daily_snowboard_rentals, self.revenu,
+                                  shop.dblTotalTransaction)
 
     def set_shop(self, skis: int, snowboards: int):
         """
@@ -86,8 +170,331 @@ class RentalUILogic:
             skis (int): Total number of skis in stock.
             snowboards (int): Total number of snowboards in stock.
         """
-        self.shop = Store(skis, snowboards)
-        self.shop.Display_Inv()
+        self.shop = self._new_store(skis, snowboards)
+        self.reservations = ReservationBook(skis, snowboards)
+        self._record(["shop", skis, snowboards])
+        self._publish()
+
+    def _new_store(self, skis: int, snowboards: int) -> Store:
+        """
+        Creates a full store that sends its messages to this logic's output.
+        """
+        shop = Store(skis, snowboards)
+        shop.Display_Inv()
+        shop.output = self.output
+        return shop
+
+    def _record(self, event: list) -> None:
+        """
+        Appends an event to the journal and takes a snapshot when one is due.
+        """
+        if self.journal is None:
+            return
+        self.journal.append(event)
+        if self.journal.needs_snapshot():
+            self.journal.write_snapshot(self._snapshot_state())
+
+    def _snapshot_state(self, include_rentals: bool = True) -> dict:
+        """
+        Captures inventory, open rentals and daily counters for a journal snapshot.
+
+        Args:
+            include_rentals (bool): Add the open rentals as plain columns. The
+                state file stores them in binary form instead.
+        """
+        state = {
+            "shop": [self.shop.SkiInventory, self.shop.SnowboardInventory,
+                     self.shop.CurrentSki, self.shop.CurrentSnow,
+                     self.shop.dblTotalTransaction],
+            "daily": [self.daily_ski_rentals, self.daily_snowboard_rentals],
+            "revenu": self.revenu,
+            "analytics": self.analytics.to_state(),
+            "day": self.business_day,
+            "reservations": [self.reservations.next_id,
+                             [[reservation_id, *booking] for reservation_id, booking
+                              in self.reservations.bookings.items()]],
+            "discount_uses": dict(active_registry().uses),
+            "units": [self.shop.skiUnits.to_state(), self.shop.snowUnits.to_state()],
+        }
+        if include_rentals:
+            state["rentals"] = self.customer_rentals.to_columns()
+        return state
+
+    def restore(self) -> bool:
+        """
+        Restores state from the journal's last snapshot plus the events after it.
+
+        If the state file written by close() still matches the journal, it is
+        loaded instead and nothing is replayed.
+
+        Returns:
+            bool: True if a shop was restored, False if the journal was empty.
+        """
+        if self.journal is None:
+            return False
+        from state_file import STATE_FILE, read_state
+        state = read_state(os.path.join(self.journal.directory, STATE_FILE),
+                           self.journal.state_stamp())
+        if state is not None:
+            self._apply_snapshot(state)
+            self.journal.seq = self.journal.durable_seq = state["seq"]
+            rentals = self.customer_rentals
+            self.reservations.hold_rentals(rentals.starts, rentals.dues,
+                                           rentals.skis, rentals.snowboards)
+            # Built on first use from copies, so the menu comes up without waiting for it.
+            self.due_queue = DueQueue.from_columns(list(rentals.ids), rentals.dues[:], lazy=True)
+            self._publish()
+            return True
+        # Replay allocates millions of small objects that never become garbage;
+        # letting the cyclic collector rescan them roughly doubles recovery time.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            restored = self._replay()
+        finally:
+            if gc_enabled:
+                gc.enable()
+        if restored:
+            rentals = self.customer_rentals
+            self.reservations.hold_rentals(rentals.starts, rentals.dues,
+                                           rentals.skis, rentals.snowboards)
+            self._publish()
+        return restored
+
+    def _replay(self) -> bool:
+        """
+        Applies the journal snapshot and tail to this instance.
+        """
+        snapshot, events = self.journal.load()
+        if snapshot is None and not events:
+            return False
+
+        if snapshot is not None:
+            self._apply_snapshot(snapshot)
+        else:
+            # The whole journal is replayed, so every use is counted again below.
+            active_registry().uses = {}
+
+        # Accumulate in locals and fold into the shop once at the end.
+        rentals = self.customer_rentals
+        add_row = rentals.add_row
+        discard = rentals.discard
+        record_rental = self.analytics.record_rental
+        record_return = self.analytics.record_return
+        record_use = active_registry().record_use
+        ski_units = snow_units = None
+        if snapshot is not None:
+            ski_units, snow_units = self.shop.skiUnits, self.shop.snowUnits
+        rented_skis = rented_snowboards = 0
+        revenue = self.revenu
+        shop_total = self.shop.dblTotalTransaction if snapshot is not None else 0.0
+        for event in events:
+            op = event[1]
+            if op == "rent":
+                customer_id, name, start, rental_type, skis, snowboards, code = event[2:9]
+                due = event[9] if len(event) > 9 else start
+                if len(event) > 10:
+                    units = event[10]
+                    ski_units.take(units[:skis])
+                    snow_units.take(units[skis:])
+                else:
+                    # Written before units were tracked: hand out the next ones.
+                    units = ski_units.allocate(skis) + snow_units.allocate(snowboards)
+                add_row(customer_id, name, start, rental_type, skis, snowboards, code, due, units)
+                record_rental(start, rental_type, skis, snowboards, code)
+                if code:
+                    record_use(code)
+                if len(event) > 11:
+                    self.reservations.cancel(event[11])     # the booking was picked up
+                rented_skis += skis
+                rented_snowboards += snowboards
+            elif op == "return":
+                _, _, customer_id, returned, total = event
+                start, rental_type, skis, snowboards, code, units = discard(customer_id)
+                record_return(returned, start, rental_type, code, total)
+                ski_units.release(units[:skis])
+                snow_units.release(units[skis:])
+                revenue += total
+                shop_total += total
+            elif op == "rollover":
+                _, _, day, next_day = event
+                if not self._partition_store().has_day(day):
+                    # The day was sealed but its partition never reached disk.
+                    from partitions import Partition
+                    self.partitions.seal(Partition(
+                        day, day, self.daily_ski_rentals + rented_skis,
+                        self.daily_snowboard_rentals + rented_snowboards, revenue,
+                        self.analytics.to_state()))
+                self.daily_ski_rentals = self.daily_snowboard_rentals = 0
+                rented_skis = rented_snowboards = 0
+                revenue = 0.0
+                self.analytics = RentalAnalytics()
+                record_rental = self.analytics.record_rental
+                record_return = self.analytics.record_return
+                self.business_day = next_day
+            elif op == "reserve":
+                self.reservations.restore_booking(*event[2:8])
+            elif op == "cancel":
+                self.reservations.cancel(event[2])
+            elif op in ("retire", "reinstate", "service"):
+                self._apply_unit_event(op, event[2], event[3])
+            elif op == "shop":
+                self.shop = self._new_store(event[2], event[3])
+                self.reservations = ReservationBook(event[2], event[3])
+                rentals = self.customer_rentals = ActiveRentalTable()
+                add_row = rentals.add_row
+                discard = rentals.discard
+                ski_units, snow_units = self.shop.skiUnits, self.shop.snowUnits
+                shop_total = 0.0
+        self.shop.CurrentSki = self.shop.skiUnits.available
+        self.shop.CurrentSnow = self.shop.snowUnits.available
+        self.shop.dblTotalTransaction = shop_total
+        self.daily_ski_rentals += rented_skis
+        self.daily_snowboard_rentals += rented_snowboards
+        self.revenu = revenue
+
+        self.due_queue = DueQueue.from_columns(rentals.ids, rentals.dues)
+        return True
+
+    def _apply_snapshot(self, snapshot: dict) -> None:
+        """
+        Replaces this instance's state with a journal snapshot or state file.
+        """
+        ski_total, snow_total, current_ski, current_snow, total = snapshot["shop"]
+        self.shop = self._new_store(ski_total, snow_total)
+        self.shop.CurrentSki = current_ski
+        self.shop.CurrentSnow = current_snow
+        self.shop.dblTotalTransaction = total
+        self.daily_ski_rentals, self.daily_snowboard_rentals = snapshot["daily"]
+        self.revenu = snapshot["revenu"]
+        if "analytics" in snapshot:
+            self.analytics = RentalAnalytics.from_state(snapshot["analytics"])
+        self.business_day = snapshot.get("day", self.business_day)
+        rentals = snapshot["rentals"]
+        if not isinstance(rentals, ActiveRentalTable):
+            rentals = ActiveRentalTable.from_columns(rentals)
+        self.customer_rentals = rentals
+        if "units" in snapshot:
+            from units import UnitPool
+            ski_units, snow_units = snapshot["units"]
+            self.shop.skiUnits = UnitPool.from_state(ski_units)
+            self.shop.snowUnits = UnitPool.from_state(snow_units)
+        else:
+            # Saved before units were tracked: give each open rental the next free ones.
+            for row, (skis, snowboards) in enumerate(zip(rentals.skis, rentals.snowboards)):
+                rentals.units[row] = tuple(self.shop.skiUnits.allocate(skis)
+                                           + self.shop.snowUnits.allocate(snowboards))
+        self.reservations = ReservationBook(ski_total, snow_total)
+        next_id, bookings = snapshot.get("reservations", [1, []])
+        for booking in bookings:
+            self.reservations.restore_booking(*booking)
+        self.reservations.next_id = max(self.reservations.next_id, next_id)
+        active_registry().uses = dict(snapshot.get("discount_uses", {}))
+
+    def sync(self) -> None:
+        """
+        Forces any buffered journal events and database writes to disk.
+        """
+        with self._lock:
+            if self.journal is not None:
+                self.journal.commit()
+            if self.storage is not None:
+                self.storage.flush()
+        if self.invoices is not None:
+            self.invoices.flush()
+
+    def close(self) -> None:
+        """
+        Flushes and closes the journal and database, if any.
+
+        With a journal and a shop, the whole state is also written to a
+        binary state file so the next restore() can skip the replay.
+        """
+        with self._lock:
+            if self.journal is not None:
+                self.journal.commit()
+                if hasattr(self, "shop"):
+                    from state_file import STATE_FILE, write_state
+                    state = self._snapshot_state(include_rentals=False)
+                    state["seq"] = self.journal.seq
+                    write_state(os.path.join(self.journal.directory, STATE_FILE), state,
+                                self.customer_rentals, self.journal.state_stamp())
+                self.journal.close()
+            if self.storage is not None:
+                self.storage.close()
+        if self.invoices is not None:
+            self.invoices.close()
+        if self.partitions is not None:
+            self.partitions.wait()
+
+    def _partition_store(self) -> "PartitionStore":
+        """
+        Returns the partition store, creating an in-memory one on first use.
+        """
+        if self.partitions is None:
+            from partitions import PartitionStore
+            self.partitions = PartitionStore()
+        return self.partitions
+
+    def roll_over_day(self, next_day: date = None) -> "Partition":
+        """
+        Seals today's counters into a partition and starts the next business day.
+
+        Open rentals, reservations and inventory carry over unchanged; only
+        the daily counters, revenue and analytics start again from zero.
+
+        Args:
+            next_day (date, optional): The new business day. Defaults to the
+                calendar date, or the day after the current business day if
+                that is later.
+
+        Returns:
+            Partition: The sealed day.
+        """
+        from partitions import Partition
+        with self._lock:
+            day = self.business_day
+            if next_day is None:
+                next_day = max(date.today(), date.fromisoformat(day) + timedelta(days=1))
+            partition = Partition(day, day, self.daily_ski_rentals,
+                                  self.daily_snowboard_rentals, self.revenu,
+                                  self.analytics.to_state())
+            self._partition_store().seal(partition)
+            self.daily_ski_rentals = 0
+            self.daily_snowboard_rentals = 0
+            self.revenu = 0.0
+            self.analytics = RentalAnalytics()
+            self.business_day = next_day.isoformat()
+            self._record(["rollover", day, self.business_day])
+            self._publish()
+        return partition
+
+    def enable_metrics(self) -> "Metrics":
+        """
+        Starts timing the operations in TIMED_OPERATIONS.
+
+        Returns:
+            Metrics: The histograms being filled.
+        """
+        if self.metrics is None:
+            from metrics import Metrics                     # Only needed once timing is on.
+            self.metrics = Metrics()
+            self.metrics.instrument(self, self.TIMED_OPERATIONS)
+        return self.metrics
+
+    def disable_metrics(self) -> None:
+        """
+        Stops timing; the operations run unwrapped again.
+        """
+        if self.metrics is not None:
+            self.metrics.uninstrument(self)
+            self.metrics = None
+
+    def history(self) -> tuple:
+        """
+        Returns the sealed partitions, oldest first.
+        """
+        return self.partitions.partitions if self.partitions is not None else ()
 
     def estimate(self, skis: int, snowboards: int, rental_type: int,
                  rental_period: int, discount_code: str) -> str:
@@ -104,6 +511,11 @@ class RentalUILogic:
         Returns:
             str: Formatted estimate details.
         """
+        key = (skis, snowboards, rental_type, rental_period, discount_code)
+        quote = self.quotes.get(key)
+        if quote is not None:
+            return quote
+
         rental = Rental("Estimate", self.shop, skis, snowboards)
         rental.estimateRental(rental_type, rental_period)
 
@@ -116,7 +528,40 @@ class RentalUILogic:
             f"Discount Code: {discount_code}",
             f"Estimated Cost: ${rental.rentalEstimate:.2f}"
         ]
-        return "\n".join(lines)
+        quote = "\n".join(lines)
+        self.quotes.put(key, quote)
+        return quote
+
+    def tariffs_changed(self) -> None:
+        """
+        Invalidates cached estimates after a change to rental prices.
+        """
+        self.quotes.clear()
+
+    def load_tariffs(self, path: str) -> None:
+        """
+        Switches to the tariff table in a JSON file and drops cached estimates.
+
+        Raises:
+            ValueError, KeyError: If the table is malformed; prices are left unchanged.
+        """
+        set_tariff(load_tariff(path))
+        self.tariffs_changed()
+
+    def load_discounts(self, path: str) -> None:
+        """
+        Switches to the discount rules in a file, keeping the use counts of
+        rules that are still defined.
+
+        Raises:
+            ValueError: If a rule is malformed; the current rules are left unchanged.
+        """
+        from discounts import load_registry, set_registry
+        registry = load_registry(path)
+        with self._lock:
+            registry.uses = {name: count for name, count in active_registry().uses.items()
+                             if name in registry.rules}
+            set_registry(registry)
 
     def is_inventory_sufficient(self, skis: int, snowboards: int) -> bool:
         """
@@ -131,6 +576,79 @@ class RentalUILogic:
         """
         return self.shop.CurrentSki >= skis and self.shop.CurrentSnow >= snowboards
 
+    def is_reservation_available(self, skis: int, snowboards: int,
+                                 start: datetime, end: datetime) -> bool:
+        """
+        Checks if equipment can still be booked for a future window.
+
+        Bookings are counted against the shop's total fleet, not today's
+        shelf stock, so reserving next Saturday does not block walk-ins now.
+        Open rentals count against the fleet until they are due.
+
+        Args:
+            skis (int): Skis requested.
+            snowboards (int): Snowboards requested.
+            start (datetime): Start of the window.
+            end (datetime): End of the window.
+
+        Returns:
+            bool: True if every slot in the window has room, False otherwise or if
+            the window is empty.
+        """
+        return self.reservations.is_available(skis, snowboards, start, end)
+
+    def reserve_equipment(self, customer_id: str, skis: int, snowboards: int,
+                          start: datetime, end: datetime, now: datetime = None) -> str:
+        """
+        Books equipment for a future window.
+
+        Args:
+            customer_id (str): Customer making the booking.
+            skis (int): Skis requested.
+            snowboards (int): Snowboards requested.
+            start (datetime): Start of the window.
+            end (datetime): End of the window.
+            now (datetime, optional): Current time, defaults to the clock; the
+                window may not start before it.
+
+        Returns:
+            str: Confirmation with the reservation ID, or failure message.
+        """
+        if skis < 0 or snowboards < 0 or skis + snowboards == 0:
+            return "Reservation failed"
+        with self._lock:
+            try:
+                reservation_id = self.reservations.reserve(customer_id, skis, snowboards,
+                                                           start, end, now or datetime.now())
+            except ValueError as e:
+                return str(e)
+            if not reservation_id:
+                return "Equipment is already booked for that time. Reservation failed"
+            _, _, _, first, last = self.reservations.bookings[reservation_id]
+            self._record(["reserve", reservation_id, customer_id, skis, snowboards, first, last])
+        start, end = self.reservations.window(reservation_id)
+        return f"Reservation {reservation_id} confirmed from {start} to {end}"
+
+    def cancel_reservation(self, reservation_id: int) -> str:
+        """
+        Cancels a booking and frees its equipment.
+
+        Returns:
+            str: Confirmation or error message.
+        """
+        with self._lock:
+            if not self.reservations.cancel(reservation_id):
+                return "Such reservation does not exist"
+            self._record(["cancel", reservation_id])
+        return f"Reservation {reservation_id} cancelled"
+
+    def _rebook(self, reservation_id: int, booking: tuple) -> None:
+        """
+        Puts back a booking taken for a pickup whose rental failed.
+        """
+        if booking is not None:
+            self.reservations.restore_booking(reservation_id, *booking)
+
     def is_customer_id_valid(self, customer_id: str) -> bool:
         """
         Validates that the customer ID is not already used.
@@ -151,7 +669,10 @@ class RentalUILogic:
         snowboards_amount: int,
         rental_type: int,
         rent_time: datetime,
-        discount_code: str = ""
+        discount_code: str = "",
+        quiet: bool = False,
+        rental_period: int = 1,
+        reservation_id: int = None
     ) -> str:
         """
         Processes a new rental if validation passes.
@@ -164,94 +685,344 @@ class RentalUILogic:
             rental_type (int): Rental type.
             rent_time (datetime): Start time of rental.
             discount_code (str, optional): Discount code.
+            quiet (bool, optional): Skip building the summary for bulk imports.
+            rental_period (int, optional): Requested hours, days or weeks; sets the due time.
+            reservation_id (int, optional): The customer's booking being picked up; it is
+                released in the same step the rental is taken out.
 
         Returns:
-            str: Rental summary or failure message.
+            str: Rental summary (empty when quiet) or failure message.
         """
         try:
+            if not self.is_rental_period_valid(rental_type, rental_period):
+                return "Invalid rental period. Rental failed"
+            start = to_micros(rent_time)
+            due = to_micros(self.expected_return(rent_time, rental_type, rental_period))
             customer = Customer(customer_name, customer_id)
             if (self.is_inventory_sufficient(skis_amount, snowboards_amount)
                     and self.is_customer_id_valid(customer_id)):
                 result = customer.RequestEquipment(skis_amount, snowboards_amount, self.shop)
                 if result != -1:
                     rental = Rental(customer, self.shop, skis_amount, snowboards_amount)
-                    if skis_amount > 0:
-                        rental.rentSkis(rental_type)
+                    with self._lock:
+                        # Stock is taken in the same locked section that adds the row and
+                        # publishes the view, so the view never shows skis out that no
+                        # open rental accounts for. Another counter may have taken the
+                        # stock since is_inventory_sufficient ran.
+                        if not self.is_customer_id_valid(customer_id):
+                            return "Inventory is not sufficient. Rental failed"
+                        booking = None
+                        if reservation_id is not None:
+                            booking = self.reservations.bookings.get(reservation_id)
+                            if booking is None or booking[0] != customer_id:
+                                return "Such reservation does not exist"
+                            opens, closes = self.reservations.window(reservation_id)
+                            if not opens <= rent_time < closes:
+                                return "Reservation is not for this time. Rental failed"
+                            # The booked equipment becomes this rental's, so the booking
+                            # must not also count against it.
+                            self.reservations.cancel(reservation_id)
+                        if not self.reservations.hold(skis_amount, snowboards_amount, start, due):
+                            self._rebook(reservation_id, booking)
+                            return "Equipment is booked for that time. Rental failed"
+                        if skis_amount > 0 and rental.rentSkis(rental_type) is None:
+                            self.reservations.release(skis_amount, snowboards_amount, start, due)
+                            self._rebook(reservation_id, booking)
+                            return "Inventory is not sufficient. Rental failed"
+                        if snowboards_amount > 0 and rental.rentSnowboards(rental_type) is None:
+                            self.shop.releaseSkis(rental.rentedSkiUnits)
+                            self.reservations.release(skis_amount, snowboards_amount, start, due)
+                            self._rebook(reservation_id, booking)
+                            return "Inventory is not sufficient. Rental failed"
+                        rule = None
+                        try:
+                            if discount_code:
+                                # Caps and expiry are enforced here, once per rental; a code
+                                # that is refused is dropped and the rental goes ahead.
+                                rule, reason = active_registry().redeem(discount_code, rent_time)
+                                if rule is None:
+                                    self.output.emit("invalid_request",
+                                                     f"Discount code {discount_code} {reason}.")
+                                    discount_code = ""
+                            units = rental.rentedSkiUnits + rental.rentedSnowUnits
+                            self.customer_rentals.add_row(customer_id, customer_name, start,
+                                                          rental_type, skis_amount,
+                                                          snowboards_amount, discount_code,
+                                                          due, units)
+                            self.due_queue.push(customer_id, due)
+                            event = ["rent", customer_id, customer_name, start, rental_type,
+                                     skis_amount, snowboards_amount, discount_code, due, units]
+                            if booking is not None:
+                                # One event, so a replay never sees the pickup half done.
+                                event.append(reservation_id)
+                            self._record(event)
+                        except Exception:
+                            # Nothing of a rental that failed part-way may stay behind.
+                            if customer_id in self.customer_rentals:
+                                self.customer_rentals.discard(customer_id)
+                            self.due_queue.discard(customer_id)
+                            if rule is not None:
+                                active_registry().release(rule)
+                            rental.returnInv()
+                            self.reservations.release(skis_amount, snowboards_amount, start, due)
+                            self._rebook(reservation_id, booking)
+                            raise
                         self.daily_ski_rentals += skis_amount
-                    if snowboards_amount > 0:
-                        rental.rentSnowboards(rental_type)
                         self.daily_snowboard_rentals += snowboards_amount
-                    rental.rentalTime = rent_time
-
-                    self.customer_rentals[customer_id] = {
-                        'customer': customer,
-                        'rental': rental,
-                        'rental_type': rental_type,
-                        'skis': skis_amount,
-                        'snowboards': snowboards_amount,
-                        'discountCode': discount_code
-                    }
-
-                    summary = [
-                        "Order Summary",
-                        f"Skis: {skis_amount}",
-                        f"Snowboards: {snowboards_amount}",
-                        f"Rental Type: {self.get_rental_type_str_from_int(rental_type)}",
-                        f"Started: {rent_time}",
-                        f"Discount Code: {discount_code}"
-                    ]
-                    return "\n".join(summary)
+                        self.analytics.record_rental(start, rental_type, skis_amount,
+                                                     snowboards_amount, discount_code)
+                        if self.storage is not None:
+                            self.storage.record_rental(customer_id, customer_name, rental_type,
+                                                       skis_amount, snowboards_amount,
+                                                       discount_code, rent_time)
+                        self._publish()
+
+                    if quiet and self.invoices is None:
+                        return ""
+                    from invoices import SUMMARY
+                    summary = SUMMARY.render(
+                        skis=skis_amount, snowboards=snowboards_amount,
+                        rental_type=self.get_rental_type_str_from_int(rental_type),
+                        units=self.unit_serials(rental.rentedSkiUnits, rental.rentedSnowUnits),
+                        started=rent_time, discount_code=discount_code)
+                    if self.invoices is not None:
+                        self.invoices.add(self.business_day, "rental", customer_id, summary)
+                    return "" if quiet else summary
                 return "Rental failed"
             return "Inventory is not sufficient. Rental failed"
         except Exception as e:
             return str(e)
 
-    def return_rental(self, customer_id: str, return_time: datetime) -> str:
+    def is_rental_period_valid(self, rental_type: int, rental_period: int) -> bool:
+        """
+        Checks that a requested period is a positive whole number of units no
+        longer than MAX_RENTAL_PERIOD.
+
+        Args:
+            rental_type (int): Rental type (1 = Hours, 2 = Days, 3 = Weeks).
+            rental_period (int): Number of hours, days or weeks requested.
+
+        Returns:
+            bool: True if the period can be rented.
+        """
+        if not isinstance(rental_period, int) or isinstance(rental_period, bool):
+            return False
+        if rental_period < 1:
+            return False
+        return self.PERIOD_UNITS.get(rental_type, timedelta()) * rental_period <= self.MAX_RENTAL_PERIOD
+
+    def expected_return(self, rent_time: datetime, rental_type: int,
+                        rental_period: int) -> datetime:
+        """
+        Returns when a rental is due back.
+
+        Args:
+            rent_time (datetime): Start time of rental.
+            rental_type (int): Rental type (1 = Hours, 2 = Days, 3 = Weeks).
+            rental_period (int): Number of hours, days or weeks requested.
+
+        Returns:
+            datetime: The expected return time.
+        """
+        return rent_time + self.PERIOD_UNITS.get(rental_type, timedelta()) * rental_period
+
+    def overdue_rentals(self, now: datetime) -> list:
+        """
+        Lists open rentals that were due back before now, most overdue first.
+
+        Returns:
+            list[ActiveRental]: The overdue rentals.
+        """
+        with self._lock:
+            return [self.customer_rentals.get(customer_id)
+                    for _, customer_id in self.due_queue.overdue(to_micros(now))]
+
+    def next_due(self, count: int) -> list:
+        """
+        Lists the count open rentals that are due back soonest.
+
+        Returns:
+            list[ActiveRental]: The rentals, earliest due first.
+        """
+        with self._lock:
+            return [self.customer_rentals.get(customer_id)
+                    for _, customer_id in self.due_queue.next_due(count)]
+
+    def analytics_report(self) -> str:
+        """
+        Formats the running aggregates without rescanning any rentals.
+        """
+        with self._lock:
+            return self.analytics.report()
+
+    def return_rental(self, customer_id: str, return_time: datetime, quiet: bool = False) -> str:
         """
         Processes a rental return and generates an invoice.
 
         Args:
             customer_id (str): ID of the customer returning equipment.
             return_time (datetime): Return time.
+            quiet (bool, optional): Skip building the invoice for bulk imports.
 
         Returns:
-            str: Return invoice or error message.
+            str: Return invoice (empty when quiet) or error message.
         """
-        if customer_id not in self.customer_rentals:
-            return "Such ID does not exist"
-
-        info = self.customer_rentals.pop(customer_id)
-        rental = info['rental']
-        customer = info['customer']
-        rental_type = info['rental_type']
-        discount_code = info['discountCode']
+        with self._lock:
+            if customer_id not in self.customer_rentals:
+                return "Such ID does not exist"
+            info = self.customer_rentals.get(customer_id)
+
+        rental = Rental(info.name, self.shop, info.skis, info.snowboards)
+        rental.rentalTime = info.start
+        rental.rentedSkiUnits = list(info.units[:info.skis])
+        rental.rentedSnowUnits = list(info.units[info.skis:])
+        rental_type = info.rental_type
+        discount_code = info.discount_code
 
         rental.calculateRentalCost(rental_type, return_time)
         subtotal = rental.SubTotal
         rental.familyDiscount()
         rental.discountCode(discount_code)
-        final_cost = rental.finalCost()
-
-        rental.returnInv()
-        self.revenu += final_cost
 
+        with self._lock:
+            # Priced outside the lock; make sure no other counter returned it meanwhile.
+            if (customer_id not in self.customer_rentals
+                    or self.customer_rentals.get(customer_id) != info):
+                return "Such ID does not exist"
+            self.customer_rentals.remove(customer_id)
+            self.due_queue.discard(customer_id)
+            rental.returnInv()                      # Stock comes back with the row gone.
+            self.reservations.release(info.skis, info.snowboards, to_micros(info.start),
+                                      to_micros(info.due))
+            final_cost = rental.finalCost()
+            self.revenu += final_cost
+            self.analytics.record_return(to_micros(return_time), to_micros(info.start),
+                                         rental_type, discount_code, final_cost)
+            self._record(["return", customer_id, to_micros(return_time), final_cost])
+            if self.storage is not None:
+                self.storage.record_return(customer_id, return_time, subtotal, final_cost)
+            self._publish()
+
+        if quiet and self.invoices is None:
+            return ""
         duration = return_time - rental.rentalTime
-        days = duration.days
-        secs = duration.seconds
-        hours, rem = divmod(secs, 3600)
+        hours, rem = divmod(duration.seconds, 3600)
         minutes, seconds = divmod(rem, 60)
+        from invoices import INVOICE
+        invoice = INVOICE.render(name=info.name, skis=info.skis, snowboards=info.snowboards,
+                                 days=duration.days, hours=hours, minutes=minutes,
+                                 seconds=seconds, subtotal=subtotal, total=final_cost)
+        if self.invoices is not None:
+            self.invoices.add(self.business_day, "return", customer_id, invoice)
+        return "" if quiet else invoice
+
+    def reprint(self, customer_id: str) -> str:
+        """
+        Returns the customer's most recent summary or invoice from the archive.
+        """
+        if self.invoices is None:
+            return "Receipts are not being archived"
+        document = self.invoices.reprint(customer_id)
+        return document if document is not None else "No receipt on file for that ID"
 
-        invoice = [
-            "RENTAL RETURN INVOICE",
-            f"Customer Name: {customer.name}",
-            "Equipment Rented:",
-            f"  Skis: {info['skis']}",
-            f"  Snowboards: {info['snowboards']}",
-            f"Duration: {days} days, {hours} hours, {minutes} minutes, {seconds} seconds",
-            f"Subtotal: ${subtotal:.2f}",
-            f"Final Total: ${final_cost:.2f}"
-        ]
-        return "\n".join(invoice)
+    def unit_serials(self, ski_units, snow_units) -> str:
+        """
+        Formats rented units as a comma-separated list of serial numbers.
+        """
+        serial_ski = self.shop.skiUnits.serial
+        serial_snow = self.shop.snowUnits.serial
+        return ", ".join([*map(serial_ski, ski_units), *map(serial_snow, snow_units)])
+
+    def unit_status(self, equipment: str, unit: int) -> str:
+        """
+        Describes one unit: its state, its rentals since the last service and who has it.
+
+        Args:
+            equipment (str): "ski" or "snowboard".
+            unit (int): Unit number.
+        """
+        from units import OUT, RETIRING, STATE_NAMES
+        with self._lock:
+            try:
+                pool, _ = self.shop.equipmentUnits(equipment)
+                status = (f"{pool.serial(unit)}: {STATE_NAMES[pool.state(unit)]}, "
+                          f"{pool.usage(unit)} rentals since last service")
+            except ValueError as e:
+                return str(e)
+            if pool.state(unit) in (OUT, RETIRING):
+                rentals = self.customer_rentals
+                for row, units in enumerate(rentals.units):
+                    skis = rentals.skis[row]
+                    if unit in (units[:skis] if equipment == "ski" else units[skis:]):
+                        status += f", with customer {rentals.ids[row]}"
+                        break
+        return status
+
+    def _apply_unit_event(self, op: str, equipment: str, unit: int) -> None:
+        """
+        Applies a retire, reinstate or service event to the shop and the reservation book.
+
+        Raises:
+            ValueError: If the unit does not exist or is in the wrong state.
+        """
+        if op == "service":
+            self.shop.equipmentUnits(equipment)[0].service(unit)
+            return
+        change = -1 if op == "retire" else 1
+        if op == "retire":
+            self.shop.retireUnit(equipment, unit)
+        else:
+            self.shop.reinstateUnit(equipment, unit)
+        if equipment == "ski":
+            self.reservations.ski_capacity += change
+        else:
+            self.reservations.snowboard_capacity += change
+
+    def _unit_change(self, op: str, equipment: str, unit: int, done: str) -> str:
+        with self._lock:
+            try:
+                self._apply_unit_event(op, equipment, unit)
+            except ValueError as e:
+                return str(e)
+            self._record([op, equipment, unit])
+            self._publish()
+            serial = self.shop.equipmentUnits(equipment)[0].serial(unit)
+        return f"Unit {serial} {done}"
+
+    def retire_unit(self, equipment: str, unit: int) -> str:
+        """
+        Takes a damaged unit out of the fleet; a rented unit is retired when it comes back.
+
+        Returns:
+            str: Confirmation or error message.
+        """
+        return self._unit_change("retire", equipment, unit, "retired")
+
+    def reinstate_unit(self, equipment: str, unit: int) -> str:
+        """
+        Puts a retired unit back into the fleet.
+
+        Returns:
+            str: Confirmation or error message.
+        """
+        return self._unit_change("reinstate", equipment, unit, "reinstated")
+
+    def service_unit(self, equipment: str, unit: int) -> str:
+        """
+        Records maintenance on a unit, resetting its usage counter.
+
+        Returns:
+            str: Confirmation or error message.
+        """
+        return self._unit_change("service", equipment, unit, "serviced")
+
+    def units_due_service(self, equipment: str, limit: int) -> list:
+        """
+        Lists the serial numbers of units rented at least limit times since their last service.
+        """
+        with self._lock:
+            pool, _ = self.shop.equipmentUnits(equipment)
+            return [pool.serial(unit) for unit in pool.needs_service(limit)]
 
 
 class RentalUI:
@@ -259,34 +1030,82 @@ class RentalUI:
     Manages the user interface for the ski and snowboard rental system.
     """
 
-    def __init__(self, debug: bool = False):
+    MENU_TEXT = "\n".join([
+        "=== Ski & Snowboard Rental System ===",
+        "1. New Customer Rental",
+        "2. Rental Return",
+        "3. Show Inventory",
+        "4. End of Day",
+        "5. Due Back Queue",
+        "6. Reservations",
+        "7. Exit",
+        "8. Stats",
+        "9. Reprint Receipt",
+        "10. Equipment Units",
+    ])
+
+    def __init__(self, debug: bool = False, state_dir: str = None, db_path: str = None):
         """
         Initializes the RentalUI and sets up inventory.
 
         Args:
             debug (bool): If True, allows manual time entry.
+            state_dir (str, optional): Journal folder. When given, the previous
+                session is restored from it instead of prompting for inventory,
+                sealed days are kept in its partitions subfolder and printed
+                receipts in its invoices subfolder.
+            db_path (str, optional): SQLite file that records rental history for reports.
         """
         self.debug = debug
-        self.logic = RentalUILogic()
-        self.build_store()
+        journal = storage = partitions = invoices = None
+        if state_dir:
+            # Persistence is opt-in, so its modules are only loaded when it is on.
+            from invoices import InvoiceArchive
+            from journal import RentalJournal
+            from partitions import PartitionStore
+            journal = RentalJournal(state_dir)
+            partitions = PartitionStore(os.path.join(state_dir, "partitions"))
+            invoices = InvoiceArchive(os.path.join(state_dir, "invoices"))
+        if db_path:
+            from storage import SQLiteRentalStore           # sqlite3 is slow to import.
+            storage = SQLiteRentalStore(db_path)
+        self.output = ConsoleSink(buffered=True)
+        self.logic = RentalUILogic(journal=journal, storage=storage, partitions=partitions,
+                                   output=self.output, invoices=invoices)
+        self.handlers = {
+            "1": self.new_customer_rental,
+            "2": self.rental_return,
+            "3": self.show_inventory,
+            "4": self.end_of_day,
+            "5": self.show_due_queue,
+            "6": self.reservation_menu,
+            "7": self.exit,
+            "8": self.show_stats,
+            "9": self.reprint_receipt,
+            "10": self.equipment_units,
+        }
+        if not self.logic.restore():
+            self.build_store()
 
     def build_store(self) -> None:
         """
         Prompts for initial inventory and initializes the store.
         """
-        print("-------------------------")
-        print(" Set up shop inventory ")
-        skis = int(self.validate_int_input("Enter number of skis: "))
-        snowboards = int(self.validate_int_input("Enter number of snowboards: "))
-        if skis < 0 or snowboards < 0:
+        while True:
+            print("-------------------------")
+            print(" Set up shop inventory ")
+            skis = int(self.validate_int_input("Enter number of skis: "))
+            snowboards = int(self.validate_int_input("Enter number of snowboards: "))
+            if skis >= 0 and snowboards >= 0:
+                break
             print("Inventory should be non-negative.")
-            return self.build_store()
         self.logic.set_shop(skis, snowboards)
 
     def wait(self):
         """
-        Pauses until the user presses a key.
+        Writes the screen's buffered messages, then pauses until the user presses a key.
         """
+        self.output.flush()
         input("Press any key to continue...")
 
     def yes_no(self, question: str) -> bool:
@@ -358,39 +1177,43 @@ class RentalUI:
             datetime: The selected datetime.
         """
         if self.debug:
-            while True:
-                try:
-                    month, day, year, hour, minute = map(int, input(
-                        "Enter date and time (M:D:Y:HH:MM): ").split(':'))
-                    return datetime(year, month, day, hour, minute)
-                except ValueError:
-                    print("Invalid format. Use M:D:Y:HH:MM.")
+            return self.read_datetime()
         return datetime.now()
 
+    def read_datetime(self) -> datetime:
+        """
+        Prompts until a valid date and time is entered.
+
+        Returns:
+            datetime: The entered datetime.
+        """
+        while True:
+            try:
+                month, day, year, hour, minute = map(int, input(
+                    "Enter date and time (M:D:Y:HH:MM): ").split(':'))
+                return datetime(year, month, day, hour, minute)
+            except ValueError:
+                print("Invalid format. Use M:D:Y:HH:MM.")
+
     def main_menu(self):
         """
-        Displays the main menu and handles user choice.
+        Displays the main menu and dispatches choices until the program exits.
+
+        Handlers return here when they finish, so the stack depth stays the
+        same no matter how many transactions are processed.
         """
-        self.clear_console()
-        print("=== Ski & Snowboard Rental System ===")
-        print("1. New Customer Rental")
-        print("2. Rental Return")
-        print("3. Show Inventory")
-        print("4. End of Day")
-        choice = input("Enter your choice: ")
-
-        if choice == "1":
-            self.new_customer_rental()
-        elif choice == "2":
-            self.rental_return()
-        elif choice == "3":
-            self.show_inventory()
-        elif choice == "4":
-            self.end_of_day()
-        else:
-            print("Invalid choice. Please try again.")
-            self.wait()
-            self.main_menu()
+        handlers = self.handlers
+        menu_text = self.MENU_TEXT
+        while True:
+            self.clear_console()
+            print(menu_text)
+            handler = handlers.get(input("Enter your choice: "))
+            if handler is None:
+                print("Invalid choice. Please try again.")
+                self.wait()
+            else:
+                handler()
+                self.output.flush()
 
     def new_customer_rental(self):
         """
@@ -404,7 +1227,7 @@ class RentalUI:
         if not self.logic.is_inventory_sufficient(skis, boards):
             print("Inventory is not sufficient.")
             self.wait()
-            return self.main_menu()
+            return
 
         rtype = self.validate_rental_type()
         period = self.validate_int_input(
@@ -417,11 +1240,12 @@ class RentalUI:
         if self.yes_no("Complete rental?"):
             current_time = self.get_time_input()
             self.clear_console()
-            print(self.logic.new_rental(
-                str(cust_id), name, skis, boards, rtype, current_time, code
+            self.output.emit("screen", self.logic.new_rental(
+                str(cust_id), name, skis, boards, rtype, current_time, code,
+                rental_period=period
             ))
+            self.logic.sync()
             self.wait()
-        self.main_menu()
 
     def rental_return(self):
         """
@@ -430,34 +1254,137 @@ class RentalUI:
         cust_id = self.validate_int_input("Enter customer ID: ")
         return_time = self.get_time_input()
         self.clear_console()
-        print(self.logic.return_rental(str(cust_id), return_time))
+        self.output.emit("screen", self.logic.return_rental(str(cust_id), return_time))
+        self.logic.sync()
         self.wait()
-        self.main_menu()
 
     def show_inventory(self):
         """
         Displays the current inventory.
         """
-        skis = self.logic.get_current_skis()
-        boards = self.logic.get_current_snowboards()
+        view = self.logic.snapshot()
         print("------ Inventory ------")
-        print(f"Skis: {skis}")
-        print(f"Snowboards: {boards}")
+        print(f"Skis: {view.skis}")
+        print(f"Snowboards: {view.snowboards}")
+        self.wait()
+
+    def show_due_queue(self):
+        """
+        Lists overdue rentals and the next rentals due back.
+        """
+        now = self.get_time_input()
+        print("------ Overdue ------")
+        overdue = self.logic.overdue_rentals(now)
+        for info in overdue:
+            print(f"ID {info.customer_id} ({info.name}): due {info.due}, "
+                  f"{info.skis} skis, {info.snowboards} snowboards")
+        if not overdue:
+            print("Nothing overdue.")
+        print("------ Next Due Back ------")
+        for info in self.logic.next_due(len(overdue) + 10):
+            if info.due >= now:
+                print(f"ID {info.customer_id} ({info.name}): due {info.due}")
+        self.wait()
+
+    def reservation_menu(self):
+        """
+        Books or cancels equipment for a future time window.
+        """
+        if self.yes_no("Cancel an existing reservation?"):
+            reservation_id = self.validate_int_input("Enter reservation ID: ")
+            print(self.logic.cancel_reservation(reservation_id))
+        else:
+            cust_id = self.validate_int_input("Enter customer ID: ")
+            skis = self.validate_int_input("Enter skis to reserve: ", True)
+            boards = self.validate_int_input("Enter snowboards to reserve: ", True)
+            print("Reservation start:")
+            start = self.read_datetime()
+            print("Reservation end:")
+            end = self.read_datetime()
+            print(self.logic.reserve_equipment(str(cust_id), skis, boards, start, end))
+        self.logic.sync()
         self.wait()
-        self.main_menu()
 
     def end_of_day(self):
         """
-        Shows end-of-day report and exits the program.
+        Shows the end-of-day report, seals the day and starts the next one.
         """
         self.clear_console()
-        print("END OF DAY REPORT")
+        view = self.logic.snapshot()
+        print(f"END OF DAY REPORT - {view.business_day}")
+        print("=" * 30)
+        print(f"Total Skis Rented Today: {view.daily_skis}")
+        print(f"Total Snowboards Rented Today: {view.daily_snowboards}")
+        print(f"Total Revenue Collected: ${view.revenue:.2f}")
         print("=" * 30)
-        print(f"Total Skis Rented Today: {self.logic.daily_ski_rentals}")
-        print(f"Total Snowboards Rented Today: {self.logic.daily_snowboard_rentals}")
-        print(f"Total Revenue Collected: ${self.logic.revenu:.2f}")
+        print(self.logic.analytics_report())
         print("=" * 30)
+        self.logic.roll_over_day()
+        self.logic.sync()
+        print(f"Day sealed. Open rentals carried over to {self.logic.business_day}.")
+        self.wait()
+
+    def show_stats(self):
+        """
+        Shows operation latencies and optionally writes them to stats files.
+        """
+        metrics = self.logic.metrics
+        if metrics is None:
+            print("Timing is off.")
+            if self.yes_no("Turn on timing?"):
+                self.logic.enable_metrics()
+            self.wait()
+            return
+        print("------ Stats ------")
+        print(metrics.report())
+        if self.yes_no("Write rental_stats.json and rental_stats.prom?"):
+            metrics.write("rental_stats.json")
+            metrics.write("rental_stats.prom")
+        if self.yes_no("Turn off timing?"):
+            self.logic.disable_metrics()
+        self.wait()
+
+    def reprint_receipt(self):
+        """
+        Prints a customer's latest summary or invoice again.
+        """
+        cust_id = self.validate_int_input("Enter customer ID: ")
+        self.clear_console()
+        print(self.logic.reprint(str(cust_id)))
+        self.wait()
+
+    def equipment_units(self):
+        """
+        Looks up, retires, reinstates or services individual units.
+        """
+        equipment = "ski" if self.yes_no("Skis? (n for snowboards)") else "snowboard"
+        action = input("l=look up, r=retire, i=reinstate, s=service, d=due for service: ").lower()
+        if action == "d":
+            limit = self.validate_int_input("Rentals since last service: ")
+            serials = self.logic.units_due_service(equipment, limit)
+            print("\n".join(serials) if serials else "No units are due for service.")
+        elif action in ("l", "r", "i", "s"):
+            unit = self.validate_int_input("Enter unit number: ", True)
+            if action == "l":
+                print(self.logic.unit_status(equipment, unit))
+            elif action == "r":
+                print(self.logic.retire_unit(equipment, unit))
+            elif action == "i":
+                print(self.logic.reinstate_unit(equipment, unit))
+            else:
+                print(self.logic.service_unit(equipment, unit))
+            self.logic.sync()
+        else:
+            print("Invalid choice.")
+        self.wait()
+
+    def exit(self):
+        """
+        Saves state and exits the program.
+        """
+        self.output.flush()
         print("Thank you for using the rental system! Goodbye!")
+        self.logic.close()
         sys.exit()
 
 
@@ -3,7 +3,7 @@ from ConsoleUI import RentalUI
 
 
 def main():
-    ui = RentalUI(True)
+    ui = RentalUI(True, state_dir="rental_state")
     ui.main_menu()
 
 
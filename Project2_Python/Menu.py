@@ -1,4 +1,3 @@
-import sys
 import os
 
 class MenuSystem:
@@ -10,7 +9,11 @@ class MenuSystem:
         self.mainMenu: Menu = None
         self.currentMenu: Menu = None
         self.menuStack: list[Menu] = []
+        self.cursor: int = -1                   # position of currentMenu in menuStack
+        self.menuCache: dict = {}
         self.pseudoRefresh = pseudoRefresh
+        self.running = False
+        self.moved = False
 
     def set_main_menu(self, menu):
         if isinstance(menu, Menu):
@@ -18,6 +21,7 @@ class MenuSystem:
             self.mainMenu = menu
             self.currentMenu = menu
             self.menuStack = [menu]
+            self.cursor = 0
 
     def set_default_headers(self):
         self.headers.append("-------Navigation------")
@@ -25,11 +29,34 @@ class MenuSystem:
         self.headers.append("-----------------------")
         self.headers.append("")
 
+    def get_menu(self, menuClass, strName: str):
+        # Menus only build their text in __init__, so one instance per (class, name) can be reused.
+        key = (menuClass, strName)
+        menu = self.menuCache.get(key)
+        if menu is None:
+            menu = menuClass(strName, self)
+            self.menuCache[key] = menu
+        return menu
+
     def show(self):
-        self.currentMenu.show_menu()
+        # Navigation inside a running loop only moves the cursor; the loop shows the next menu.
+        if self.running:
+            return
+        self.running = True
+        try:
+            while self.running:
+                self.moved = False
+                self.currentMenu.show_menu()
+        finally:
+            self.running = False
+
+    def stop(self):
+        self.running = False
 
     def show_main(self):
+        self.cursor = 0
         self.currentMenu = self.mainMenu
+        self.moved = True
         self.show()
     
     # def create_menu(self, type, menuName):
@@ -37,25 +64,25 @@ class MenuSystem:
 
 
     def navigate_forward(self):
-        if self.currentMenu in self.menuStack:
-            index = self.menuStack.index(self.currentMenu)
-            if index < len(self.menuStack) - 1:
-                self.currentMenu = self.menuStack[index + 1]
-                self.show()
+        if self.cursor < len(self.menuStack) - 1:
+            self.cursor += 1
+            self.currentMenu = self.menuStack[self.cursor]
+            self.moved = True
+            self.show()
 
     def navigate_back(self):
-        if self.currentMenu in self.menuStack:
-            index = self.menuStack.index(self.currentMenu)
-            if index > 0:
-                self.currentMenu = self.menuStack[index - 1]
-                self.show()
+        if self.cursor > 0:
+            self.cursor -= 1
+            self.currentMenu = self.menuStack[self.cursor]
+            self.moved = True
+            self.show()
 
     def navigate_to(self, menu):
-        if self.currentMenu in self.menuStack:
-            index = self.menuStack.index(self.currentMenu)
-            self.menuStack = self.menuStack[:index + 1]  # truncate forward history
+        del self.menuStack[self.cursor + 1:]  # truncate forward history
         self.menuStack.append(menu)
+        self.cursor += 1
         self.currentMenu = menu
+        self.moved = True
         self.show()
 
 
@@ -87,7 +114,8 @@ class Menu:
     def show_menu(self):
         self.show_instruction()
         self.get_input()
-        self.menuSystem.navigate_back()
+        if not self.menuSystem.moved:
+            self.menuSystem.navigate_back()
 
     def clear_console(self):
         os.system("cls")
@@ -122,8 +150,10 @@ class TestMenu1(Menu):
     def get_input(self):
         while True:
             inputValue= super().get_input()
+            if inputValue is None:                  # navigated away
+                return
             if inputValue == "1":
-                self.menuSystem.navigate_to(TestMenu2("Test menu 2", self.menuSystem))
+                self.menuSystem.navigate_to(self.menuSystem.get_menu(TestMenu2, "Test menu 2"))
                 break
             else:
                 print("Invalid input.")
@@ -138,8 +168,11 @@ class TestMenu2(Menu):
     def get_input(self):
         while True:
             inputValue = super().get_input()
+            if inputValue is None:                  # navigated away
+                return
             if inputValue == "3":
-                self.menuSystem.navigate_to(TestMenu3("Addition", self.menuSystem))
+                self.menuSystem.navigate_to(self.menuSystem.get_menu(TestMenu3, "Addition"))
+                return
             else:
                 print("Wrong command...")
 
@@ -150,14 +183,17 @@ class TestMenu3(Menu):
         self.menuText.append("You can calculate sum of two digits")
 
     def get_input(self):
-        while True:
-            print("Write number a")
-            intA = int(super().get_input())
-            print("Write number b")
-            intB = int(super().get_input())
-            print("Sum of A and B = " + str(intA + intB))
-            self.wait("Press any key to return to main menu")
-            self.menuSystem.show_main()
+        print("Write number a")
+        inputA = super().get_input()
+        if inputA is None:                          # navigated away
+            return
+        print("Write number b")
+        inputB = super().get_input()
+        if inputB is None:
+            return
+        print("Sum of A and B = " + str(int(inputA) + int(inputB)))
+        self.wait("Press any key to return to main menu")
+        self.menuSystem.show_main()
 
 
 class MainMenu(Menu):
@@ -175,13 +211,14 @@ class MainMenu(Menu):
         while True:
             inputValue = input()
             if inputValue == "1":
-                self.menuSystem.navigate_to(TestMenu1("Test 1", self.menuSystem))
+                self.menuSystem.navigate_to(self.menuSystem.get_menu(TestMenu1, "Test 1"))
                 break
             elif inputValue == "2":
-                self.menuSystem.navigate_to(TestMenu2("Test 2", self.menuSystem))
+                self.menuSystem.navigate_to(self.menuSystem.get_menu(TestMenu2, "Test 2"))
                 break
             elif inputValue == "3":
-                sys.exit()
+                self.menuSystem.stop()
+                break
             else:
                 print("No such command. Try again.")
             
@@ -0,0 +1,260 @@
+from math import ceil, inf, log
+
+
+class QuantileSketch:
+    """
+    Streaming quantile estimate with a bounded relative error.
+
+    Values are counted in logarithmic buckets, so adding one is O(1) and the
+    memory used depends on the range of values rather than how many there
+    are. Any quantile is within relative_accuracy of a value that was added.
+    Values at or below zero share a single bucket.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Args:
+            relative_accuracy (float): Largest relative error of a quantile.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._bucket_scale = 1 / log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = inf
+        self.max = -inf
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float) -> None:
+        """
+        Counts one value.
+        """
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = ceil(log(value) * self._bucket_scale)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        """
+        Adds every value counted by another sketch with the same accuracy.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches must use the same relative accuracy.")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, fraction: float) -> float:
+        """
+        Returns the estimated value at the given fraction, e.g. 0.99 for p99.
+        """
+        if not self.count:
+            return 0.0
+        if fraction <= 0:
+            return self.min
+        if fraction >= 1:
+            return self.max
+        rank = fraction * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_state(self) -> list:
+        """
+        Returns a JSON-friendly copy of the sketch.
+        """
+        return [self.relative_accuracy, self.zeros, self.count, self.total,
+                self.min if self.count else None, self.max if self.count else None,
+                [[index, count] for index, count in self.buckets.items()]]
+
+    @classmethod
+    def from_state(cls, state: list) -> "QuantileSketch":
+        """
+        Rebuilds a sketch saved by to_state.
+        """
+        accuracy, zeros, count, total, low, high, buckets = state
+        sketch = cls(accuracy)
+        sketch.zeros = zeros
+        sketch.count = count
+        sketch.total = total
+        if count:
+            sketch.min = low
+            sketch.max = high
+        sketch.buckets = {index: bucket_count for index, bucket_count in buckets}
+        return sketch
+
+
+# Layout of every aggregate row.
+RENTALS, SKIS, SNOWBOARDS, RETURNS, REVENUE = range(5)
+HOUR = 3_600_000_000                    # microseconds
+
+
+def new_row() -> list:
+    return [0, 0, 0, 0, 0.0]
+
+
+def row_for(table: dict, key) -> list:
+    row = table.get(key)
+    if row is None:
+        row = table[key] = new_row()
+    return row
+
+
+class RentalAnalytics:
+    """
+    Running totals of the day's rentals and returns.
+
+    Every rental and return updates a fixed number of counters, so reading
+    the aggregates costs the same whether there were ten transactions or ten
+    million. Rentals are counted in the hour they start and returns in the
+    hour they come back. Times are integer microseconds as in rental_table.
+    """
+
+    def __init__(self):
+        """
+        Attributes:
+            hourly (list[list]): One row per hour of the day.
+            by_type (dict[int, list]): Row per booked rental type.
+            by_code (dict[str, list]): Row per discount code, "" for none.
+            durations (QuantileSketch): Rental durations in hours.
+            tickets (QuantileSketch): Final totals in dollars.
+        """
+        self.hourly = [new_row() for _ in range(24)]
+        self.by_type: dict[int, list] = {}
+        self.by_code: dict[str, list] = {}
+        self.durations = QuantileSketch()
+        self.tickets = QuantileSketch()
+
+    def record_rental(self, start: int, rental_type: int, skis: int, snowboards: int,
+                      discount_code: str) -> None:
+        """
+        Counts a new rental.
+        """
+        # Unrolled: this runs once per rental and once per replayed journal event.
+        row = self.hourly[start // HOUR % 24]
+        row[RENTALS] += 1
+        row[SKIS] += skis
+        row[SNOWBOARDS] += snowboards
+        row = self.by_type.get(rental_type)
+        if row is None:
+            row = self.by_type[rental_type] = new_row()
+        row[RENTALS] += 1
+        row[SKIS] += skis
+        row[SNOWBOARDS] += snowboards
+        row = self.by_code.get(discount_code)
+        if row is None:
+            row = self.by_code[discount_code] = new_row()
+        row[RENTALS] += 1
+        row[SKIS] += skis
+        row[SNOWBOARDS] += snowboards
+
+    def record_return(self, returned: int, start: int, rental_type: int,
+                      discount_code: str, total: float) -> None:
+        """
+        Counts a completed return and the money it brought in.
+        """
+        row = self.hourly[returned // HOUR % 24]
+        row[RETURNS] += 1
+        row[REVENUE] += total
+        row = self.by_type.get(rental_type)
+        if row is None:
+            row = self.by_type[rental_type] = new_row()
+        row[RETURNS] += 1
+        row[REVENUE] += total
+        row = self.by_code.get(discount_code)
+        if row is None:
+            row = self.by_code[discount_code] = new_row()
+        row[RETURNS] += 1
+        row[REVENUE] += total
+        self.durations.add((returned - start) / HOUR)
+        self.tickets.add(total)
+
+    def merge(self, other: "RentalAnalytics") -> None:
+        """
+        Adds another set of aggregates to this one.
+        """
+        for row, other_row in zip(self.hourly, other.hourly):
+            for i, value in enumerate(other_row):
+                row[i] += value
+        for mine, theirs in ((self.by_type, other.by_type), (self.by_code, other.by_code)):
+            for key, other_row in theirs.items():
+                row = row_for(mine, key)
+                for i, value in enumerate(other_row):
+                    row[i] += value
+        self.durations.merge(other.durations)
+        self.tickets.merge(other.tickets)
+
+    def to_state(self) -> dict:
+        """
+        Returns a JSON-friendly copy of the aggregates.
+        """
+        return {
+            "hourly": self.hourly,
+            "by_type": [[key, row] for key, row in self.by_type.items()],
+            "by_code": [[key, row] for key, row in self.by_code.items()],
+            "durations": self.durations.to_state(),
+            "tickets": self.tickets.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RentalAnalytics":
+        """
+        Rebuilds aggregates saved by to_state.
+        """
+        analytics = cls()
+        analytics.hourly = [list(row) for row in state["hourly"]]
+        analytics.by_type = {key: list(row) for key, row in state["by_type"]}
+        analytics.by_code = {key: list(row) for key, row in state["by_code"]}
+        analytics.durations = QuantileSketch.from_state(state["durations"])
+        analytics.tickets = QuantileSketch.from_state(state["tickets"])
+        return analytics
+
+    def report(self) -> str:
+        """
+        Formats the aggregates for the end-of-day screen.
+        """
+        type_names = {1: "Hourly", 2: "Daily", 3: "Weekly"}
+        lines = ["Hour   Rentals  Skis  Boards  Returns   Revenue"]
+        for hour, row in enumerate(self.hourly):
+            if row[RENTALS] or row[RETURNS]:
+                lines.append(f"{hour:02d}:00 {row[RENTALS]:8} {row[SKIS]:5} {row[SNOWBOARDS]:7} "
+                             f"{row[RETURNS]:8} {row[REVENUE]:9.2f}")
+        lines.append("By rental type:")
+        for rental_type, row in sorted(self.by_type.items()):
+            lines.append(f"  {type_names.get(rental_type, rental_type)}: {row[RENTALS]} rentals, "
+                         f"{row[RETURNS]} returns, ${row[REVENUE]:.2f}")
+        lines.append("By discount code:")
+        for code, row in sorted(self.by_code.items()):
+            lines.append(f"  {code or '(none)'}: {row[RENTALS]} rentals, "
+                         f"{row[RETURNS]} returns, ${row[REVENUE]:.2f}")
+        for label, sketch, value in (("Rental duration", self.durations, "{:.1f}h"),
+                                     ("Ticket size", self.tickets, "${:.2f}")):
+            lines.append(f"{label}: p50 {value.format(sketch.quantile(0.5))}, "
+                         f"p90 {value.format(sketch.quantile(0.9))}, "
+                         f"p99 {value.format(sketch.quantile(0.99))}, "
+                         f"mean {value.format(sketch.mean())}")
+        return "\n".join(lines)
@@ -0,0 +1,277 @@
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from discounts import load_registry, set_registry
+from pricing import price_returns
+from rental_table import from_micros
+from tariffs import load_tariff, set_tariff
+
+
+RETURNED_ROWS = """
+SELECT id, customer_id, rental_type, skis, snowboards, discount_code,
+       start_time, return_time, final_total
+FROM rentals WHERE id BETWEEN ? AND ? AND return_time IS NOT NULL
+"""
+
+
+class AuditReport:
+    """
+    Differences between what returns were charged and what they re-price to.
+
+    Amounts are kept in integer cents so shard reports add up exactly no
+    matter how the records were split. Reports from different shards are
+    combined with merge().
+    """
+
+    def __init__(self, top: int = 20):
+        """
+        Args:
+            top (int): Largest discrepancies kept for the report.
+        """
+        self.top = top
+        self.records = 0
+        self.charged = 0
+        self.repriced = 0
+        self.discrepancies = 0
+        self.unpriced = 0
+        # rental_type -> [records, discrepancies, repriced - charged in cents]
+        self.by_type: dict[int, list] = {}
+        # (|difference|, id, customer_id, charged, repriced), largest first after finish()
+        self.worst: list[tuple] = []
+
+    def add(self, row_id: int, customer_id: str, rental_type: int,
+            charged: int, repriced: int, tolerance: int) -> None:
+        """
+        Counts one re-priced return. Amounts are in cents.
+        """
+        self.records += 1
+        self.charged += charged
+        self.repriced += repriced
+        difference = repriced - charged
+        totals = self.by_type.get(rental_type)
+        if totals is None:
+            totals = self.by_type[rental_type] = [0, 0, 0]
+        totals[0] += 1
+        totals[2] += difference
+        if abs(difference) >= tolerance:
+            self.discrepancies += 1
+            totals[1] += 1
+            entry = (abs(difference), row_id, customer_id, charged, repriced)
+            if len(self.worst) < self.top:
+                heapq.heappush(self.worst, entry)
+            elif entry > self.worst[0]:
+                heapq.heapreplace(self.worst, entry)
+
+    def merge(self, other: "AuditReport") -> None:
+        """
+        Folds another shard's report into this one.
+        """
+        self.records += other.records
+        self.charged += other.charged
+        self.repriced += other.repriced
+        self.discrepancies += other.discrepancies
+        self.unpriced += other.unpriced
+        for rental_type, (records, discrepancies, difference) in other.by_type.items():
+            totals = self.by_type.setdefault(rental_type, [0, 0, 0])
+            totals[0] += records
+            totals[1] += discrepancies
+            totals[2] += difference
+        self.worst = heapq.nlargest(self.top, self.worst + other.worst)
+        heapq.heapify(self.worst)
+
+    def to_json(self) -> dict:
+        return {
+            "records": self.records,
+            "unpriced": self.unpriced,
+            "discrepancies": self.discrepancies,
+            "charged": self.charged / 100,
+            "repriced": self.repriced / 100,
+            "difference": (self.repriced - self.charged) / 100,
+            "by_type": {str(rental_type): {"records": records, "discrepancies": discrepancies,
+                                           "difference": difference / 100}
+                        for rental_type, (records, discrepancies, difference)
+                        in sorted(self.by_type.items())},
+            "worst": [{"id": row_id, "customer_id": customer_id, "charged": charged / 100,
+                       "repriced": repriced / 100}
+                      for _, row_id, customer_id, charged, repriced
+                      in sorted(self.worst, reverse=True)],
+        }
+
+    def report(self) -> str:
+        """
+        Formats the totals, a per-type breakdown and the largest discrepancies.
+        """
+        lines = [f"Returns audited: {self.records:,}",
+                 f"Charged:         ${self.charged / 100:,.2f}",
+                 f"Re-priced:       ${self.repriced / 100:,.2f}",
+                 f"Difference:      ${(self.repriced - self.charged) / 100:,.2f}",
+                 f"Discrepancies:   {self.discrepancies:,}"]
+        if self.unpriced:
+            lines.append(f"Unknown rental types: {self.unpriced:,}")
+        lines.append(f"{'type':<8}{'returns':>12}{'differ':>10}{'difference':>14}")
+        for rental_type, (records, discrepancies, difference) in sorted(self.by_type.items()):
+            lines.append(f"{rental_type:<8}{records:>12,}{discrepancies:>10,}"
+                         f"{difference / 100:>14,.2f}")
+        if self.worst:
+            lines.append("Largest discrepancies:")
+            for _, row_id, customer_id, charged, repriced in sorted(self.worst, reverse=True):
+                lines.append(f"  row {row_id} customer {customer_id}: charged ${charged / 100:.2f}, "
+                             f"re-priced ${repriced / 100:.2f}")
+        return "\n".join(lines)
+
+
+def load_rules(tariff_path: str = None, discount_path: str = None) -> None:
+    """
+    Makes the given tariff and discount files the active ones in this process.
+    Also used as the worker initializer, so every worker prices with the same rules.
+    """
+    set_tariff(load_tariff(tariff_path))
+    set_registry(load_registry(discount_path))
+
+
+def shard_ranges(path: str, shard_size: int) -> list:
+    """
+    Splits the returned rentals in a database into id ranges of about shard_size rows.
+
+    Returns:
+        list[tuple[int, int]]: Inclusive (first id, last id) ranges.
+    """
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        first, last = connection.execute(
+            "SELECT MIN(id), MAX(id) FROM rentals WHERE return_time IS NOT NULL").fetchone()
+    finally:
+        connection.close()
+    if first is None:
+        return []
+    return [(start, min(start + shard_size - 1, last))
+            for start in range(first, last + 1, shard_size)]
+
+
+def audit_shard(path: str, first: int, last: int, tolerance: int = 1,
+                top: int = 20, tariff=None, registry=None) -> AuditReport:
+    """
+    Re-prices the returns with ids in [first, last] through price_returns.
+
+    Discount codes are matched against the current rules; usage caps and
+    date windows are not applied again, since the stored code already
+    passed them when the rental was taken out.
+
+    Args:
+        path (str): SQLite database written by SQLiteRentalStore.
+        first (int): First row id of the shard.
+        last (int): Last row id of the shard.
+        tolerance (int): Smallest difference in cents counted as a discrepancy.
+        top (int): Largest discrepancies kept.
+        tariff (Tariff, optional): Tariff to re-price with instead of the active one.
+        registry (DiscountRegistry, optional): Discount rules to use instead of
+            the active ones.
+    """
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(RETURNED_ROWS, (first, last)).fetchall()
+    finally:
+        connection.close()
+
+    report = AuditReport(top)
+    if not rows:
+        return report
+    ids, customers, types, skis, boards, codes, starts, returns, charged = zip(*rows)
+    try:
+        _, totals = price_returns([from_micros(start) for start in starts],
+                                  [from_micros(returned) for returned in returns],
+                                  skis, boards, types, codes, tariff, registry)
+    except ValueError:
+        # A retired rental type: price row by row and count the ones that fail.
+        totals = []
+        for i in range(len(rows)):
+            try:
+                totals.append(price_returns([from_micros(starts[i])],
+                                            [from_micros(returns[i])], [skis[i]], [boards[i]],
+                                            [types[i]], [codes[i]], tariff, registry)[1][0])
+            except ValueError:
+                totals.append(None)
+    add = report.add
+    for row_id, customer_id, rental_type, paid, total in zip(ids, customers, types,
+                                                             charged, totals):
+        if total is None:
+            report.unpriced += 1
+            continue
+        add(row_id, customer_id, rental_type, round((paid or 0) * 100), round(total * 100),
+            tolerance)
+    return report
+
+
+def run_audit(path: str, workers: int = None, shard_size: int = 100_000, tolerance: int = 1,
+              top: int = 20, tariff_path: str = None, discount_path: str = None) -> AuditReport:
+    """
+    Re-prices every returned rental in a database across a process pool.
+
+    The id range is cut into shards; each worker process reads its shard
+    with its own read-only connection, re-prices it and sends back a small
+    AuditReport, which is merged here. With one worker everything runs in
+    this process, against its own copy of the rules so the caller's active
+    tariff and discounts are left alone.
+
+    Args:
+        path (str): SQLite database written by SQLiteRentalStore.
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+        shard_size (int): Row ids per shard.
+        tolerance (int): Smallest difference in cents counted as a discrepancy.
+        top (int): Largest discrepancies kept.
+        tariff_path (str, optional): Tariff file to re-price with.
+        discount_path (str, optional): Discount rules to re-price with.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    workers = workers or os.cpu_count() or 1
+    shards = shard_ranges(path, shard_size)
+    report = AuditReport(top)
+    if workers == 1 or len(shards) <= 1:
+        tariff = load_tariff(tariff_path)
+        registry = load_registry(discount_path)
+        for first, last in shards:
+            report.merge(audit_shard(path, first, last, tolerance, top, tariff, registry))
+        return report
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_rules,
+                             initargs=(tariff_path, discount_path)) as pool:
+        futures = [pool.submit(audit_shard, path, first, last, tolerance, top)
+                   for first, last in shards]
+        for future in futures:
+            report.merge(future.result())
+    return report
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-price historical returns and report differences from what was charged")
+    parser.add_argument("db", help="SQLite file written with --db")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--shard-size", type=int, default=100_000, help="Row ids per shard")
+    parser.add_argument("--tariffs", help="Tariff JSON to re-price with (default: current)")
+    parser.add_argument("--discounts", help="Discount rules to re-price with (default: current)")
+    parser.add_argument("--tolerance", type=int, default=1,
+                        help="Smallest difference in cents reported as a discrepancy")
+    parser.add_argument("--top", type=int, default=20, help="Largest discrepancies to list")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    report = run_audit(args.db, args.workers, args.shard_size, args.tolerance, args.top,
+                       args.tariffs, args.discounts)
+    elapsed = time.perf_counter() - started
+    print(report.report())
+    print(f"{report.records:,} returns in {elapsed:.2f}s "
+          f"({report.records / max(elapsed, 1e-9):,.0f}/s)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report.to_json(), file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1047 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from datetime import datetime, timedelta
+
+from audit import run_audit
+from classes import Store, Rental
+from coordinator import CoordinatorClient
+from ConsoleUI import RentalUI, RentalUILogic
+from discounts import DiscountRegistry, parse_rules
+from invoices import INVOICE, InvoiceArchive
+from journal import RentalJournal
+from Menu import MainMenu, MenuSystem, TestMenu1
+from pricing import price_returns
+from rental_table import to_micros
+from storage import SCHEMA
+from reservations import ReservationBook
+from sinks import NullSink
+from tariffs import active_tariff
+from units import OUT, UnitPool
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """
+    Registers a benchmark function under the given command-line name.
+    """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def make_return_records(count: int, seed: int = 1):
+    """
+    Builds random return records covering every rental type and escalation branch.
+
+    Returns:
+        tuple: Parallel lists of start times, return times, skis, snowboards,
+        rental types and discount codes.
+    """
+    rng = random.Random(seed)
+    base = datetime(2024, 1, 6, 9, 0)
+    codes = ["", "", "ABCBBP", "XBBP", "QWEBBP"]
+    starts, returns, skis, boards, types, discounts = [], [], [], [], [], []
+    for _ in range(count):
+        start = base + timedelta(minutes=rng.randrange(0, 60 * 24 * 30))
+        starts.append(start)
+        returns.append(start + timedelta(minutes=rng.randrange(1, 60 * 24 * 21)))
+        skis.append(rng.randrange(0, 5))
+        boards.append(rng.randrange(0, 4))
+        types.append(rng.randrange(1, 4))
+        discounts.append(rng.choice(codes))
+    return starts, returns, skis, boards, types, discounts
+
+
+def price_per_object(starts, returns, skis, boards, types, discounts):
+    """
+    Prices records one Rental at a time, the way RentalUILogic.return_rental does.
+    """
+    shop = Store(10 ** 9, 10 ** 9)
+    shop.Display_Inv()
+    shop.output = NullSink()
+    subtotals, totals = [], []
+    for start, ret, ski, board, rtype, code in zip(starts, returns, skis, boards, types, discounts):
+        rental = Rental("Batch", shop, ski, board)
+        rental.rentalTime = start
+        rental.calculateRentalCost(rtype, ret)
+        subtotals.append(rental.SubTotal)
+        rental.familyDiscount()
+        rental.discountCode(code)
+        totals.append(rental.finalCost())
+    return subtotals, totals
+
+
+@benchmark("pricing")
+def bench_pricing(args) -> None:
+    """
+    Compares price_returns against the per-object Rental pricing path.
+    """
+    count = args.count
+    records = make_return_records(count)
+
+    started = time.perf_counter()
+    expected = price_per_object(*records)
+    per_object = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = price_returns(*records)
+    columns = time.perf_counter() - started
+
+    if actual != expected:
+        raise AssertionError("price_returns does not match the per-object pricing path")
+    print(f"pricing: {count} records")
+    print(f"  per-object: {per_object:.3f}s ({count / per_object:,.0f} records/s)")
+    print(f"  columns:    {columns:.3f}s ({count / columns:,.0f} records/s)")
+    print(f"  speedup:    {per_object / columns:.1f}x")
+
+
+def ladder_subtotal(rental_type: int, period: timedelta, skis: int, snowboards: int) -> float:
+    """
+    The hard-coded float branch ladder calculateRentalCost used before tariffs.json.
+    """
+    days, seconds = period.days, period.seconds
+    if rental_type == 1 and round(seconds / 3600) >= 4:
+        rental_type = 2
+        days += 1
+    if rental_type == 2 and days >= 4:
+        rental_type = 3
+        days += 7
+    if rental_type == 1:
+        hours = max(1, seconds / 3600)
+        return hours * 15 * skis + hours * 10 * snowboards
+    if rental_type == 2:
+        days = max(1, days)
+        return days * 50 * skis + days * 40 * snowboards
+    weeks = max(1, days / 7)
+    return weeks * 200 * skis + weeks * 160 * snowboards
+
+
+def ladder_estimate(rental_type: int, period: int, skis: int, snowboards: int) -> int:
+    """
+    The hard-coded branch ladder estimateRental used before tariffs.json.
+    """
+    if rental_type == 1 and period >= 4:
+        rental_type = 2
+        period = int((period - 4) / 24) + 1
+    if rental_type == 2 and period >= 4:
+        rental_type = 3
+        period = int((period - 4) / 7) + 1
+    if rental_type == 1:
+        return period * 15 * skis + period * 10 * snowboards
+    if rental_type == 2:
+        return period * 50 * skis + period * 40 * snowboards
+    if rental_type == 3:
+        return period * 200 * skis + period * 160 * snowboards
+    return 0
+
+
+@benchmark("tariffs")
+def bench_tariffs(args) -> None:
+    """
+    Compares the compiled integer-cents tariff with the old float branch ladder.
+    """
+    count = args.count
+    starts, returns, skis, boards, types, _ = make_return_records(count)
+    periods = [ret - start for start, ret in zip(starts, returns)]
+    tariff = active_tariff()
+    subtotal_cents = tariff.subtotal_cents
+    estimate_cents = tariff.estimate_cents
+
+    started = time.perf_counter()
+    ladder = [ladder_subtotal(t, p, s, b) for t, p, s, b in zip(types, periods, skis, boards)]
+    ladder_time = time.perf_counter() - started
+    started = time.perf_counter()
+    cents = [subtotal_cents(t, p.days, p.seconds, s, b)
+             for t, p, s, b in zip(types, periods, skis, boards)]
+    tariff_time = time.perf_counter() - started
+    worst = max(abs(old - new / 100) for old, new in zip(ladder, cents))
+    if worst > 0.005:
+        raise AssertionError(f"tariff subtotals differ from the ladder by up to ${worst:.4f}")
+    print(f"tariffs: {count:,} final costs: ladder {count / ladder_time:,.0f}/s, "
+          f"tariff {count / tariff_time:,.0f}/s, largest difference ${worst:.4f}")
+
+    quotes = [(t, p % 200, s, b) for t, p, s, b in
+              zip(types, range(count), skis, boards)]
+    started = time.perf_counter()
+    ladder = [ladder_estimate(*quote) for quote in quotes]
+    ladder_time = time.perf_counter() - started
+    started = time.perf_counter()
+    cents = [estimate_cents(*quote) for quote in quotes]
+    tariff_time = time.perf_counter() - started
+    if any(old * 100 != new for old, new in zip(ladder, cents)):
+        raise AssertionError("tariff estimates differ from the ladder")
+    print(f"tariffs: {count:,} estimates: ladder {count / ladder_time:,.0f}/s, "
+          f"tariff {count / tariff_time:,.0f}/s")
+
+
+@benchmark("discounts")
+def bench_discounts(args) -> None:
+    """
+    Matches codes against a large registry and against a linear scan of the same rules.
+    """
+    count = args.count
+    rng = random.Random(4)
+    lines = [f"exact SKI{i:06d} 5 uses=3" for i in range(10000)]
+    lines += [f"prefix CORP{i:03d}- 20 stacking=replace" for i in range(1000)]
+    lines += ["suffix BBP 10 length=6"]
+    rules = parse_rules("\n".join(lines))
+    registry = DiscountRegistry(rules)
+    codes = [rng.choice([f"SKI{rng.randrange(20000):06d}", f"CORP{rng.randrange(2000):03d}-X",
+                         "abcBBP", "NOPE"]) for _ in range(count)]
+
+    def scan(code):
+        for rule in rules:
+            if rule.kind == "exact" and code == rule.pattern:
+                return rule
+        for rule in rules:
+            if ((rule.kind == "prefix" and code.startswith(rule.pattern)
+                 or rule.kind == "suffix" and code.endswith(rule.pattern))
+                    and (not rule.length or rule.length == len(code))):
+                return rule
+        return None
+
+    sample = codes[:max(1, count // 100)]
+    started = time.perf_counter()
+    scanned = [scan(code) for code in sample]
+    scan_time = time.perf_counter() - started
+    match = registry.match
+    started = time.perf_counter()
+    matched = [match(code) for code in codes]
+    match_time = time.perf_counter() - started
+    if scanned != matched[:len(sample)]:
+        raise AssertionError("registry matches differ from a linear scan")
+    print(f"discounts: {len(rules):,} rules: scan {len(sample) / scan_time:,.0f} codes/s, "
+          f"registry {count / match_time:,.0f} codes/s")
+
+
+@benchmark("invoices")
+def bench_invoices(args) -> None:
+    """
+    Renders return invoices with list joins and with the compiled template, then
+    archives them through InvoiceArchive.
+    """
+    count = args.count
+    rows = [(f"Customer {i}", i % 5, i % 4, i % 9, i % 24, i % 60, i % 60,
+             i * 1.25, i * 0.95) for i in range(count)]
+
+    started = time.perf_counter()
+    joined = ["\n".join([
+        "RENTAL RETURN INVOICE",
+        f"Customer Name: {name}",
+        "Equipment Rented:",
+        f"  Skis: {skis}",
+        f"  Snowboards: {boards}",
+        f"Duration: {days} days, {hours} hours, {minutes} minutes, {seconds} seconds",
+        f"Subtotal: ${subtotal:.2f}",
+        f"Final Total: ${total:.2f}"
+    ]) for name, skis, boards, days, hours, minutes, seconds, subtotal, total in rows]
+    join_time = time.perf_counter() - started
+
+    render = INVOICE.render
+    started = time.perf_counter()
+    rendered = [render(name=name, skis=skis, snowboards=boards, days=days, hours=hours,
+                       minutes=minutes, seconds=seconds, subtotal=subtotal, total=total)
+                for name, skis, boards, days, hours, minutes, seconds, subtotal, total in rows]
+    render_time = time.perf_counter() - started
+    if rendered != joined:
+        raise AssertionError("template output differs from the joined invoice")
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = InvoiceArchive(directory)
+        started = time.perf_counter()
+        for i, invoice in enumerate(rendered):
+            archive.add("2026-01-01", "return", str(i), invoice)
+        archive.flush()
+        archive_time = time.perf_counter() - started
+        if archive.reprint(str(count - 1)) != rendered[-1]:
+            raise AssertionError("reprint does not match the archived invoice")
+    print(f"invoices: {count:,} renders: join {count / join_time:,.0f}/s, "
+          f"template {count / render_time:,.0f}/s; archived {count / archive_time:,.0f}/s")
+
+
+@benchmark("audit")
+def bench_audit(args) -> None:
+    """
+    Re-prices a database of returns with 1, 2, 4... worker processes up to the CPU count.
+    """
+    count = args.count
+    starts, returns, skis, boards, types, discounts = make_return_records(count)
+    _, totals = price_returns(starts, returns, skis, boards, types, discounts)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "audit.db")
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        with connection:
+            connection.executemany(
+                "INSERT INTO rentals (customer_id, customer_name, rental_type, skis, snowboards, "
+                "discount_code, start_time, return_time, subtotal, final_total) "
+                "VALUES (?, '', ?, ?, ?, ?, ?, ?, 0, ?)",
+                ((str(i), types[i], skis[i], boards[i], discounts[i], to_micros(starts[i]),
+                  to_micros(returns[i]), totals[i]) for i in range(count)))
+        connection.close()
+
+        cpus = os.cpu_count() or 1
+        workers = 1
+        baseline = None
+        while True:
+            started = time.perf_counter()
+            report = run_audit(path, workers, shard_size=max(1000, count // (4 * cpus)))
+            elapsed = time.perf_counter() - started
+            if report.records != count or report.discrepancies:
+                raise AssertionError(f"audit found {report.discrepancies} discrepancies "
+                                     f"in {report.records} records")
+            baseline = baseline or elapsed
+            print(f"audit: {count:,} returns, {workers} worker(s): {elapsed:.2f}s "
+                  f"({count / elapsed:,.0f}/s, {baseline / elapsed:.1f}x)")
+            if workers >= cpus:
+                break
+            workers = min(workers * 2, cpus)
+
+
+@benchmark("estimate")
+def bench_estimate(args) -> None:
+    """
+    Measures RentalUILogic.estimate with a typical counter mix of repeated quotes.
+    """
+    count = args.count
+    rng = random.Random(2)
+    requests = [(rng.randrange(0, 4), rng.randrange(0, 3), rng.randrange(1, 4),
+                 rng.randrange(1, 6), rng.choice(["", "ABCBBP"])) for _ in range(count)]
+
+    for cache_size, label in ((1, "no reuse"), (256, "cached")):
+        logic = RentalUILogic(quote_cache_size=cache_size, output=NullSink())
+        logic.set_shop(100, 100)
+        started = time.perf_counter()
+        for request in requests:
+            logic.estimate(*request)
+        elapsed = time.perf_counter() - started
+        print(f"estimate ({label}): {count / elapsed:,.0f} quotes/s {logic.quotes.stats()}")
+
+
+@benchmark("journal")
+def bench_journal_replay(args) -> None:
+    """
+    Writes a journal of count rent/return events and measures crash recovery.
+    """
+    count = args.count
+    with tempfile.TemporaryDirectory() as directory:
+        journal = RentalJournal(directory, commit_every=4096, snapshot_every=count + 1)
+        started = time.perf_counter()
+        journal.append(["shop", count, count])
+        start = 63_839_000_000_000_000
+        for i in range(count // 2):
+            journal.append(["rent", str(i), "Guest", start + i, 1 + i % 3, 1, 1, ""])
+            if i >= 1000:
+                journal.append(["return", str(i - 1000), start + i, 25.0])
+        journal.close()
+        written = time.perf_counter() - started
+        size = os.path.getsize(journal.journal_path)
+
+        logic = RentalUILogic(journal=RentalJournal(directory), output=NullSink())
+        started = time.perf_counter()
+        logic.restore()
+        replayed = time.perf_counter() - started
+        events = logic.journal.seq
+        print(f"journal: {events:,} events, {size / 2 ** 20:.1f} MiB")
+        print(f"  write:  {written:.2f}s ({events / written:,.0f} events/s)")
+        print(f"  replay: {replayed:.2f}s ({events / replayed:,.0f} events/s), "
+              f"{len(logic.customer_rentals)} open rentals")
+
+
+@benchmark("contention")
+def bench_contention(args) -> None:
+    """
+    Runs rent/return cycles from 1 to 8 counter threads against one shop.
+
+    Stock is deliberately scarce so threads fight over the last units; the
+    shop must end with its full inventory back.
+    """
+    count = args.count
+    rent_time = datetime(2024, 1, 6, 9, 0)
+    return_time = rent_time + timedelta(hours=2)
+    for threads in (1, 2, 4, 8):
+        stock = max(1, threads // 2)
+        logic = RentalUILogic(output=NullSink())
+        logic.set_shop(stock, stock)
+        per_thread = max(1, count // threads)
+        failed = [0] * threads
+
+        def counter(index: int) -> None:
+            for i in range(per_thread):
+                customer_id = f"{index}-{i}"
+                summary = logic.new_rental(customer_id, "Guest", 1, 1, 1, rent_time)
+                if summary.startswith("Order Summary"):
+                    logic.return_rental(customer_id, return_time)
+                else:
+                    failed[index] += 1
+
+        workers = [threading.Thread(target=counter, args=(index,)) for index in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        if (logic.get_current_skis(), logic.get_current_snowboards()) != (stock, stock):
+            raise AssertionError("inventory was not fully restored after concurrent rentals")
+        attempts = per_thread * threads
+        completed = attempts - sum(failed)
+        print(f"contention: {threads} thread(s): {attempts / elapsed:,.0f} attempts/s, "
+              f"{completed / elapsed:,.0f} rent+return cycles/s, {sum(failed)} rejected for stock")
+
+
+@benchmark("snapshots")
+def bench_snapshots(args) -> None:
+    """
+    Runs rent/return cycles on 1 and 4 counter threads while two dashboard
+    threads read inventory and totals as fast as they can.
+
+    Dashboards read the live objects without a lock, the live objects under
+    the logic's lock, or the published view. Every rental takes one ski, so
+    a consistent read always has open rentals equal to skis out; reads where
+    they differ are counted as torn.
+    """
+    count = args.count
+    rent_time = datetime(2024, 1, 6, 9, 0)
+    return_time = rent_time + timedelta(hours=2)
+
+    def read_live(logic):
+        shop = logic.shop
+        return shop.SkiInventory - shop.CurrentSki, len(logic.customer_rentals), logic.revenu
+
+    def read_locked(logic):
+        with logic._lock:
+            return read_live(logic)
+
+    def read_view(logic):
+        view = logic.snapshot()
+        return view.ski_fleet - view.skis, view.open_rentals, view.revenue
+
+    for writers in (1, 4):
+        for mode, read in (("live", read_live), ("locked", read_locked), ("view", read_view)):
+            logic = RentalUILogic(output=NullSink())
+            logic.set_shop(count, count)
+            done = threading.Event()
+            reads = [0, 0]
+            torn = [0, 0]
+            per_writer = max(2, count // writers)
+
+            def dashboard(index: int) -> None:
+                while not done.is_set():
+                    out, open_rentals, _ = read(logic)
+                    reads[index] += 1
+                    if out != open_rentals:
+                        torn[index] += 1
+
+            def counter(index: int) -> None:
+                for i in range(per_writer):
+                    logic.new_rental(f"{index}-{i}", "Guest", 1, 0, 1, rent_time)
+                    if i % 2:
+                        logic.return_rental(f"{index}-{i - 1}", return_time)
+
+            readers = [threading.Thread(target=dashboard, args=(index,)) for index in range(2)]
+            counters = [threading.Thread(target=counter, args=(index,))
+                        for index in range(writers)]
+            for reader in readers:
+                reader.start()
+            started = time.perf_counter()
+            for thread in counters:
+                thread.start()
+            for thread in counters:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            done.set()
+            for reader in readers:
+                reader.join()
+            if mode == "view" and sum(torn):
+                raise AssertionError("a published view was torn")
+            print(f"snapshots: {writers} counter(s), {mode:<6} "
+                  f"{per_writer * writers / elapsed:,.0f} rentals/s, "
+                  f"dashboards {sum(reads) / elapsed:,.0f} reads/s, {sum(torn):,} torn")
+
+
+def coordinator_counter(address: str, index: int, cycles: int, results) -> None:
+    """
+    One counter process: rent/return cycles through a CoordinatorClient.
+    """
+    client = CoordinatorClient(address)
+    rent_time = datetime(2024, 1, 6, 9, 0)
+    return_time = rent_time + timedelta(hours=2)
+    failed = 0
+    for i in range(cycles):
+        customer_id = f"{index}-{i}"
+        summary = client.new_rental(customer_id, "Guest", 1, 1, 1, rent_time)
+        if summary.startswith("Order Summary"):
+            client.return_rental(customer_id, return_time)
+        else:
+            failed += 1
+    client.close()
+    results.put((client.commits, client.conflicts, failed))
+
+
+@benchmark("coordinator")
+def bench_coordinator(args) -> None:
+    """
+    Runs rent/return cycles from 1 to 8 counter processes against one coordinator process.
+
+    Each round starts a fresh coordinator on a Unix socket with scarce stock,
+    so counters conflict on the stock versions; the shop must end with its
+    full inventory back.
+    """
+    count = args.count
+    here = os.path.dirname(os.path.abspath(__file__))
+    for processes in (1, 2, 4, 8):
+        stock = max(1, processes // 2)
+        with tempfile.TemporaryDirectory() as folder:
+            address = os.path.join(folder, "coordinator.sock")
+            coordinator = subprocess.Popen(
+                [sys.executable, os.path.join(here, "coordinator.py"), "--unix", address,
+                 "--skis", str(stock), "--snowboards", str(stock)],
+                stdout=subprocess.DEVNULL)
+            try:
+                while True:
+                    try:
+                        with socket.socket(socket.AF_UNIX) as probe:
+                            probe.connect(address)
+                        break
+                    except OSError:
+                        if coordinator.poll() is not None:
+                            raise RuntimeError("coordinator exited during startup")
+                        time.sleep(0.01)
+                per_process = max(1, count // processes)
+                results = multiprocessing.Queue()
+                counters = [multiprocessing.Process(target=coordinator_counter,
+                                                    args=(address, index, per_process, results))
+                            for index in range(processes)]
+                started = time.perf_counter()
+                for counter in counters:
+                    counter.start()
+                totals = [results.get() for _ in counters]
+                for counter in counters:
+                    counter.join()
+                elapsed = time.perf_counter() - started
+
+                check = CoordinatorClient(address)
+                restored = (check.skis, check.snowboards)
+                check.close()
+            finally:
+                coordinator.terminate()
+                coordinator.wait()
+        if restored != (stock, stock):
+            raise AssertionError("inventory was not fully restored after coordinated rentals")
+        commits, conflicts, failed = (sum(column) for column in zip(*totals))
+        attempts = per_process * processes
+        print(f"coordinator: {processes} process(es): {(attempts - failed) / elapsed:,.0f} "
+              f"rent+return cycles/s, {conflicts / attempts:.2f} conflicts per rental, "
+              f"{failed} rejected for stock")
+
+
+class ScriptedRentalUI(RentalUI):
+    """
+    RentalUI that skips clearing the screen, for driving it from a script.
+    """
+
+    def clear_console(self) -> None:
+        pass
+
+
+def make_ui_script(count: int) -> str:
+    """
+    Builds console input for count menu transactions: rentals alternating with
+    returns, an occasional inventory screen and invalid choice, then End of Day
+    and Exit.
+    """
+    lines = ["1000", "1000"]                                       # build_store
+    for i in range(count):
+        guest = i // 2
+        if i % 50 == 49:
+            lines += ["3", ""]                                     # inventory, wait
+        elif i % 50 == 48:
+            lines += ["9", ""]                                     # invalid choice, wait
+        elif i % 2 == 0:
+            lines += ["1", "Guest", str(guest + 1), "1", "1", "2", "3", "", "n", "y",
+                      "1:6:2024:09:00", ""]
+        else:
+            lines += ["2", str(guest + 1), "1:7:2024:10:30", ""]
+    lines += ["4", "", "7"]
+    return "\n".join(lines) + "\n"
+
+
+@benchmark("ui")
+def bench_scripted_ui(args) -> None:
+    """
+    Drives count scripted transactions through RentalUI.main_menu.
+
+    Before the dispatch loop every action re-entered main_menu, so this many
+    transactions ended in RecursionError.
+    """
+    count = args.count
+    script = make_ui_script(count)
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = io.StringIO(script), io.StringIO()
+    started = time.perf_counter()
+    try:
+        ui = ScriptedRentalUI(debug=True)
+        ui.main_menu()
+    except SystemExit:
+        pass
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+    elapsed = time.perf_counter() - started
+    if (ui.logic.get_current_skis(), len(ui.logic.customer_rentals)) != (1000, 0):
+        raise AssertionError("scripted session left rentals open")
+    print(f"ui: {count:,} transactions in {elapsed:.2f}s ({count / elapsed:,.0f}/s), "
+          f"revenue ${ui.logic.history()[-1].revenue:,.2f}")
+
+
+STARTUP_SCRIPT = """
+import sys, time
+started = time.perf_counter()
+from ConsoleUI import RentalUI
+ui = RentalUI(False, state_dir=sys.argv[1])
+print(time.perf_counter() - started, len(ui.logic.customer_rentals))
+"""
+
+
+@benchmark("startup")
+def bench_startup(args) -> None:
+    """
+    Times a fresh process from import to a ready main menu with count open
+    rentals, restored from the state file and from the journal snapshot.
+    """
+    count = args.count
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        logic = RentalUILogic(journal=RentalJournal(directory, commit_every=10_000),
+                              output=NullSink())
+        logic.set_shop(count * 4, count * 4)
+        base = datetime(2024, 1, 6, 9, 0)
+        for i in range(count):
+            logic.new_rental(str(i), f"Customer {i}", 2, 1, 1 + i % 3,
+                             base + timedelta(seconds=i), quiet=True)
+        logic.journal.write_snapshot(logic._snapshot_state())
+        logic.close()
+
+        def launch() -> float:
+            times = []
+            for _ in range(5):
+                started = time.perf_counter()
+                output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, directory],
+                                        cwd=here, capture_output=True, text=True, check=True)
+                wall = time.perf_counter() - started
+                ready, restored = output.stdout.split()
+                if int(restored) != count:
+                    raise AssertionError(f"restored {restored} rentals, expected {count}")
+                times.append((float(ready), wall))
+            return sorted(times)[len(times) // 2]
+
+        fast_ready, fast_wall = launch()
+        os.remove(os.path.join(directory, "state.bin"))
+        slow_ready, slow_wall = launch()
+    print(f"startup: {count:,} open rentals: state file {fast_ready * 1000:.0f} ms to menu "
+          f"({fast_wall * 1000:.0f} ms process), journal snapshot {slow_ready * 1000:.0f} ms "
+          f"({slow_wall * 1000:.0f} ms process)")
+
+
+@benchmark("menu")
+def bench_menu_navigation(args) -> None:
+    """
+    Measures MenuSystem history moves and a long scripted navigation session.
+    """
+    count = args.count
+    menu_system = MenuSystem()
+    menu_system.set_main_menu(MainMenu("Main", menu_system, False))
+    menu_system.running = True                      # move the cursor without showing menus
+    page = menu_system.get_menu(TestMenu1, "Test 1")
+    started = time.perf_counter()
+    for _ in range(count):
+        menu_system.navigate_to(page)
+    for _ in range(count):
+        menu_system.navigate_back()
+    for _ in range(count):
+        menu_system.navigate_forward()
+    elapsed = time.perf_counter() - started
+    print(f"menu: {3 * count:,} history moves at depth up to {count:,}: "
+          f"{3 * count / elapsed:,.0f} moves/s")
+
+    # Main -> Test 1 -> Test menu 2 -> Addition -> back x3, repeated, then exit.
+    rounds = max(1, count // 6)
+    script = "1\n1\n3\nb\nb\nb\n" * rounds + "3\n"
+    menu_system = MenuSystem()
+    menu_system.set_main_menu(MainMenu("Main", menu_system, False))
+    menu_system.set_default_headers()
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = io.StringIO(script), io.StringIO()
+    started = time.perf_counter()
+    try:
+        menu_system.show()
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+    elapsed = time.perf_counter() - started
+    print(f"menu: {6 * rounds:,} scripted screens in {elapsed:.2f}s, "
+          f"{len(menu_system.menuCache)} menu instances built")
+
+
+@benchmark("reservations")
+def bench_reservations(args) -> None:
+    """
+    Books count random windows over a season, then times availability queries.
+    """
+    count = args.count
+    rng = random.Random(13)
+    book = ReservationBook(max(1, count // 20), max(1, count // 40))
+    season = datetime(2025, 12, 1)
+    windows = []
+    for _ in range(count):
+        start = season + timedelta(minutes=15 * rng.randrange(4 * 24 * 120))
+        windows.append((start, start + timedelta(hours=rng.randrange(1, 24 * 7))))
+
+    started = time.perf_counter()
+    booked = 0
+    for i, (start, end) in enumerate(windows):
+        booked += bool(book.reserve(str(i), rng.randrange(4), rng.randrange(3), start, end))
+    elapsed = time.perf_counter() - started
+    print(f"reservations: {count:,} booking attempts ({booked:,} accepted) in {elapsed:.2f}s, "
+          f"{elapsed / count * 1e6:.1f} us each")
+
+    started = time.perf_counter()
+    for start, end in windows:
+        book.is_available(2, 1, start, end)
+    elapsed = time.perf_counter() - started
+    print(f"reservations: {count:,} availability checks, {elapsed / count * 1e6:.1f} us each "
+          f"({len(book.skis.peak) + len(book.snowboards.peak):,} tree nodes)")
+
+
+@benchmark("units")
+def bench_units(args) -> None:
+    """
+    Rents and returns units from a large fleet, then saves and restores the pool.
+    """
+    count = args.count
+    fleet = max(100_000, count)
+    rng = random.Random(17)
+    sizes = [rng.randrange(1, 5) for _ in range(count)]
+    pool = UnitPool(fleet, "SKI-")
+    out = []
+    started = time.perf_counter()
+    for size in sizes:
+        out.append(pool.allocate(size))
+        if len(out) > fleet // 8:
+            pool.release(out.pop(rng.randrange(len(out))))
+    elapsed = time.perf_counter() - started
+    print(f"units: {count:,} rentals from a fleet of {fleet:,} in {elapsed:.2f}s, "
+          f"{elapsed / count * 1e6:.1f} us each ({pool.count(OUT):,} out)")
+
+    started = time.perf_counter()
+    state = pool.to_state()
+    restored = UnitPool.from_state(state)
+    elapsed = time.perf_counter() - started
+    if restored.available != pool.available:
+        raise AssertionError("restored pool has a different number of free units")
+    print(f"units: saved and restored the pool in {elapsed * 1e3:.1f} ms, "
+          f"{len(pool.needs_service(3)):,} units rented 3+ times")
+
+
+CORE_CASES = {}
+
+
+def core_case(name: str):
+    """
+    Registers a core hot-path case. The decorated function takes an operation
+    count, builds any state it needs, and returns a callable run once per
+    operation with the operation index.
+    """
+    def register(func):
+        CORE_CASES[name] = func
+        return func
+    return register
+
+
+CORE_START = datetime(2024, 1, 6, 9, 0)
+
+
+@core_case("new_rental")
+def case_new_rental(count: int):
+    logic = RentalUILogic(output=NullSink())
+    logic.set_shop(count, count)
+    ids = [str(i) for i in range(count)]
+    types = [1 + i % 3 for i in range(count)]
+    new_rental = logic.new_rental
+    return lambda i: new_rental(ids[i], "Guest", 1, 1, types[i], CORE_START, "")
+
+
+@core_case("return_rental")
+def case_return_rental(count: int):
+    logic = RentalUILogic(output=NullSink())
+    logic.set_shop(count * 2, count * 2)
+    ids = [str(i) for i in range(count)]
+    rng = random.Random(3)
+    for i in range(count):
+        logic.new_rental(ids[i], "Guest", 1 + i % 3, 1, 1 + i % 3, CORE_START,
+                         "ABCBBP" if i % 4 == 0 else "", quiet=True)
+    returns = [CORE_START + timedelta(minutes=rng.randrange(30, 60 * 24 * 14))
+               for _ in range(count)]
+    return_rental = logic.return_rental
+    return lambda i: return_rental(ids[i], returns[i])
+
+
+@core_case("estimate_cached")
+def case_estimate_cached(count: int):
+    logic = RentalUILogic(output=NullSink())
+    logic.set_shop(100, 100)
+    rng = random.Random(4)
+    requests = [(rng.randrange(0, 4), rng.randrange(0, 3), rng.randrange(1, 4),
+                 rng.randrange(1, 6), "") for _ in range(count)]
+    estimate = logic.estimate
+    return lambda i: estimate(*requests[i])
+
+
+@core_case("estimate_uncached")
+def case_estimate_uncached(count: int):
+    logic = RentalUILogic(output=NullSink())
+    logic.set_shop(100, 100)
+    estimate = logic.estimate
+    return lambda i: estimate(2, 1, 1 + i % 3, i, "")
+
+
+def cost_case(rental_type: int, shortest: timedelta, longest: timedelta):
+    """
+    Builds a calculateRentalCost case whose return times stay inside one branch.
+    """
+    def prepare(count: int):
+        shop = Store(10, 10)
+        shop.Display_Inv()
+        rental = Rental("Bench", shop, 2, 1)
+        rental.rentalTime = CORE_START
+        rng = random.Random(5)
+        span = int((longest - shortest).total_seconds())
+        returns = [CORE_START + shortest + timedelta(seconds=rng.randrange(span))
+                   for _ in range(count)]
+        calculate = rental.calculateRentalCost
+        return lambda i: calculate(rental_type, returns[i])
+    return prepare
+
+
+core_case("cost_hourly")(cost_case(1, timedelta(minutes=10), timedelta(hours=3, minutes=29)))
+core_case("cost_hourly_to_daily")(cost_case(1, timedelta(hours=4), timedelta(hours=20)))
+core_case("cost_hourly_to_weekly")(
+    cost_case(1, timedelta(days=3, hours=4), timedelta(days=3, hours=20)))
+core_case("cost_daily")(cost_case(2, timedelta(days=1), timedelta(days=3, hours=23)))
+core_case("cost_daily_to_weekly")(cost_case(2, timedelta(days=4), timedelta(days=13)))
+core_case("cost_weekly")(cost_case(3, timedelta(days=7), timedelta(days=30)))
+
+
+@core_case("inventory_check")
+def case_inventory_check(count: int):
+    logic = RentalUILogic(output=NullSink())
+    logic.set_shop(3, 2)
+    check = logic.is_inventory_sufficient
+    return lambda i: check(i % 5, i % 3)
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """
+    Returns the value at the given fraction of an already sorted sequence.
+    """
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def time_core_case(prepare, count: int) -> dict:
+    """
+    Times count operations one by one on a freshly prepared case.
+    """
+    op = prepare(count)
+    latencies = array("q", bytes(8 * count))
+    clock = time.perf_counter_ns
+    gc.collect()
+    started = clock()
+    for i in range(count):
+        before = clock()
+        op(i)
+        latencies[i] = clock() - before
+    elapsed = (clock() - started) / 1e9
+
+    ordered = sorted(latencies)
+    return {
+        "seconds": elapsed,
+        "ops_per_sec": count / elapsed,
+        "p50_us": percentile(ordered, 0.50) / 1000,
+        "p90_us": percentile(ordered, 0.90) / 1000,
+        "p99_us": percentile(ordered, 0.99) / 1000,
+        "max_us": ordered[-1] / 1000,
+    }
+
+
+WARMUP_OPS = 1000
+
+
+def run_core_case(prepare, count: int, memory: bool, repeats: int = 5) -> dict:
+    """
+    Times count operations one by one and, optionally, their peak memory.
+
+    A short warm-up run comes first, then repeats timed runs. Throughput is
+    taken from the fastest run, since noise only ever slows a run down, and
+    the latency percentiles are medians over the runs; spread records
+    how far the slowest run fell below the best. Memory is measured in a
+    separate run because tracemalloc slows every allocation and would
+    distort the timings.
+    """
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        time_core_case(prepare, min(count, WARMUP_OPS))
+        runs = [time_core_case(prepare, count) for _ in range(max(1, repeats))]
+
+        peak = None
+        if memory:
+            op = prepare(count)
+            gc.collect()
+            tracemalloc.start()
+            for i in range(count):
+                op(i)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+    best = min(run["seconds"] for run in runs)
+    slowest = max(run["seconds"] for run in runs)
+    return {
+        "ops": count,
+        "repeats": len(runs),
+        "seconds": round(best, 6),
+        "ops_per_sec": round(count / best, 1),
+        "spread": round(1 - best / slowest, 4),
+        "p50_us": median["p50_us"],
+        "p90_us": median["p90_us"],
+        "p99_us": median["p99_us"],
+        "max_us": median["max_us"],
+        "peak_memory_bytes": peak,
+    }
+
+
+P99_SLACK_US = 5.0
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Lists results that are slower than the baseline by more than tolerance.
+
+    Throughput must not drop by more than tolerance, widened to the spread
+    the baseline measured between its repeats when that is larger, so a noisy
+    baseline machine does not report false regressions. The run being checked
+    cannot widen its own allowance. p99 latency must not grow by
+    more than twice that and more than P99_SLACK_US, since the tail of
+    sub-microsecond operations is dominated by timer and scheduler noise.
+    """
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        allowed = max(tolerance, expected.get("spread", 0.0))
+        if result["ops_per_sec"] < expected["ops_per_sec"] * (1 - allowed):
+            regressions.append(f"{key}: {result['ops_per_sec']:,.0f} ops/s vs baseline "
+                               f"{expected['ops_per_sec']:,.0f}")
+        if (result["p99_us"] > expected["p99_us"] * (1 + 2 * allowed)
+                and result["p99_us"] - expected["p99_us"] > P99_SLACK_US):
+            regressions.append(f"{key}: p99 {result['p99_us']:.2f}us vs baseline "
+                               f"{expected['p99_us']:.2f}us")
+    return regressions
+
+
+@benchmark("core")
+def bench_core(args) -> None:
+    """
+    Runs the core hot-path cases at every size, writes JSON and checks the baseline.
+    """
+    names = args.cases.split(",") if args.cases else list(CORE_CASES)
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {}
+    print(f"{'case':<24}{'ops':>10}{'ops/s':>14}{'p50 us':>10}{'p99 us':>10}{'peak KiB':>11}")
+    for name in names:
+        if name not in CORE_CASES:
+            raise SystemExit(f"unknown core case '{name}', choose from {', '.join(CORE_CASES)}")
+        for size in sizes:
+            result = run_core_case(CORE_CASES[name], size, not args.no_memory, args.repeats)
+            results[f"{name}@{size}"] = result
+            peak = "-" if result["peak_memory_bytes"] is None \
+                else f"{result['peak_memory_bytes'] / 1024:,.0f}"
+            print(f"{name:<24}{size:>10,}{result['ops_per_sec']:>14,.0f}"
+                  f"{result['p50_us']:>10.2f}{result['p99_us']:>10.2f}{peak:>11}")
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}")
+    elif args.baseline:
+        print(f"No baseline at {args.baseline}; use --save-baseline to create one")
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Rental system benchmarks")
+    parser.add_argument("names", nargs="*", default=["core"],
+                        help=f"Benchmarks to run: {', '.join(sorted(BENCHMARKS))} (default: core)")
+    parser.add_argument("-n", "--count", type=int, default=100_000,
+                        help="Operations for the non-core benchmarks")
+    parser.add_argument("--sizes", default="1000,100000,1000000",
+                        help="Comma-separated operation counts for the core suite")
+    parser.add_argument("--cases", help="Comma-separated core cases (default: all)")
+    parser.add_argument("--output", default="benchmark_results.json",
+                        help="Where to write core suite results")
+    parser.add_argument("--baseline", help="Core results file to compare against")
+    parser.add_argument("--save-baseline", help="Also write these results as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed fractional throughput drop before failing")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Timed runs per core case; throughput is taken from the "
+                             "best run and latency percentiles are medians")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the peak-memory pass of the core suite")
+    args = parser.parse_args(argv)
+
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark '{name}', choose from {', '.join(sorted(BENCHMARKS))}")
+        BENCHMARKS[name](args)
+
+
+if __name__ == "__main__":
+    main()
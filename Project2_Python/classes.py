@@ -1,4 +1,9 @@
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime
+from sinks import ConsoleSink
+from tariffs import active_tariff
+from discounts import active_registry, apply_discount
+from units import UnitPool
 
 class Customer:
     def __init__(self, name, IDnumber):
@@ -22,19 +27,22 @@ class Customer:
         
         try:
             if intSkisRented < 0 or intSnowboardsRented < 0:                                          #Skis and Snowboards must be positive.
-                print("Invalid input. Number of skis and/or snowboards has to be positive!")
+                self.storeName.output.emit("invalid_request",
+                                           "Invalid input. Number of skis and/or snowboards has to be positive!")
                 return -1
             else:
                 self.Skis = intSkisRented                                           #Return Skis
                 self.Snowboards = intSnowboardsRented                               #Return Snowboards.
             # self.Inventory_Check()   Commented by Gleb
             if self.Skis > self.storeName.CurrentSki or self.Snowboards > self.storeName.CurrentSnow:
-                print("Value of Skis and/or Snowboards is greater than available amount")
+                self.storeName.output.emit("insufficient_stock",
+                                           "Value of Skis and/or Snowboards is greater than available amount")
                 return -1
             return self.Skis, self.Snowboards
         
         except ValueError:                                                          #Else give a user error.
-            print("That's not a number! Please enter a valid number.")              #Ask for a valid input.
+            self.storeName.output.emit("invalid_request",
+                                       "That's not a number! Please enter a valid number.")  #Ask for a valid input.
             return -1
 
             
@@ -59,6 +67,7 @@ class Store:
     The Store the customer can access to be able to see the inventory and stores the Total Transactions.
     """
     dblTotalTransaction = 0
+    output = ConsoleSink()                                                          #Where messages go; see sinks.py.
 
     def __init__(self, SkiInventory = 100, SnowboardInventory = 100):
         self.SkiInventory = SkiInventory
@@ -67,9 +76,85 @@ class Store:
     def Display_Inv(self):                                                          #Let the user know the available stock.
         self.CurrentSki = self.SkiInventory                     
         self.CurrentSnow = self.SnowboardInventory
+        self.skiLock = threading.Lock()                                             #One lock per equipment class so ski
+        self.snowLock = threading.Lock()                                            #and snowboard counters don't contend.
+        self.skiUnits = UnitPool(self.SkiInventory, "SKI-")                         #Which serial numbers are on the shelf,
+        self.snowUnits = UnitPool(self.SnowboardInventory, "SNB-")                  #rented out or retired.
 ##        print(f"Current Ski Inventory is {self.CurrentSki}.")
 ##        print(f"Current Snowboard Inventory is {self.CurrentSnow}.")
 
+    def takeSkis(self, intSkis):
+        """
+        Atomically checks and takes skis from the available stock. Returns the units taken, or None if there are not enough.
+        """
+        with self.skiLock:
+            units = self.skiUnits.allocate(intSkis)
+            if units is not None:
+                self.CurrentSki -= intSkis
+            return units
+
+    def takeSnowboards(self, intSnowboards):
+        """
+        Atomically checks and takes snowboards from the available stock. Returns the units taken, or None if there are not enough.
+        """
+        with self.snowLock:
+            units = self.snowUnits.allocate(intSnowboards)
+            if units is not None:
+                self.CurrentSnow -= intSnowboards
+            return units
+
+    def releaseSkis(self, skiUnits):
+        """
+        Puts returned skis back into the available stock.
+        """
+        with self.skiLock:
+            self.CurrentSki += self.skiUnits.release(skiUnits)
+
+    def releaseSnowboards(self, snowUnits):
+        """
+        Puts returned snowboards back into the available stock.
+        """
+        with self.snowLock:
+            self.CurrentSnow += self.snowUnits.release(snowUnits)
+
+    def equipmentUnits(self, strEquipment):
+        """
+        Returns the unit pool and lock for "ski" or "snowboard".
+        """
+        if strEquipment == "ski":
+            return self.skiUnits, self.skiLock
+        if strEquipment == "snowboard":
+            return self.snowUnits, self.snowLock
+        raise ValueError(f"Unknown equipment {strEquipment!r}.")
+
+    def retireUnit(self, strEquipment, intUnit):
+        """
+        Takes a damaged unit out of the fleet. A rented unit is retired when it comes back.
+        """
+        pool, lock = self.equipmentUnits(strEquipment)
+        with lock:
+            onShelf = pool.retire(intUnit)                                          #Raises if already retired.
+            if strEquipment == "ski":
+                self.SkiInventory -= 1
+                self.CurrentSki -= onShelf
+            else:
+                self.SnowboardInventory -= 1
+                self.CurrentSnow -= onShelf
+
+    def reinstateUnit(self, strEquipment, intUnit):
+        """
+        Brings a retired unit back into the fleet.
+        """
+        pool, lock = self.equipmentUnits(strEquipment)
+        with lock:
+            onShelf = pool.reinstate(intUnit)                                       #Raises if not retired.
+            if strEquipment == "ski":
+                self.SkiInventory += 1
+                self.CurrentSki += onShelf
+            else:
+                self.SnowboardInventory += 1
+                self.CurrentSnow += onShelf
+
 class Rental(Store):
         """
         Our constructor method which instantiates various Rental Objects.
@@ -81,33 +166,15 @@ class Rental(Store):
             self.storeName = storeName
             self.Skis = Skis
             self.Snowboards = Snowboards
+            self.rentedSkiUnits = []                                            #Serial numbers handed out.
+            self.rentedSnowUnits = []
         
         def estimateRental(self,rentalType, rentalPeriod):
             """
             Estimate the cost and how much each rental would cost whether it is hourly, daily, or weekly.
             """
-            self.rentalEstimate = 0
-                                                                   #Rental period is an assumption of time input by the user when calling the function
-
-            if rentalType == 1 and rentalPeriod >= 4:              #If the hours becomes greater than 4. 
-                rentalType = 2                                     #Change the rental type to Daily.
-                rentalPeriod -= 4                                  #Update it to be 1 Day instead.
-                rentalPeriod = int(rentalPeriod / 24) + 1          #Rounds the leftover hours to days adding one from the change
-            if rentalType == 2 and rentalPeriod >= 4:              #If the Days becomes greater than 4.
-                rentalType = 3                                     #Change the rental type to Weekly.
-                rentalPeriod -= 4                                  #Update it to be 1 week instead.
-                rentalPeriod = int(rentalPeriod / 7) + 1           #Rounds the leftover days to weeks adding one from the change
-
-            if rentalType == 1:     #Hourly Cost.
-                self.rentalEstimate = rentalPeriod * 15 * self.Skis + rentalPeriod * 10 * self.Snowboards
-##                print("The estimated cost of the rental is {}.".format(rentalEstimate))
-            elif rentalType == 2:   #Daily Cost.
-                self.rentalEstimate = rentalPeriod * 50 * self.Skis + rentalPeriod * 40 * self.Snowboards
-##                print("The estimated cost of the rental is {}.".format(rentalEstimate))
-            elif rentalType == 3:   #Weekly Cost.
-                self.rentalEstimate = rentalPeriod * 200 * self.Skis + rentalPeriod * 160 * self.Snowboards
-##                print("The estimated cost of the rental is {}.".format(rentalEstimate))
-            
+            self.rentalEstimate = active_tariff().estimate_cents(rentalType, rentalPeriod,   #Prices and escalation thresholds
+                                                                 self.Skis, self.Snowboards) / 100  #come from tariffs.json.
 
 
         def rentSkis(self, rentalType):
@@ -116,30 +183,23 @@ class Rental(Store):
             """
 
             if self.Skis <= 0:                                                               #Reject invalid inputs.
-                print("Number of Skis should be positive!")
+                self.storeName.output.emit("invalid_request", "Number of Skis should be positive!")
                 return None
             elif self.Skis > self.storeName.SkiInventory:                                    #Let the user know Skis
-                print("Sorry! We have {} skis availble to rent.".format(self.storeName.SkiInventory))  #available.
+                self.storeName.output.emit("insufficient_stock",                             #available.
+                                           "Sorry! We have {} skis availble to rent.".format(self.storeName.SkiInventory))
+                return None
+            if rentalType not in active_tariff().types:                                      #Hourly, daily or weekly only.
+                return None
+            units = self.storeName.takeSkis(self.Skis)                                      #Check and take stock in one step
+            if units is None:                                                                #so counters can't race.
+                self.storeName.output.emit("insufficient_stock",
+                                           "Sorry! We have {} skis availble to rent.".format(self.storeName.CurrentSki))
                 return None
             else:
-                if rentalType == 1:                                                           #Calculate hourly basis.
-                    self.rentalTime = datetime.now()
-##                    print("You have rented {} skis on a hourly basis today at {} hours.".format(self.Skis,self.rentalTime.hour))
-##                    print("You will be charged $15 an hour for each hour for each ski.")
-                    self.storeName.CurrentSki -= self.Skis
-                    return self.rentalTime
-                elif rentalType == 2:                                                         #Calculate Daily Basis.
-                    self.rentalTime = datetime.now()
-##                    print("You have rented {} skis on a daily basis today at {} hours.".format(self.Skis,self.rentalTime.hour))
-##                    print("You will be charged $50 an hour for each hour for each ski.")
-                    self.storeName.CurrentSki -= self.Skis
-                    return self.rentalTime
-                elif rentalType == 3:                                                         #Calculate Weekly Basis.
-                    self.rentalTime = datetime.now()
-##                    print("You have rented {} skis on a weekly basis today at {} hours.".format(self.Skis,self.rentalTime.hour))
-##                    print("You will be charged $200 per week for each ski.")
-                    self.storeName.CurrentSki -= self.Skis
-                    return self.rentalTime
+                self.rentedSkiUnits = units
+                self.rentalTime = datetime.now()
+                return self.rentalTime
 
         def rentSnowboards(self, rentalType):
             """
@@ -147,29 +207,23 @@ class Rental(Store):
             """
             
             if self.Snowboards <= 0:                                                  #Reject invalid inputs.
-                print("Number of Snowboards should be positive!")
+                self.storeName.output.emit("invalid_request", "Number of Snowboards should be positive!")
                 return None
             elif self.Snowboards > self.storeName.SnowboardInventory:                 #Let the user know Snowbords available.
-                print("Sorry! We have {} skis availble to rent.".format(self.storeName.SnowboardInventory))
+                self.storeName.output.emit("insufficient_stock",
+                                           "Sorry! We have {} skis availble to rent.".format(self.storeName.SnowboardInventory))
+                return None
+            if rentalType not in active_tariff().types:                               #Hourly, daily or weekly only.
+                return None
+            units = self.storeName.takeSnowboards(self.Snowboards)                   #Check and take stock in one step.
+            if units is None:
+                self.storeName.output.emit("insufficient_stock",
+                                           "Sorry! We have {} snowboards availble to rent.".format(self.storeName.CurrentSnow))
                 return None
             else:
-                if rentalType == 1:                                                   #Calculate Hourly Basis.
-                    self.rentalTime = datetime.now()
-##                    print("You have rented {} snowboards on a hourly basis today at {} hours.".format(self.Snowboards,self.rentalTime.hour))
-##                    print("You will be charged $10 an hour for each hour for each snowboards.")
-                    self.storeName.CurrentSnow -= self.Snowboards
-                    return self.rentalTime
-                elif rentalType == 2:                                                 #Calcualte Daily Basis.
-                    self.rentalTime = datetime.now()
-##                    print("You have rented {} snowboards on a daily basis today at {} hours.".format(self.Snowboards,self.rentalTime.hour))
-##                    print("You will be charged $40 an hour for each hour for each snowboard.")
-                    self.storeName.CurrentSnow -= self.Snowboards    
-                    return self.rentalTime
-                elif rentalType == 3:                                                 #Calculate Weekly Basis.
-                    self.rentalTime = datetime.now()
-
-                    self.storeName.CurrentSnow -= self.Snowboards
-                    return self.rentalTime
+                self.rentedSnowUnits = units
+                self.rentalTime = datetime.now()
+                return self.rentalTime
 
                 
         def calculateRentalCost(self,rentalType,return_time=None):
@@ -179,24 +233,12 @@ class Rental(Store):
             actual_return_time = return_time if return_time is not None else datetime.now()
             rentalPeriod = actual_return_time - self.rentalTime
 
-            if rentalType == 1 and (round(rentalPeriod.seconds / 3600)) >= 4:       #If the hours becomes greater than 4. 
-                rentalType = 2                                                      #Change the rental type to Daily.
-                rentalPeriod += timedelta(days=1)                                   #Update it to be 1 Day instead.
-
-            if rentalType == 2 and (round(rentalPeriod.days)) >= 4:                 #If the Days becomes greater than 4.
-                rentalType = 3                                                      #Change the rental type to Weekly.
-                rentalPeriod += timedelta(days=7)                                  #Update it to be 1 week instead.
-
-            if rentalType == 1:     #Hourly Cost.
-                hours = max(1, rentalPeriod.seconds / 3600)
-                dblSubTotal = (hours * 15 * self.Skis) + (hours * 10 * self.Snowboards)
-            elif rentalType == 2:   #Daily Cost.
-                days = max(1, rentalPeriod.days) 
-                dblSubTotal = (days * 50 * self.Skis) + (days * 40 * self.Snowboards)
-            elif rentalType == 3:   #Weekly Cost.
-                weeks = max(1, rentalPeriod.days / 7) 
-                dblSubTotal = (weeks * 200 * self.Skis) + (weeks * 160 * self.Snowboards)
-            self.SubTotal = dblSubTotal
+            self.SubTotalCents = active_tariff().subtotal_cents(rentalType, rentalPeriod.days,   #Escalation to daily/weekly
+                                                                rentalPeriod.seconds,            #happens in the tariff.
+                                                                self.Skis, self.Snowboards)
+            self.SubTotal = self.SubTotalCents / 100
+            self.SubTotalBeforeDiscounts = self.SubTotalCents                #Kept for discount stacking rules.
+            self.familyApplied = False
             
             
         
@@ -205,22 +247,31 @@ class Rental(Store):
             Calculate the total Rental Cost after Family Discount is applied.
             """
 
-            if self.Skis + self.Snowboards < 3:                             #If Total number of equipment is less than 3.
-                return 0                                                    #Family Discount will be 0.
-            elif self.Skis + self.Snowboards > 5:                           #Else if total number of equipment greater than 5.
+            cents = active_tariff().family_discount(self.SubTotalCents, self.Skis + self.Snowboards)
+            if cents < 0:                                                   #Equipment count outside the family range.
                 return 0                                                    #Family Discount will be 0.
             else:                                                           #If equipment is 3, 4, or 5.
-                print("You have recieved a 25% off the total purchase!")    
-                self.SubTotal *= .75                                        #Total cost is reduced by 25%.
+                self.storeName.output.emit("discount", "You have recieved a {}% off the total purchase!".format(
+                    active_tariff().family_percent))
+                self.SubTotalCents = cents                                  #Total cost is reduced by 25%.
+                self.SubTotal = cents / 100
+                self.familyApplied = True
 
         def discountCode(self, strdiscountCode):                              
             """
-            Checking to see if the string code entered has the ending of "BBP"
+            Applies the discount code's rule from discounts.txt (e.g. codes ending in "BBP").
+            Caps and expiry are checked when the rental is taken out, not here.
             """
 
-            if strdiscountCode.endswith("BBP") and len(strdiscountCode) == 6:   #If Discount Code ends with BBP and is 6 characters.
-                self.SubTotal *= 0.90
-                print("Discount of 10% has been applied to your purchase")      #Customer recieves a 10% discount.
+            rule = active_registry().match(strdiscountCode)
+            if rule is not None:                                                #Exact code, prefix or suffix pattern.
+                cents = apply_discount(rule, self.SubTotalBeforeDiscounts,      #The rule decides whether it stacks
+                                       self.SubTotalCents, self.familyApplied)  #with the family discount.
+                self.SubTotalCents = cents
+                self.SubTotal = cents / 100
+                self.storeName.output.emit("discount",                          #Customer recieves the code's discount.
+                                           "Discount of {}% has been applied to your purchase".format(
+                                               rule.percent))
             # else:
             #     print("Discount Code entered is not accepted")
                 
@@ -239,8 +290,10 @@ class Rental(Store):
             Returns the inventory to reset the CurrentSki and CurrentSnow attributes in the shop
             """
 
-            self.storeName.CurrentSki += self.Skis
-            self.storeName.CurrentSnow += self.Snowboards
+            self.storeName.releaseSkis(self.rentedSkiUnits)             #The same serial numbers that went out.
+            self.storeName.releaseSnowboards(self.rentedSnowUnits)
+            self.rentedSkiUnits = []
+            self.rentedSnowUnits = []
             self.Skis = 0
             self.Snowboards = 0
 
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import random
+import socket
+import time
+from datetime import datetime
+
+from server import RentalServer, build_parser, serve
+
+
+class InventoryCoordinator(RentalServer):
+    """
+    Owns the shared shop and open rentals for several counter processes.
+
+    Speaks the same line-delimited JSON as RentalServer, plus two ops for
+    optimistic concurrency. Skis and snowboards each carry a version that
+    goes up whenever their shelf count drops, through a rental or a retired
+    unit. Returns and reinstated units only add stock, which cannot make a
+    counter's stock check wrong, so they leave the version alone and do not
+    turn other counters' rentals into conflicts. Every response also has a
+    "view" field, {"versions": [skis, snowboards], "skis": n, "snowboards": n},
+    with the versions and shelf counts after the request, so counters stay
+    current without asking.
+
+        view: no arguments; the result is just the view.
+        cas_rent: the new_rental fields plus "versions" as last seen by the
+            counter. The rental goes ahead only if the version of every
+            equipment type it takes is unchanged. The result has
+            "committed" and, if committed, the rental "summary".
+
+    Requests are handled one at a time on the event loop, so a version check
+    and the rental it guards can't be interleaved with another counter's.
+    """
+
+    def __init__(self, logic, max_pipeline: int = 128):
+        super().__init__(logic, max_pipeline)
+        self.versions = [0, 0]
+        self.handlers["view"] = self.handle_view
+        self.handlers["cas_rent"] = self.handle_cas_rent
+
+    def _stock(self) -> tuple:
+        shop = self.logic.shop
+        return shop.CurrentSki, shop.CurrentSnow
+
+    def answer(self, line: bytes) -> dict:
+        """
+        Runs one request, moves on the version of any stock it took and
+        attaches the resulting view.
+        """
+        before = self._stock()
+        response = super().answer(line)
+        after = self._stock()
+        for kind in (0, 1):
+            if after[kind] < before[kind]:
+                self.versions[kind] += 1
+        response["view"] = self.handle_view(None)
+        return response
+
+    def handle_view(self, request: dict) -> dict:
+        skis, snowboards = self._stock()
+        return {"versions": list(self.versions), "skis": skis, "snowboards": snowboards}
+
+    def handle_cas_rent(self, request: dict) -> dict:
+        expected = request["versions"]
+        amounts = (int(request["skis"]), int(request["snowboards"]))
+        if any(amounts[kind] and expected[kind] != self.versions[kind] for kind in (0, 1)):
+            return {"committed": False}
+        return {"committed": True, "summary": self.handle_new_rental(request)}
+
+
+class CoordinatorClient:
+    """
+    A counter's connection to an InventoryCoordinator.
+
+    Keeps the view of the shop that came back with the last reply and
+    checks stock against it locally. A rental is sent as a cas_rent with the
+    versions of that view; if another counter took stock first, the
+    rental is checked against the new view and sent again after a short,
+    randomized back-off. Offers the counter-side calls of RentalUILogic.
+    """
+
+    def __init__(self, address, max_retries: int = 16, backoff: float = 0.0005,
+                 max_backoff: float = 0.02):
+        """
+        Args:
+            address (str | tuple): Unix socket path, or (host, port) for TCP.
+            max_retries (int): Conflicts tolerated per rental before giving up.
+            backoff (float): First back-off in seconds; doubles on each conflict.
+            max_backoff (float): Longest back-off in seconds.
+
+        Attributes:
+            versions (list[int]): Ski and snowboard versions of the last view.
+            skis (int): Skis on the shelf in the last view.
+            snowboards (int): Snowboards on the shelf in the last view.
+            commits (int): cas_rent requests that passed the version check.
+            conflicts (int): cas_rent requests refused for a stale view.
+        """
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(address)
+        else:
+            self.socket = socket.create_connection(address)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile("rwb")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.versions = [0, 0]
+        self.skis = self.snowboards = 0
+        self.commits = 0
+        self.conflicts = 0
+        self._rng = random.Random()
+        self.refresh()
+
+    def _call(self, op: str, **fields):
+        """
+        Sends one request, keeps the view that comes back and returns the result.
+
+        Raises:
+            ConnectionError: If the coordinator closed the connection.
+            ValueError: If the coordinator rejected the request.
+        """
+        fields["op"] = op
+        self.file.write(json.dumps(fields, separators=(",", ":")).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("coordinator closed the connection")
+        response = json.loads(line)
+        view = response["view"]
+        self.versions = view["versions"]
+        self.skis = view["skis"]
+        self.snowboards = view["snowboards"]
+        if not response["ok"]:
+            raise ValueError(response["error"])
+        return response["result"]
+
+    def refresh(self) -> None:
+        """
+        Fetches the current view of the shop.
+        """
+        self._call("view")
+
+    def get_current_skis(self) -> int:
+        return self.skis
+
+    def get_current_snowboards(self) -> int:
+        return self.snowboards
+
+    def is_inventory_sufficient(self, skis: int, snowboards: int) -> bool:
+        """
+        Checks the request against the last view, fetching a new one if it falls short.
+        """
+        if self.skis >= skis and self.snowboards >= snowboards:
+            return True
+        self.refresh()
+        return self.skis >= skis and self.snowboards >= snowboards
+
+    def new_rental(self, customer_id: str, customer_name: str, skis_amount: int,
+                   snowboards_amount: int, rental_type: int, rent_time: datetime,
+                   discount_code: str = "", rental_period: int = 1) -> str:
+        """
+        Takes out a rental through compare-and-swap on the stock versions.
+
+        Returns:
+            str: Rental summary or failure message, as RentalUILogic.new_rental.
+        """
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            if not self.is_inventory_sufficient(skis_amount, snowboards_amount):
+                return "Inventory is not sufficient. Rental failed"
+            result = self._call("cas_rent", versions=self.versions, customer_id=customer_id,
+                                customer_name=customer_name, skis=skis_amount,
+                                snowboards=snowboards_amount, rental_type=rental_type,
+                                time=rent_time.isoformat(), discount_code=discount_code,
+                                rental_period=rental_period)
+            if result["committed"]:
+                self.commits += 1
+                return result["summary"]
+            self.conflicts += 1
+            if attempt < self.max_retries:
+                time.sleep(delay * self._rng.random())
+                delay = min(delay * 2, self.max_backoff)
+        return "Inventory is busy. Rental failed"
+
+    def return_rental(self, customer_id: str, return_time: datetime) -> str:
+        """
+        Returns a rental; returns never conflict, since they only add stock.
+        """
+        return self._call("return_rental", customer_id=customer_id,
+                          time=return_time.isoformat())
+
+    def estimate(self, skis: int, snowboards: int, rental_type: int,
+                 rental_period: int, discount_code: str) -> str:
+        return self._call("estimate", skis=skis, snowboards=snowboards, rental_type=rental_type,
+                          rental_period=rental_period, discount_code=discount_code)
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+
+def main(argv=None) -> None:
+    args = build_parser("Shared inventory coordinator for counter processes").parse_args(argv)
+    try:
+        asyncio.run(serve(args, InventoryCoordinator))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import os
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from tariffs import round_cents
+
+
+# One discount rule. kind is "exact", "prefix" or "suffix"; length, when not
+# 0, is the exact length a matching code must have. max_uses of 0 means no
+# cap. valid_from/valid_until are datetimes or None. stacking says what
+# happens when the family discount was also earned: "stack" applies both,
+# "replace" drops the family discount, "best" keeps whichever is cheaper.
+DiscountRule = namedtuple("DiscountRule", ["name", "kind", "pattern", "percent", "length",
+                                           "max_uses", "valid_from", "valid_until", "stacking"])
+
+STACKING = ("stack", "replace", "best")
+
+DISCOUNT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "discounts.txt")
+DEFAULT_RULES = "suffix BBP 10 length=6\n"
+
+
+def parse_rules(text: str, source: str = "<rules>") -> list:
+    """
+    Parses the compact rule format, one rule per line:
+
+        kind pattern percent [length=N] [uses=N] [from=ISO] [until=ISO]
+                             [stacking=stack|replace|best] [name=NAME]
+
+    Blank lines and lines starting with # are ignored.
+
+    Raises:
+        ValueError: On a malformed line, naming the source and line number.
+    """
+    rules = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            kind, pattern, percent, *options = line.split()
+            fields = dict(option.split("=", 1) for option in options)
+            unknown = set(fields) - {"length", "uses", "from", "until", "stacking", "name"}
+            if kind not in ("exact", "prefix", "suffix") or unknown:
+                raise ValueError(f"unknown kind or option {kind!r} {sorted(unknown)}")
+            stacking = fields.get("stacking", "stack")
+            if stacking not in STACKING:
+                raise ValueError(f"stacking must be one of {', '.join(STACKING)}")
+            rule = DiscountRule(
+                fields.get("name", f"{kind}:{pattern}"), kind, pattern, int(percent),
+                int(fields.get("length", 0)), int(fields.get("uses", 0)),
+                datetime.fromisoformat(fields["from"]) if "from" in fields else None,
+                datetime.fromisoformat(fields["until"]) if "until" in fields else None,
+                stacking)
+            if not 0 < rule.percent <= 100:
+                raise ValueError("percent must be between 1 and 100")
+        except ValueError as e:
+            raise ValueError(f"{source}:{number}: {e}") from None
+        rules.append(rule)
+    return rules
+
+
+class DiscountRegistry:
+    """
+    Discount codes and code patterns, matched without scanning the rules.
+
+    Exact codes are a dict lookup. Prefix and suffix patterns live in two
+    character tries (the suffix trie is keyed by the reversed pattern), so
+    matching a code costs one step per character no matter how many rules
+    there are. An exact code wins over patterns; among patterns the longest
+    matching prefix wins, then the longest matching suffix.
+    """
+
+    def __init__(self, rules=()):
+        """
+        Args:
+            rules (Iterable[DiscountRule]): Rules to register.
+
+        Raises:
+            ValueError: If two rules share a name.
+        """
+        self.exact: dict[str, DiscountRule] = {}
+        self.prefixes: dict = {}
+        self.suffixes: dict = {}
+        self.rules: dict[str, DiscountRule] = {}
+        self.uses: dict[str, int] = {}
+        self._lock = threading.Lock()
+        for rule in rules:
+            self.add(rule)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def add(self, rule: DiscountRule) -> None:
+        if rule.name in self.rules:
+            raise ValueError(f"Duplicate discount rule {rule.name!r}.")
+        self.rules[rule.name] = rule
+        if rule.kind == "exact":
+            self.exact[rule.pattern] = rule
+            return
+        node = self.prefixes if rule.kind == "prefix" else self.suffixes
+        for char in (rule.pattern if rule.kind == "prefix" else reversed(rule.pattern)):
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(rule)         # None holds the rules ending here
+
+    @staticmethod
+    def _walk(trie: dict, chars, length: int):
+        best = None
+        node = trie
+        for char in chars:
+            node = node.get(char)
+            if node is None:
+                break
+            for rule in node.get(None, ()):
+                if not rule.length or rule.length == length:
+                    best = rule
+        return best
+
+    def match(self, code: str):
+        """
+        Returns the rule a code matches, ignoring caps and expiry, or None.
+        """
+        if not code:
+            return None
+        rule = self.exact.get(code)
+        if rule is None:
+            rule = self._walk(self.prefixes, code, len(code))
+        if rule is None:
+            rule = self._walk(self.suffixes, reversed(code), len(code))
+        return rule
+
+    def check(self, code: str, when: datetime) -> tuple:
+        """
+        Looks a code up without using it.
+
+        Returns:
+            tuple[DiscountRule | None, str]: The rule and "" if the code can be
+            used at that time, otherwise None and the reason it cannot.
+        """
+        rule = self.match(code)
+        if rule is None:
+            return None, "is not accepted"
+        if rule.valid_from is not None and when < rule.valid_from:
+            return None, "is not valid yet"
+        if rule.valid_until is not None and when > rule.valid_until:
+            return None, "has expired"
+        if rule.max_uses and self.uses.get(rule.name, 0) >= rule.max_uses:
+            return None, "has reached its usage limit"
+        return rule, ""
+
+    def redeem(self, code: str, when: datetime) -> tuple:
+        """
+        Checks a code and, if it can be used, counts one use against its cap.
+
+        Returns:
+            tuple[DiscountRule | None, str]: As for check.
+        """
+        with self._lock:
+            rule, reason = self.check(code, when)
+            if rule is not None:
+                self.uses[rule.name] = self.uses.get(rule.name, 0) + 1
+            return rule, reason
+
+    def release(self, rule: DiscountRule) -> None:
+        """
+        Gives back a use counted by redeem for a rental that did not go ahead.
+        """
+        with self._lock:
+            if self.uses.get(rule.name, 0) > 0:
+                self.uses[rule.name] -= 1
+
+    def record_use(self, code: str) -> None:
+        """
+        Counts a use that was already accepted, e.g. when replaying a journal.
+        """
+        rule = self.match(code)
+        if rule is not None:
+            with self._lock:
+                self.uses[rule.name] = self.uses.get(rule.name, 0) + 1
+
+
+def apply_discount(rule: DiscountRule, subtotal: int, current: int, family_applied: bool) -> int:
+    """
+    Prices a code on top of the family discount according to its stacking rule.
+
+    Args:
+        rule (DiscountRule): The code being applied.
+        subtotal (int): Cents before any discount.
+        current (int): Cents after the family discount, if one was applied.
+        family_applied (bool): Whether the family discount was applied.
+
+    Returns:
+        int: Cents after the code.
+    """
+    keep = 100 - rule.percent
+    if not family_applied or rule.stacking == "stack":
+        return round_cents(current * keep, 100)
+    alone = round_cents(subtotal * keep, 100)
+    if rule.stacking == "replace":
+        return alone
+    return min(alone, current)
+
+
+def load_registry(path: str = None) -> DiscountRegistry:
+    """
+    Loads discount rules from a file in the compact format.
+
+    Args:
+        path (str, optional): File to read. Defaults to the RENTAL_DISCOUNTS
+            environment variable, then discounts.txt next to this module, then
+            the single BBP rule if neither exists.
+    """
+    path = path or os.environ.get("RENTAL_DISCOUNTS") or DISCOUNT_FILE
+    if not os.path.exists(path):
+        return DiscountRegistry(parse_rules(DEFAULT_RULES))
+    with open(path, "r", encoding="utf-8") as file:
+        return DiscountRegistry(parse_rules(file.read(), path))
+
+
+_active = None
+
+
+def active_registry() -> DiscountRegistry:
+    """
+    Returns the registry used by Rental, loading it on first use.
+    """
+    global _active
+    if _active is None:
+        _active = load_registry()
+    return _active
+
+
+def set_registry(registry: DiscountRegistry) -> None:
+    """
+    Replaces the registry used by Rental.
+    """
+    global _active
+    _active = registry
@@ -0,0 +1,140 @@
+import heapq
+
+
+class DueQueue:
+    """
+    Min-heap of open rentals ordered by expected return time.
+
+    Returns use lazy deletion: the customer's entry stays in the heap but is
+    no longer live, and is skipped by queries. The heap is rebuilt once stale
+    entries outnumber live ones, so it never grows beyond twice the number of
+    open rentals.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty queue.
+
+        Attributes:
+            heap (list[tuple]): (due, seq, customer_id) entries, due in microseconds.
+            live (dict[str, int]): Sequence number of each customer's current entry.
+        """
+        self.heap: list[tuple] = []
+        self.live: dict[str, int] = {}
+        self.stale = 0
+        self._seq = 0
+        self._columns = None
+
+    def __len__(self) -> int:
+        if self._columns is not None:
+            return len(self._columns[0])
+        return len(self.live)
+
+    @classmethod
+    def from_columns(cls, customer_ids, dues, lazy: bool = False) -> "DueQueue":
+        """
+        Builds a queue for many open rentals with one heapify instead of a push each.
+
+        Args:
+            customer_ids (Sequence[str]): Customer IDs, each appearing once.
+            dues (Sequence[int]): Due time of each rental, in microseconds.
+            lazy (bool): Keep the columns and build the heap on first use, so a
+                fast startup does not pay for it. The columns must not change
+                until then.
+        """
+        queue = cls()
+        queue._columns = (customer_ids, dues)
+        if not lazy:
+            queue._build()
+        return queue
+
+    def _build(self) -> None:
+        customer_ids, dues = self._columns
+        self._columns = None
+        count = len(customer_ids)
+        sequence = range(1, count + 1)
+        self.heap = list(zip(dues, sequence, customer_ids))
+        heapq.heapify(self.heap)
+        self.live = dict(zip(customer_ids, sequence))
+        self._seq = count
+
+    def push(self, customer_id: str, due: int) -> None:
+        """
+        Adds an open rental, replacing any earlier entry for the same customer.
+        """
+        if self._columns is not None:
+            self._build()
+        if customer_id in self.live:
+            self.stale += 1
+        self._seq += 1
+        self.live[customer_id] = self._seq
+        heapq.heappush(self.heap, (due, self._seq, customer_id))
+
+    def discard(self, customer_id: str) -> None:
+        """
+        Marks a customer's entry as returned.
+        """
+        if self._columns is not None:
+            self._build()
+        if self.live.pop(customer_id, None) is None:
+            return
+        self.stale += 1
+        heap = self.heap
+        live = self.live
+        while heap and live.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+            self.stale -= 1
+        if self.stale > len(live) and self.stale > 64:
+            self.heap = [entry for entry in heap if live.get(entry[2]) == entry[1]]
+            heapq.heapify(self.heap)
+            self.stale = 0
+
+    def _ascending(self):
+        """
+        Yields live (due, customer_id) entries in due order without popping.
+
+        Walks the heap as a tree with a small frontier heap, so the first k
+        entries cost O(k log n) instead of sorting or scanning everything.
+        """
+        if self._columns is not None:
+            self._build()
+        heap = self.heap
+        live = self.live
+        size = len(heap)
+        if not size:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            entry, index = heapq.heappop(frontier)
+            due, seq, customer_id = entry
+            if live.get(customer_id) == seq:
+                yield due, customer_id
+            child = 2 * index + 1
+            if child < size:
+                heapq.heappush(frontier, (heap[child], child))
+                if child + 1 < size:
+                    heapq.heappush(frontier, (heap[child + 1], child + 1))
+
+    def next_due(self, count: int) -> list:
+        """
+        Returns up to count (due, customer_id) pairs with the earliest due times.
+        """
+        result = []
+        if count <= 0:
+            return result
+        for entry in self._ascending():
+            result.append(entry)
+            if len(result) == count:
+                break
+        return result
+
+    def overdue(self, now: int) -> list:
+        """
+        Returns every (due, customer_id) pair due strictly before now, earliest first.
+        """
+        result = []
+        for entry in self._ascending():
+            if entry[0] >= now:
+                break
+            result.append(entry)
+        return result
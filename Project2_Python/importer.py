@@ -0,0 +1,161 @@
+import argparse
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+from ConsoleUI import RentalUILogic
+from journal import RentalJournal
+from partitions import PartitionStore
+from storage import SQLiteRentalStore
+from sinks import ConsoleSink, NullSink
+
+
+CSV_FIELDS = ["event", "customer_id", "customer_name", "skis", "snowboards",
+              "rental_type", "time", "discount_code", "rental_period"]
+
+ImportStats = namedtuple("ImportStats", ["events", "rentals", "returns", "failed", "seconds"])
+
+
+def read_events(path: str):
+    """
+    Streams events from a CSV or JSONL file one at a time.
+
+    CSV files need a header row using the names in CSV_FIELDS; JSONL files
+    hold one object per line with the same keys. Return events only need
+    event, customer_id and time. JSONL lines are passed on unparsed, so that
+    import_events can count a line that is not valid JSON as a failed event.
+
+    Yields:
+        dict | str: One rental or return event, or one JSONL line.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.lower().endswith(".csv"):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield line
+
+
+def chunked(events, size: int):
+    """
+    Groups an event stream into lists of at most size events.
+    """
+    iterator = iter(events)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_events(logic: RentalUILogic, events, chunk_size: int = 10_000, quiet: bool = True,
+                  output=None, progress=None) -> ImportStats:
+    """
+    Feeds an event stream into new_rental and return_rental chunk by chunk.
+
+    Only one chunk is held in memory at a time, and the journal and database
+    are flushed once per chunk rather than once per event.
+
+    Args:
+        logic (RentalUILogic): Logic with a shop already set.
+        events (Iterable[dict | str]): Events, or JSON lines holding them, for
+            example from read_events.
+        chunk_size (int): Events per chunk.
+        quiet (bool): Skip building summaries and invoices.
+        output (callable, optional): Receives each failure message, and every
+            summary or invoice when not quiet.
+        progress (callable, optional): Called with the running ImportStats after each chunk.
+
+    Returns:
+        ImportStats: Totals for the whole import.
+    """
+    new_rental = logic.new_rental
+    return_rental = logic.return_rental
+    parse_time = datetime.fromisoformat
+    loads = json.loads
+    rentals = returns = failed = processed = 0
+    started = time.perf_counter()
+
+    for chunk in chunked(events, chunk_size):
+        for event in chunk:
+            try:
+                if isinstance(event, str):
+                    event = loads(event)
+                kind = event["event"]
+                if kind == "rental":
+                    result = new_rental(str(event["customer_id"]),
+                                        event.get("customer_name") or "",
+                                        int(event["skis"]), int(event["snowboards"]),
+                                        int(event["rental_type"]), parse_time(event["time"]),
+                                        event.get("discount_code") or "", quiet,
+                                        int(event.get("rental_period") or 1))
+                    ok = result == "" if quiet else result.startswith("Order Summary")
+                    rentals += ok
+                elif kind == "return":
+                    result = return_rental(str(event["customer_id"]), parse_time(event["time"]),
+                                           quiet)
+                    ok = result == "" if quiet else result.startswith("RENTAL RETURN INVOICE")
+                    returns += ok
+                else:
+                    result = f"Unknown event type {kind!r}"
+                    ok = False
+            except (KeyError, TypeError, ValueError) as e:
+                result = f"Malformed event {event!r}: {e}"
+                ok = False
+            failed += not ok
+            if output is not None and (not quiet or not ok):
+                output(result)
+        processed += len(chunk)
+        logic.sync()
+        if progress is not None:
+            progress(ImportStats(processed, rentals, returns, failed,
+                                 time.perf_counter() - started))
+
+    return ImportStats(processed, rentals, returns, failed, time.perf_counter() - started)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Import rental and return events")
+    parser.add_argument("path", help="CSV or JSONL event file")
+    parser.add_argument("--skis", type=int, default=100, help="Skis in a new shop")
+    parser.add_argument("--snowboards", type=int, default=100, help="Snowboards in a new shop")
+    parser.add_argument("--state-dir", help="Journal folder to restore from and write to")
+    parser.add_argument("--db", help="SQLite file to record rental history in")
+    parser.add_argument("--chunk-size", type=int, default=10_000)
+    parser.add_argument("--verbose", action="store_true",
+                        help="Print every summary, invoice and discount message")
+    args = parser.parse_args(argv)
+
+    journal = storage = partitions = None
+    if args.state_dir:
+        journal = RentalJournal(args.state_dir, commit_every=args.chunk_size)
+        partitions = PartitionStore(os.path.join(args.state_dir, "partitions"))
+    if args.db:
+        storage = SQLiteRentalStore(args.db)
+    output = ConsoleSink() if args.verbose else NullSink()
+    logic = RentalUILogic(journal=journal, storage=storage, partitions=partitions,
+                          output=output)
+    if not logic.restore():
+        logic.set_shop(args.skis, args.snowboards)
+
+    def report(stats: ImportStats) -> None:
+        print(f"{stats.events:,} events, {stats.events / max(stats.seconds, 1e-9):,.0f} events/s, "
+              f"{stats.failed:,} failed")
+
+    try:
+        stats = import_events(logic, read_events(args.path), args.chunk_size,
+                              quiet=not args.verbose, output=print, progress=report)
+    finally:
+        logic.close()
+    print(f"Imported {stats.rentals:,} rentals and {stats.returns:,} returns "
+          f"from {stats.events:,} events in {stats.seconds:.2f}s "
+          f"({stats.events / max(stats.seconds, 1e-9):,.0f} events/s); {stats.failed:,} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import os
+import re
+import string
+import threading
+
+
+SUMMARY_TEMPLATE = """Order Summary
+Skis: {skis}
+Snowboards: {snowboards}
+Units: {units}
+Rental Type: {rental_type}
+Started: {started}
+Discount Code: {discount_code}"""
+
+INVOICE_TEMPLATE = """RENTAL RETURN INVOICE
+Customer Name: {name}
+Equipment Rented:
+  Skis: {skis}
+  Snowboards: {snowboards}
+Duration: {days} days, {hours} hours, {minutes} minutes, {seconds} seconds
+Subtotal: ${subtotal:.2f}
+Final Total: ${total:.2f}"""
+
+_SPEC = re.compile(r"[\w.,<>=^+\- #%]*")
+
+
+class InvoiceTemplate:
+    """
+    A str.format-style template compiled once into a function.
+
+    The template is parsed up front and turned into a single f-string, so
+    rendering is one call with keyword arguments and no parsing or list
+    joins per document. Fields must be plain names; format specs are
+    allowed (e.g. {total:.2f}), indexing and attribute access are not.
+    """
+
+    def __init__(self, text: str):
+        """
+        Args:
+            text (str): Template text with {field} and {field:spec} placeholders.
+
+        Raises:
+            ValueError: If a placeholder is not a plain field name with a simple spec.
+        """
+        self.text = text
+        self.fields: list[str] = []
+        namespace = {}
+        pieces = []
+        for literal, field, spec, conversion in string.Formatter().parse(text):
+            if literal:
+                name = f"_literal{len(namespace)}"
+                namespace[name] = literal
+                pieces.append("{" + name + "}")
+            if field is None:
+                continue
+            if not field.isidentifier() or field.startswith("_"):
+                raise ValueError(f"Template field {field!r} must be a plain name.")
+            if not _SPEC.fullmatch(spec or "") or conversion not in (None, "r", "s", "a"):
+                raise ValueError(f"Template field {field!r} has an unsupported format.")
+            if field not in self.fields:
+                self.fields.append(field)
+            pieces.append("{" + field + ("!" + conversion if conversion else "")
+                          + (":" + spec if spec else "") + "}")
+        source = (f"def render(*, {', '.join(self.fields)}):\n"
+                  f"    return f\"{''.join(pieces)}\"\n" if self.fields else
+                  f"def render():\n    return f\"{''.join(pieces)}\"\n")
+        exec(source, namespace)
+        self.render = namespace["render"]
+
+
+SUMMARY = InvoiceTemplate(SUMMARY_TEMPLATE)
+INVOICE = InvoiceTemplate(INVOICE_TEMPLATE)
+
+
+class InvoiceArchive:
+    """
+    Printed documents kept in per-day text files for reprinting.
+
+    Documents are buffered and written in batches of batch_size, so a
+    transaction costs a string encode and a list append. Each business day
+    gets its own files, {day}-000.txt, {day}-001.txt and so on, rotating to
+    the next file once one reaches max_bytes. Every document starts with a
+    "--- kind customer_id ---" header; an index of where each customer's
+    latest document of each kind lives is kept in memory and rebuilt from
+    the files the first time a reprint is asked for after a restart.
+    """
+
+    HEADER = "--- {} {} ---\n"
+
+    def __init__(self, directory: str, batch_size: int = 256, max_bytes: int = 1 << 24):
+        """
+        Args:
+            directory (str): Folder for the archive files.
+            batch_size (int): Documents buffered before they are written.
+            max_bytes (int): Size at which a day moves on to a new file.
+        """
+        self.directory = directory
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.day = None
+        self.path = None
+        self.part = 0
+        self.size = 0
+        self.pending: list[bytes] = []
+        # (customer_id, kind) -> (sequence, path, offset, length)
+        self.index: dict[tuple, tuple] = {}
+        self.sequence = 0
+        self._scanned = False
+        self._lock = threading.Lock()
+
+    def _open_day(self, day: str) -> None:
+        parts = [name for name in os.listdir(self.directory)
+                 if name.startswith(day + "-") and name.endswith(".txt")]
+        self.day = day
+        self.part = max((int(name[len(day) + 1:-4]) for name in parts), default=0)
+        self._set_path()
+
+    def _set_path(self) -> None:
+        self.path = os.path.join(self.directory, f"{self.day}-{self.part:03d}.txt")
+        self.size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _write_pending(self) -> None:
+        if self.pending:
+            with open(self.path, "ab") as file:
+                file.write(b"".join(self.pending))
+            self.pending.clear()
+
+    def add(self, day: str, kind: str, customer_id: str, text: str) -> None:
+        """
+        Archives one document under a business day.
+
+        Args:
+            day (str): ISO business day the document belongs to.
+            kind (str): "rental" or "return".
+            customer_id (str): Customer the document was printed for.
+            text (str): The rendered document.
+        """
+        record = (self.HEADER.format(kind, customer_id) + text + "\n\n").encode("utf-8")
+        with self._lock:
+            if day != self.day:
+                self._write_pending()
+                self._open_day(day)
+            elif self.size and self.size + len(record) > self.max_bytes:
+                self._write_pending()
+                self.part += 1
+                self._set_path()
+            self.sequence += 1
+            self.index[customer_id, kind] = (self.sequence, self.path, self.size, len(record))
+            self.size += len(record)
+            self.pending.append(record)
+            if len(self.pending) >= self.batch_size:
+                self._write_pending()
+
+    def flush(self) -> None:
+        """
+        Writes buffered documents to disk.
+        """
+        with self._lock:
+            self._write_pending()
+
+    def close(self) -> None:
+        self.flush()
+
+    def _scan(self) -> None:
+        """
+        Indexes documents written by earlier runs, oldest file first.
+        """
+        found = {}
+        sequence = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".txt"):
+                continue
+            path = os.path.join(self.directory, name)
+            offset = start = 0
+            key = None
+            with open(path, "rb") as file:
+                for line in file:
+                    if line.startswith(b"--- ") and line.endswith(b" ---\n"):
+                        if key is not None:
+                            found[key] = (sequence, path, start, offset - start)
+                        kind, _, customer_id = line[4:-5].decode("utf-8").partition(" ")
+                        key = (customer_id, kind)
+                        sequence += 1
+                        start = offset
+                    offset += len(line)
+            if key is not None:
+                found[key] = (sequence, path, start, offset - start)
+        # Documents added in this run are newer than anything on disk.
+        for key, (own_sequence, path, offset, length) in self.index.items():
+            found[key] = (sequence + own_sequence, path, offset, length)
+        self.sequence += sequence
+        self.index = found
+        self._scanned = True
+
+    def reprint(self, customer_id: str, kind: str = None):
+        """
+        Returns a customer's most recent archived document, or None.
+
+        Args:
+            customer_id (str): Customer to look up.
+            kind (str, optional): "rental" or "return"; the newer of the two by default.
+        """
+        with self._lock:
+            self._write_pending()
+            if not self._scanned:
+                self._scan()
+            kinds = (kind,) if kind else ("rental", "return")
+            entries = [self.index[customer_id, k] for k in kinds if (customer_id, k) in self.index]
+            if not entries:
+                return None
+            _, path, offset, length = max(entries)
+        with open(path, "rb") as file:
+            file.seek(offset)
+            record = file.read(length).decode("utf-8")
+        return record.split("\n", 1)[1].rstrip("\n")
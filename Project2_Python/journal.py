@@ -0,0 +1,262 @@
+import json
+import os
+import threading
+import time
+
+
+class RentalJournal:
+    """
+    Append-only write-ahead journal of rental events with periodic snapshots.
+
+    Each event is a short JSON array, [seq, op, *fields], on its own line.
+    Events are buffered and written with a single fsync per group commit,
+    either when the group is full or, from a background flusher thread, once
+    its oldest event has waited max_delay seconds. A snapshot captures the
+    whole state and lets the journal be truncated, so recovery only replays
+    the events written after the last snapshot.
+    """
+
+    JOURNAL_FILE = "journal.log"
+    SNAPSHOT_FILE = "snapshot.json"
+    REPLAY_CHUNK_BYTES = 1 << 22
+
+    def __init__(self, directory: str, commit_every: int = 64, max_delay: float = 0.05,
+                 snapshot_every: int = 100_000):
+        """
+        Opens (or creates) a journal directory.
+
+        Args:
+            directory (str): Folder holding the journal and snapshot files.
+            commit_every (int | None): Buffered events that trigger a group commit
+                inside append(). None leaves commits to commit() and the flusher.
+            max_delay (float): Seconds an event may wait in the buffer before a commit.
+            snapshot_every (int): Events after which a snapshot is due.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.commit_every = commit_every
+        self.max_delay = max_delay
+        self.snapshot_every = snapshot_every
+        self.seq = 0
+        self.durable_seq = 0
+        self.events_since_snapshot = 0
+        self._buffer: list[str] = []
+        self._first_buffered = 0.0
+        self._file = None
+        self._flusher = None
+        self._lock = threading.Lock()                   # buffer, file and sequence numbers
+        self._sync_lock = threading.Lock()              # taken before _lock, held over fsync
+        self._wake = threading.Condition(self._lock)
+
+    def load(self):
+        """
+        Reads the last snapshot and the journal tail written after it.
+
+        A torn final line left by a crash is discarded and cut from the file.
+
+        Returns:
+            tuple[dict | None, list[list]]: The snapshot state (or None) and the
+            events to replay on top of it, in order, each as [seq, op, *fields].
+        """
+        snapshot = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+            self.seq = snapshot["seq"]
+
+        events = []
+        if os.path.exists(self.journal_path):
+            valid_bytes = 0
+            with open(self.journal_path, "rb") as file:
+                while True:
+                    lines = file.readlines(self.REPLAY_CHUNK_BYTES)
+                    if not lines:
+                        break
+                    parsed, good_bytes = self._parse_chunk(lines)
+                    events.extend(parsed)
+                    valid_bytes += good_bytes
+                    if len(parsed) != len(lines):
+                        break
+            if valid_bytes != os.path.getsize(self.journal_path):
+                with open(self.journal_path, "r+b") as file:
+                    file.truncate(valid_bytes)
+
+            first_new = 0
+            while first_new < len(events) and events[first_new][0] <= self.seq:
+                first_new += 1
+            if first_new:
+                del events[:first_new]
+            if events:
+                self.seq = events[-1][0]
+        self.events_since_snapshot = len(events)
+        self.durable_seq = self.seq
+        return snapshot, events
+
+    @staticmethod
+    def _parse_chunk(lines: list):
+        """
+        Parses complete journal lines, stopping at the first torn or corrupt one.
+
+        Returns:
+            tuple[list, int]: Parsed events and the number of bytes they occupy.
+        """
+        if lines[-1].endswith(b"\n"):
+            try:
+                # One decoder call for the whole chunk is far cheaper than one per line.
+                return json.loads(b"[" + b",".join(lines) + b"]"), sum(map(len, lines))
+            except ValueError:
+                pass
+
+        parsed = []
+        good_bytes = 0
+        for line in lines:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                parsed.append(json.loads(line))
+            except ValueError:
+                break
+            good_bytes += len(line)
+        return parsed, good_bytes
+
+    def append(self, event: list) -> None:
+        """
+        Buffers an event, committing the group when it is full.
+
+        Args:
+            event (list): [op, *fields]; the journal prepends the sequence number.
+        """
+        with self._lock:
+            self.seq += 1
+            if not self._buffer:
+                self._first_buffered = time.monotonic()
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, daemon=True,
+                                                     name="journal-flusher")
+                    self._flusher.start()
+                self._wake.notify()
+            self._buffer.append(json.dumps([self.seq, *event], separators=(",", ":")))
+            self.events_since_snapshot += 1
+            if self.commit_every is not None and len(self._buffer) >= self.commit_every:
+                self._commit()
+
+    def _flush_loop(self) -> None:
+        """
+        Commits a buffered group once its oldest event is max_delay old, so
+        events are durable on time even if nothing else is appended.
+        Runs until close() replaces the flusher.
+        """
+        me = threading.current_thread()
+        while True:
+            with self._lock:
+                while True:
+                    if self._flusher is not me:
+                        return
+                    if not self._buffer:
+                        self._wake.wait()
+                        continue
+                    remaining = self._first_buffered + self.max_delay - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(remaining)
+            try:
+                self.commit()
+            except OSError:
+                # The events stay buffered; the next append or commit reports the error.
+                time.sleep(self.max_delay)
+
+    def commit(self) -> None:
+        """
+        Makes every event appended so far durable.
+
+        Events are written under the journal lock but the fsync runs outside
+        it, so other threads can keep appending while the disk catches up.
+        """
+        with self._sync_lock:
+            with self._lock:
+                self._write_buffer()
+                target = self.seq
+                file = self._file
+            if file is not None and self.durable_seq < target:
+                os.fsync(file.fileno())
+                self.durable_seq = target
+
+    def _write_buffer(self) -> None:
+        if not self._buffer:
+            return
+        if self._file is None:
+            self._file = open(self.journal_path, "a", encoding="utf-8")
+        self._file.write("\n".join(self._buffer) + "\n")
+        self._file.flush()
+        self._buffer.clear()
+
+    def _commit(self) -> None:
+        """
+        Writes and fsyncs the buffer with the journal lock already held.
+        """
+        if not self._buffer:
+            return
+        self._write_buffer()
+        os.fsync(self._file.fileno())
+        self.durable_seq = self.seq
+
+    def needs_snapshot(self) -> bool:
+        """
+        Returns True when enough events have accumulated to justify a snapshot.
+        """
+        return self.events_since_snapshot >= self.snapshot_every
+
+    def write_snapshot(self, state: dict) -> None:
+        """
+        Atomically replaces the snapshot and truncates the journal.
+
+        Args:
+            state (dict): Full state as of the latest appended event.
+        """
+        with self._sync_lock, self._lock:
+            self._write_snapshot(state)
+
+    def _write_snapshot(self, state: dict) -> None:
+        self._commit()
+        state["seq"] = self.seq
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(state, file, separators=(",", ":"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        # Events up to state["seq"] are now in the snapshot, so the journal can restart empty.
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8")
+        self.events_since_snapshot = 0
+
+    def state_stamp(self) -> list:
+        """
+        Identifies what the journal holds without reading it, from the sizes
+        and modification times of the snapshot and journal files. Any commit
+        or new snapshot changes the stamp.
+        """
+        stamp = []
+        for path in (self.snapshot_path, self.journal_path):
+            try:
+                info = os.stat(path)
+                stamp += [info.st_size, info.st_mtime_ns]
+            except FileNotFoundError:
+                stamp += [0, 0]
+        return stamp
+
+    def close(self) -> None:
+        """
+        Commits pending events, stops the flusher and closes the journal file.
+        """
+        with self._sync_lock, self._lock:
+            self._flusher = None
+            self._wake.notify_all()
+            self._commit()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
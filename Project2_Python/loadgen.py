@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    Returns the value at the given fraction of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+def build_requests(client: int, count: int) -> list:
+    """
+    Builds a client's request stream: rent, estimate, inventory and return for each guest.
+    """
+    start = datetime(2024, 1, 6, 9, 0)
+    requests = []
+    for i in range(count // 4):
+        customer_id = f"{client}-{i}"
+        requests.append({"op": "new_rental", "customer_id": customer_id, "customer_name": "Load",
+                         "skis": 1, "snowboards": 1, "rental_type": 1,
+                         "time": start.isoformat()})
+        requests.append({"op": "estimate", "skis": 1, "snowboards": 1, "rental_type": 2,
+                         "rental_period": 3, "discount_code": ""})
+        requests.append({"op": "inventory"})
+        requests.append({"op": "return_rental", "customer_id": customer_id,
+                         "time": (start + timedelta(hours=2)).isoformat()})
+    for i, request in enumerate(requests):
+        request["id"] = i
+    return requests
+
+
+async def run_client(client: int, count: int, window: int, connect, latencies: list) -> int:
+    """
+    Sends a client's requests with up to window of them in flight.
+
+    Returns:
+        int: Number of error responses.
+    """
+    reader, writer = await connect()
+    requests = build_requests(client, count)
+    sent_at = deque()
+    errors = 0
+    next_request = 0
+    received = 0
+    while received < len(requests):
+        while next_request < len(requests) and len(sent_at) < window:
+            writer.write(json.dumps(requests[next_request]).encode() + b"\n")
+            sent_at.append(time.perf_counter())
+            next_request += 1
+        await writer.drain()
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        latencies.append(time.perf_counter() - sent_at.popleft())
+        if not json.loads(line)["ok"]:
+            errors += 1
+        received += 1
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def run(args) -> None:
+    if args.unix:
+        def connect():
+            return asyncio.open_unix_connection(args.unix)
+    else:
+        def connect():
+            return asyncio.open_connection(args.host, args.port)
+
+    latencies = []
+    started = time.perf_counter()
+    errors = await asyncio.gather(*(run_client(client, args.requests, args.window, connect,
+                                               latencies)
+                                    for client in range(args.clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{len(latencies):,} requests from {args.clients} client(s), window {args.window}")
+    print(f"  throughput: {len(latencies) / elapsed:,.0f} requests/s")
+    print(f"  latency p50: {percentile(latencies, 0.50) * 1000:.2f} ms, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max: {latencies[-1] * 1000:.2f} ms")
+    print(f"  errors: {sum(errors)}")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Connect to this Unix socket path instead of TCP")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent connections")
+    parser.add_argument("--requests", type=int, default=10_000, help="Requests per client")
+    parser.add_argument("--window", type=int, default=32, help="Pipelined requests per client")
+    asyncio.run(run(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
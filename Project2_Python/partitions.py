@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+from collections import namedtuple
+
+from analytics import RentalAnalytics
+
+
+# A sealed range of business days. Daily partitions have first_day == last_day;
+# compaction merges old ones into one partition per month. Days are ISO dates,
+# and analytics is a RentalAnalytics.to_state() dict that must not be modified.
+Partition = namedtuple("Partition", ["first_day", "last_day", "ski_rentals",
+                                     "snowboard_rentals", "revenue", "analytics"])
+
+
+class PartitionStore:
+    """
+    Sealed day partitions, optionally kept on disk one JSON file each.
+
+    The partition list is never changed in place: sealing and compaction
+    build a new tuple and swap it in, so readers can iterate a consistent
+    history without taking the lock.
+    """
+
+    def __init__(self, directory: str = None, keep_days: int = 7):
+        """
+        Args:
+            directory (str, optional): Folder for partition files. Partitions
+                are kept in memory only when omitted.
+            keep_days (int): Most recent daily partitions left uncompacted.
+        """
+        self.directory = directory
+        self.keep_days = keep_days
+        self.partitions: tuple = ()
+        self._lock = threading.Lock()
+        self._compactor = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.partitions = tuple(sorted(self._drop_covered(list(self._load())),
+                                           key=self.span))
+
+    @staticmethod
+    def span(partition: Partition) -> tuple:
+        return partition.first_day, partition.last_day
+
+    def _path(self, partition: Partition) -> str:
+        return os.path.join(self.directory, f"{partition.first_day}_{partition.last_day}.json")
+
+    def _load(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as file:
+                    yield Partition(*json.load(file))
+
+    def _drop_covered(self, partitions: list) -> list:
+        """
+        Removes partitions whose days another partition already covers.
+
+        Compaction writes the merged file before deleting the ones it merged,
+        so a crash in between leaves both on disk; the leftovers are deleted
+        here instead of being counted twice.
+        """
+        kept = []
+        last_covered = ""
+        # By first day, and the widest partition first among those starting together.
+        widest_first = sorted(partitions, key=lambda p: p.last_day, reverse=True)
+        for partition in sorted(widest_first, key=lambda p: p.first_day):
+            if partition.last_day <= last_covered:
+                os.remove(self._path(partition))
+                continue
+            kept.append(partition)
+            last_covered = partition.last_day
+        return kept
+
+    def _write(self, partition: Partition) -> None:
+        path = self._path(partition)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(list(partition), file, separators=(",", ":"))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+    def has_day(self, day: str) -> bool:
+        """
+        Returns True if a partition already covers the given ISO day.
+        """
+        return any(p.first_day <= day <= p.last_day for p in self.partitions)
+
+    def seal(self, partition: Partition) -> None:
+        """
+        Stores a finished day and starts compacting older ones in the background.
+        """
+        with self._lock:
+            if self.directory:
+                self._write(partition)
+            kept = [p for p in self.partitions if self.span(p) != self.span(partition)]
+            self.partitions = tuple(sorted(kept + [partition], key=self.span))
+        self.compact_in_background()
+
+    def compact_in_background(self) -> None:
+        """
+        Starts a compaction thread unless one is already running.
+        """
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def wait(self) -> None:
+        """
+        Blocks until any running compaction has finished.
+        """
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def compact(self) -> int:
+        """
+        Merges partitions older than the newest keep_days days into one per month.
+
+        Returns:
+            int: Number of partitions removed.
+        """
+        history = self.partitions
+        days = sorted({p.last_day for p in history if p.first_day == p.last_day})
+        if len(days) <= self.keep_days:
+            return 0
+        cutoff = days[-self.keep_days] if self.keep_days else "9999-12-31"
+        months: dict[str, list] = {}
+        for partition in history:
+            if partition.last_day < cutoff:
+                months.setdefault(partition.first_day[:7], []).append(partition)
+
+        merged = {}
+        for month, group in months.items():
+            if len(group) > 1:
+                merged[month] = (group, self.merge(group))
+        if not merged:
+            return 0
+
+        with self._lock:
+            # A day sealed again since the merge started makes its month stale;
+            # that month is left for the next compaction.
+            current = {self.span(p): p for p in self.partitions}
+            merged = [(group, partition) for group, partition in merged.values()
+                      if all(current.get(self.span(old)) is old for old in group)]
+            if self.directory:
+                # The merged file replaces its temp file atomically before any
+                # source is removed; a crash in between is undone on the next load.
+                for group, partition in merged:
+                    self._write(partition)
+                    for old in group:
+                        if self._path(old) != self._path(partition):
+                            os.remove(self._path(old))
+            replaced = {self.span(old) for group, _ in merged for old in group}
+            kept = [p for span, p in current.items() if span not in replaced]
+            self.partitions = tuple(sorted(kept + [p for _, p in merged], key=self.span))
+        return len(replaced) - len(merged)
+
+    @staticmethod
+    def merge(partitions: list) -> Partition:
+        """
+        Combines partitions into one covering all their days.
+        """
+        analytics = RentalAnalytics()
+        for partition in partitions:
+            analytics.merge(RentalAnalytics.from_state(partition.analytics))
+        return Partition(min(p.first_day for p in partitions),
+                         max(p.last_day for p in partitions),
+                         sum(p.ski_rentals for p in partitions),
+                         sum(p.snowboard_rentals for p in partitions),
+                         sum(p.revenue for p in partitions),
+                         analytics.to_state())
@@ -0,0 +1,77 @@
+from datetime import datetime
+
+from tariffs import active_tariff
+from discounts import active_registry, apply_discount
+
+
+def price_returns(start_times, return_times, skis, snowboards, rental_types, discount_codes,
+                  tariff=None, registry=None):
+    """
+    Prices a list of returns given as parallel columns.
+
+    Reproduces Rental.calculateRentalCost, familyDiscount, discountCode and
+    finalCost for every record without building Rental or Store objects,
+    using the same compiled tariff and discount registry. It is a plain loop
+    that still prices one record at a time; skipping the objects is what
+    makes it faster, about 1.8x the per-object path on 200,000 records
+    (python benchmarks.py pricing).
+    All arguments are parallel sequences of the same length.
+
+    Args:
+        start_times (Sequence[datetime]): Start time of each rental.
+        return_times (Sequence[datetime]): Return time of each rental.
+        skis (Sequence[int]): Skis rented per record.
+        snowboards (Sequence[int]): Snowboards rented per record.
+        rental_types (Sequence[int]): 1 = Hourly, 2 = Daily, 3 = Weekly.
+        discount_codes (Sequence[str]): Discount code per record ("" for none).
+        tariff (Tariff, optional): Tariff to price with instead of the active one.
+        registry (DiscountRegistry, optional): Discount rules to use instead of
+            the active ones.
+
+    Returns:
+        tuple[list[float], list[float]]: Subtotals before discounts and final totals.
+    """
+    count = len(start_times)
+    if not (len(return_times) == len(skis) == len(snowboards)
+            == len(rental_types) == len(discount_codes) == count):
+        raise ValueError("All columns must have the same length.")
+
+    subtotals = [0.0] * count
+    totals = [0.0] * count
+    if tariff is None:
+        tariff = active_tariff()
+    subtotal_cents = tariff.subtotal_cents
+    family_discount = tariff.family_discount
+    match_code = (active_registry() if registry is None else registry).match
+
+    for i, (start, ret, ski, snow, rtype, code) in enumerate(
+            zip(start_times, return_times, skis, snowboards, rental_types, discount_codes)):
+        period = ret - start
+        try:
+            cents = subtotal_cents(rtype, period.days, period.seconds, ski, snow)
+        except ValueError:
+            raise ValueError(f"Unknown rental type {rtype} at record {i}.") from None
+        subtotals[i] = cents / 100
+        subtotal = cents
+        discounted = family_discount(cents, ski + snow)
+        if discounted >= 0:
+            cents = discounted
+        rule = match_code(code) if code else None
+        if rule is not None:
+            cents = apply_discount(rule, subtotal, cents, discounted >= 0)
+        totals[i] = cents / 100
+
+    return subtotals, totals
+
+
+def price_one(start_time: datetime, return_time: datetime, skis: int, snowboards: int,
+              rental_type: int, discount_code: str = "") -> tuple:
+    """
+    Prices a single return through price_returns.
+
+    Returns:
+        tuple[float, float]: Subtotal before discounts and final total.
+    """
+    subtotals, totals = price_returns([start_time], [return_time], [skis], [snowboards],
+                                      [rental_type], [discount_code])
+    return subtotals[0], totals[0]
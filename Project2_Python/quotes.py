@@ -0,0 +1,71 @@
+import threading
+from collections import OrderedDict
+
+
+class QuoteCache:
+    """
+    Bounded least-recently-used cache of rendered rental estimates.
+
+    Counter threads share one cache, so every operation holds a lock: an
+    eviction between another thread's lookup and its move_to_end would
+    otherwise raise KeyError.
+    """
+
+    def __init__(self, max_size: int = 256):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_size (int): Maximum number of quotes kept before the oldest is evicted.
+        """
+        if max_size <= 0:
+            raise ValueError("Quote cache size must be positive.")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._quotes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns the cached quote for key, or None on a miss.
+        """
+        with self._lock:
+            quote = self._quotes.get(key)
+            if quote is None:
+                self.misses += 1
+                return None
+            self._quotes.move_to_end(key)
+            self.hits += 1
+            return quote
+
+    def put(self, key, quote: str) -> None:
+        """
+        Stores a quote, evicting the least recently used one when full.
+        """
+        with self._lock:
+            self._quotes[key] = quote
+            self._quotes.move_to_end(key)
+            if len(self._quotes) > self.max_size:
+                self._quotes.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Drops every cached quote. Called whenever tariffs change.
+        """
+        with self._lock:
+            self._quotes.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters and the current size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._quotes),
+            "max_size": self.max_size,
+        }
+
+    def __len__(self) -> int:
+        return len(self._quotes)
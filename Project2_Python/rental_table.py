@@ -0,0 +1,314 @@
+import json
+import struct
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+
+EPOCH = datetime.min
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+ActiveRental = namedtuple(
+    "ActiveRental",
+    ["customer_id", "name", "start", "rental_type", "skis", "snowboards", "discount_code", "due",
+     "units"],
+    defaults=((),),
+)
+
+
+def to_micros(moment: datetime) -> int:
+    """
+    Converts a naive datetime to integer microseconds since datetime.min.
+    """
+    return (moment - EPOCH) // ONE_MICROSECOND
+
+
+def from_micros(micros: int) -> datetime:
+    """
+    Converts integer microseconds since datetime.min back to a datetime.
+    """
+    return EPOCH + timedelta(microseconds=micros)
+
+
+class ActiveRentalTable:
+    """
+    Columnar store of open rentals.
+
+    Each column is a parallel typed array indexed by row. Rows are located in
+    O(1) through a customer ID index and removed by moving the last row into
+    the freed slot, so the columns never have holes.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty table.
+
+        Attributes:
+            ids (list[str]): Customer ID per row.
+            names (list[str]): Customer name per row.
+            starts (array): Rental start per row, in microseconds since datetime.min.
+            dues (array): Expected return per row, in microseconds since datetime.min.
+            types (array): Rental type per row (1 = Hourly, 2 = Daily, 3 = Weekly).
+            skis (array): Skis rented per row.
+            snowboards (array): Snowboards rented per row.
+            codes (array): Index into code_values per row.
+            code_values (list[str]): Interned discount codes.
+            units (list[tuple]): Unit numbers handed out per row, skis first.
+        """
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.starts = array("q")
+        self.dues = array("q")
+        self.types = array("b")
+        self.skis = array("l")
+        self.snowboards = array("l")
+        self.codes = array("l")
+        self.code_values: list[str] = [""]
+        self.units: list[tuple] = []
+        self._code_index = {"": 0}
+        self._rows: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, customer_id) -> bool:
+        return customer_id in self._rows
+
+    def __iter__(self):
+        return iter(list(self.ids))
+
+    def _intern_code(self, discount_code: str) -> int:
+        index = self._code_index.get(discount_code)
+        if index is None:
+            index = len(self.code_values)
+            self.code_values.append(discount_code)
+            self._code_index[discount_code] = index
+        return index
+
+    def add(self, customer_id: str, name: str, start: datetime, rental_type: int,
+            skis: int, snowboards: int, discount_code: str = "", due: datetime = None,
+            units: tuple = ()) -> int:
+        """
+        Appends an open rental.
+
+        Args:
+            customer_id (str): Unique customer ID.
+            name (str): Customer's name.
+            start (datetime): Start time of rental.
+            rental_type (int): Rental type.
+            skis (int): Number of skis.
+            snowboards (int): Number of snowboards.
+            discount_code (str, optional): Discount code.
+            due (datetime, optional): Expected return time; defaults to start.
+            units (tuple, optional): Ski units followed by snowboard units.
+
+        Returns:
+            int: Row index of the new rental.
+        """
+        start_micros = to_micros(start)
+        due_micros = start_micros if due is None else to_micros(due)
+        return self.add_row(customer_id, name, start_micros, rental_type,
+                            skis, snowboards, discount_code, due_micros, units)
+
+    def add_row(self, customer_id: str, name: str, start_micros: int, rental_type: int,
+                skis: int, snowboards: int, discount_code: str = "",
+                due_micros: int = None, units: tuple = ()) -> int:
+        """
+        Appends an open rental whose times are already in microseconds since datetime.min.
+
+        Returns:
+            int: Row index of the new rental.
+        """
+        if customer_id in self._rows:
+            raise KeyError(f"Customer {customer_id} already has an open rental.")
+        row = len(self.ids)
+        self.ids.append(customer_id)
+        self.names.append(name)
+        self.starts.append(start_micros)
+        self.dues.append(start_micros if due_micros is None else due_micros)
+        self.types.append(rental_type)
+        self.skis.append(skis)
+        self.snowboards.append(snowboards)
+        self.codes.append(self._intern_code(discount_code))
+        self.units.append(tuple(units))
+        self._rows[customer_id] = row
+        return row
+
+    def get(self, customer_id: str) -> ActiveRental:
+        """
+        Returns the open rental for a customer.
+
+        Raises:
+            KeyError: If the customer has no open rental.
+        """
+        return self._read(self._rows[customer_id])
+
+    def remove(self, customer_id: str) -> ActiveRental:
+        """
+        Removes and returns the open rental for a customer.
+
+        Raises:
+            KeyError: If the customer has no open rental.
+        """
+        row = self._rows[customer_id]
+        record = self._read(row)
+        self._delete(customer_id, row)
+        return record
+
+    def discard(self, customer_id: str) -> tuple:
+        """
+        Removes the open rental for a customer without materializing it.
+
+        Returns:
+            tuple: (start, rental_type, skis, snowboards, discount_code, units) as
+                raw values, with start in microseconds.
+
+        Raises:
+            KeyError: If the customer has no open rental.
+        """
+        row = self._rows[customer_id]
+        values = (self.starts[row], self.types[row], self.skis[row], self.snowboards[row],
+                  self.code_values[self.codes[row]], self.units[row])
+        self._delete(customer_id, row)
+        return values
+
+    def _delete(self, customer_id: str, row: int) -> None:
+        del self._rows[customer_id]
+        last = len(self.ids) - 1
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.names[row] = self.names[last]
+            self.starts[row] = self.starts[last]
+            self.dues[row] = self.dues[last]
+            self.types[row] = self.types[last]
+            self.skis[row] = self.skis[last]
+            self.snowboards[row] = self.snowboards[last]
+            self.codes[row] = self.codes[last]
+            self.units[row] = self.units[last]
+            self._rows[moved_id] = row
+        self.ids.pop()
+        self.names.pop()
+        self.starts.pop()
+        self.dues.pop()
+        self.types.pop()
+        self.skis.pop()
+        self.snowboards.pop()
+        self.codes.pop()
+        self.units.pop()
+
+    def _read(self, row: int) -> ActiveRental:
+        return ActiveRental(
+            self.ids[row],
+            self.names[row],
+            from_micros(self.starts[row]),
+            self.types[row],
+            self.skis[row],
+            self.snowboards[row],
+            self.code_values[self.codes[row]],
+            from_micros(self.dues[row]),
+            self.units[row],
+        )
+
+    def to_columns(self) -> dict:
+        """
+        Returns the table as plain lists, suitable for JSON snapshots.
+        """
+        return {
+            "ids": list(self.ids),
+            "names": list(self.names),
+            "starts": self.starts.tolist(),
+            "dues": self.dues.tolist(),
+            "types": self.types.tolist(),
+            "skis": self.skis.tolist(),
+            "snowboards": self.snowboards.tolist(),
+            "codes": self.codes.tolist(),
+            "code_values": list(self.code_values),
+            "units": [list(units) for units in self.units],
+        }
+
+    @classmethod
+    def from_columns(cls, columns: dict) -> "ActiveRentalTable":
+        """
+        Rebuilds a table from the output of to_columns.
+        """
+        table = cls()
+        table.ids = list(columns["ids"])
+        table.names = list(columns["names"])
+        table.starts = array("q", columns["starts"])
+        table.dues = array("q", columns.get("dues", columns["starts"]))
+        table.types = array("b", columns["types"])
+        table.skis = array("l", columns["skis"])
+        table.snowboards = array("l", columns["snowboards"])
+        table.codes = array("l", columns["codes"])
+        table.code_values = list(columns["code_values"])
+        table.units = [tuple(units) for units in columns.get("units", [()] * len(table.ids))]
+        table._code_index = {code: index for index, code in enumerate(table.code_values)}
+        table._rows = {customer_id: row for row, customer_id in enumerate(table.ids)}
+        return table
+
+    def to_binary(self) -> bytes:
+        """
+        Packs the table into bytes: a length-prefixed JSON header with the
+        string columns and array item sizes, then the raw numeric arrays,
+        the number of units per row and every row's units back to back.
+        """
+        counts = array("l", map(len, self.units))
+        flat = array("q", [unit for units in self.units for unit in units])
+        arrays = (self.starts, self.dues, self.types, self.skis, self.snowboards, self.codes,
+                  counts, flat)
+        header = json.dumps({
+            "itemsizes": [column.itemsize for column in arrays],
+            "ids": self.ids,
+            "names": self.names,
+            "code_values": self.code_values,
+        }, separators=(",", ":")).encode("utf-8")
+        return b"".join([struct.pack("<I", len(header)), header,
+                         *(column.tobytes() for column in arrays)])
+
+    @classmethod
+    def from_binary(cls, data) -> "ActiveRentalTable":
+        """
+        Rebuilds a table from the output of to_binary.
+
+        Raises:
+            ValueError: If the data is truncated or was written on a platform
+                with different array item sizes.
+        """
+        view = memoryview(data)
+        (length,) = struct.unpack_from("<I", view)
+        header = json.loads(bytes(view[4:4 + length]))
+        table = cls()
+        counts = array("l")
+        flat = array("q")
+        arrays = (table.starts, table.dues, table.types, table.skis, table.snowboards, table.codes,
+                  counts, flat)
+        if header["itemsizes"] != [column.itemsize for column in arrays]:
+            raise ValueError("Rental table was written with different array item sizes.")
+        table.ids = header["ids"]
+        table.names = header["names"]
+        count = len(table.ids)
+        offset = 4 + length
+        for column in arrays:
+            end = offset + (count if column is not flat else sum(counts)) * column.itemsize
+            if end > len(view):
+                raise ValueError("Rental table data is truncated.")
+            column.frombytes(view[offset:end])
+            offset = end
+        units = flat.tolist()
+        table.units = []
+        offset = 0
+        for size in counts:
+            table.units.append(tuple(units[offset:offset + size]))
+            offset += size
+        table.code_values = header["code_values"]
+        table._code_index = {code: index for index, code in enumerate(table.code_values)}
+        table._rows = dict(zip(table.ids, range(count)))
+        return table
+
+    def records(self):
+        """
+        Yields every open rental as an ActiveRental.
+        """
+        for row in range(len(self.ids)):
+            yield self._read(row)
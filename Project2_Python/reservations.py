@@ -0,0 +1,317 @@
+import threading
+from datetime import datetime, timedelta
+
+from rental_table import ONE_MICROSECOND, to_micros
+
+
+class CountTree:
+    """
+    Sparse segment tree of committed counts over integer time slots.
+
+    Supports adding a count to a range of slots and asking for the largest
+    total in a range, both in O(log slots). Nodes are only created for ranges
+    that have been booked, so a multi-year horizon costs nothing up front.
+    Each node keeps its own pending addition instead of pushing it down, so
+    neither operation needs to touch children it does not visit.
+    """
+
+    def __init__(self, depth: int):
+        """
+        Args:
+            depth (int): The tree covers slots [0, 2 ** depth).
+        """
+        self.size = 1 << depth
+        self.left = [0]                 # child indexes, 0 means "no child"
+        self.right = [0]
+        self.peak = [0]                 # largest total in the node's range
+        self.added = [0]                # count added to the whole range
+
+    def _new_node(self) -> int:
+        self.left.append(0)
+        self.right.append(0)
+        self.peak.append(0)
+        self.added.append(0)
+        return len(self.peak) - 1
+
+    def add(self, first: int, last: int, count: int) -> None:
+        """
+        Adds count to every slot in [first, last).
+        """
+        if first < last:
+            self._add(0, 0, self.size, first, last, count)
+
+    def _add(self, node: int, low: int, high: int, first: int, last: int, count: int) -> None:
+        if first <= low and high <= last:
+            self.added[node] += count
+            self.peak[node] += count
+            return
+        middle = (low + high) // 2
+        if first < middle:
+            if not self.left[node]:
+                child = self._new_node()
+                self.left[node] = child
+            self._add(self.left[node], low, middle, first, last, count)
+        if last > middle:
+            if not self.right[node]:
+                child = self._new_node()
+                self.right[node] = child
+            self._add(self.right[node], middle, high, first, last, count)
+        left, right = self.left[node], self.right[node]
+        self.peak[node] = self.added[node] + max(self.peak[left] if left else 0,
+                                                 self.peak[right] if right else 0)
+
+    def max(self, first: int, last: int) -> int:
+        """
+        Returns the largest total of any slot in [first, last).
+        """
+        if first >= last:
+            return 0
+        return self._max(0, 0, self.size, first, last)
+
+    def _max(self, node: int, low: int, high: int, first: int, last: int) -> int:
+        if first <= low and high <= last:
+            return self.peak[node]
+        middle = (low + high) // 2
+        best = None
+        if first < middle:
+            left = self.left[node]
+            best = self._max(left, low, middle, first, last) if left else 0
+        if last > middle:
+            right = self.right[node]
+            total = self._max(right, middle, high, first, last) if right else 0
+            best = total if best is None else max(best, total)
+        return self.added[node] + best
+
+
+class DueCounts:
+    """
+    Sparse Fenwick tree of counts keyed by slot.
+
+    Adding to one slot and totalling every slot after a given one both cost
+    O(log slots). Only the tree's cells that have been touched are stored.
+    """
+
+    def __init__(self, depth: int):
+        """
+        Args:
+            depth (int): The tree covers slots [0, 2 ** depth].
+        """
+        self.size = (1 << depth) + 1
+        self.cells: dict[int, int] = {}
+        self.total = 0
+
+    def add(self, slot: int, count: int) -> None:
+        """
+        Adds count to one slot.
+        """
+        self.total += count
+        cells = self.cells
+        index = slot + 1
+        while index <= self.size:
+            cells[index] = cells.get(index, 0) + count
+            index += index & -index
+
+    def after(self, slot: int) -> int:
+        """
+        Returns the total of every slot greater than slot.
+        """
+        cells = self.cells
+        below = 0
+        index = slot + 1                # slots [0, slot] are cells 1 .. slot + 1
+        while index > 0:
+            below += cells.get(index, 0)
+            index -= index & -index
+        return self.total - below
+
+
+class ReservationBook:
+    """
+    Future bookings of skis and snowboards checked against the shop's fleet.
+
+    Bookings are kept in one CountTree per equipment type. Each time window is
+    widened to whole slots, so "can N skis be rented from T1 to T2" is one
+    logarithmic range-max query. Open rentals are tallied in a DueCounts per
+    type by the slot they are due back in, and count against the fleet until
+    then, so bookings and walk-in rentals are checked against each other.
+    """
+
+    SLOT = timedelta(minutes=15)
+    SLOT_MICROS = SLOT // ONE_MICROSECOND
+    DEPTH = 20                          # 2 ** 20 quarter hours is about 30 years
+
+    def __init__(self, ski_capacity: int, snowboard_capacity: int,
+                 origin: datetime = datetime(2020, 1, 1)):
+        """
+        Args:
+            ski_capacity (int): Skis in the fleet.
+            snowboard_capacity (int): Snowboards in the fleet.
+            origin (datetime): Start of the first slot.
+        """
+        self.ski_capacity = ski_capacity
+        self.snowboard_capacity = snowboard_capacity
+        self.origin = origin
+        self.origin_micros = to_micros(origin)
+        self.skis = CountTree(self.DEPTH)
+        self.snowboards = CountTree(self.DEPTH)
+        self.bookings: dict[int, tuple] = {}
+        self.skis_due = DueCounts(self.DEPTH)
+        self.snowboards_due = DueCounts(self.DEPTH)
+        self.next_id = 1
+        self._lock = threading.Lock()
+
+    def slots(self, start: datetime, end: datetime) -> tuple:
+        """
+        Converts a time window to the [first, last) slots that cover it.
+
+        Raises:
+            ValueError: If the window is empty or outside the book's horizon.
+        """
+        if end <= start:
+            raise ValueError("Reservation must end after it starts.")
+        first = (start - self.origin) // self.SLOT
+        last = -((self.origin - end) // self.SLOT)          # ceiling division
+        if first < 0 or last > self.skis.size:
+            raise ValueError("Reservation is outside the bookable horizon.")
+        return first, last
+
+    def is_available(self, skis: int, snowboards: int, start: datetime, end: datetime) -> bool:
+        """
+        Checks whether the equipment is free for the whole window.
+
+        Returns:
+            bool: False also for an empty window or one outside the horizon.
+        """
+        try:
+            first, last = self.slots(start, end)
+        except ValueError:
+            return False
+        with self._lock:
+            return self._fits(skis, snowboards, first, last)
+
+    def _fits(self, skis: int, snowboards: int, first: int, last: int) -> bool:
+        rented_skis, rented_snowboards = self._rented_after(first)
+        return ((skis == 0
+                 or self.skis.max(first, last) + rented_skis + skis <= self.ski_capacity)
+                and (snowboards == 0
+                     or self.snowboards.max(first, last) + rented_snowboards + snowboards
+                     <= self.snowboard_capacity))
+
+    def reserve(self, customer_id: str, skis: int, snowboards: int,
+                start: datetime, end: datetime, now: datetime = None) -> int:
+        """
+        Books equipment for a window if it is free.
+
+        Args:
+            now (datetime, optional): Current time; windows starting before it are refused.
+
+        Returns:
+            int: The reservation ID, or 0 if the equipment is not available.
+
+        Raises:
+            ValueError: If the window is empty, in the past or outside the horizon.
+        """
+        if now is not None and start < now:
+            raise ValueError("Reservation cannot start in the past.")
+        first, last = self.slots(start, end)
+        with self._lock:
+            if not self._fits(skis, snowboards, first, last):
+                return 0
+            reservation_id = self.next_id
+            self._book(reservation_id, customer_id, skis, snowboards, first, last)
+            return reservation_id
+
+    def _book(self, reservation_id: int, customer_id: str, skis: int, snowboards: int,
+              first: int, last: int) -> None:
+        self.skis.add(first, last, skis)
+        self.snowboards.add(first, last, snowboards)
+        self.bookings[reservation_id] = (customer_id, skis, snowboards, first, last)
+        self.next_id = max(self.next_id, reservation_id + 1)
+
+    def restore_booking(self, reservation_id: int, customer_id: str, skis: int,
+                        snowboards: int, first: int, last: int) -> None:
+        """
+        Re-adds a booking from a journal or snapshot without checking capacity.
+        """
+        with self._lock:
+            self._book(reservation_id, customer_id, skis, snowboards, first, last)
+
+    def rental_slots(self, start: int, due: int) -> tuple:
+        """
+        Converts an open rental's start and due time, in microseconds, to the
+        [first, last) slots it covers, clipped to the horizon.
+        """
+        first = max((start - self.origin_micros) // self.SLOT_MICROS, 0)
+        last = min(-((self.origin_micros - due) // self.SLOT_MICROS), self.skis.size)
+        return first, max(first, last)
+
+    def _rented_after(self, first: int) -> tuple:
+        """
+        Totals the open rentals still due back after slot first.
+
+        Every open rental has already started, so the equipment out at any
+        slot from first on is at most this total.
+        """
+        return self.skis_due.after(first), self.snowboards_due.after(first)
+
+    def hold(self, skis: int, snowboards: int, start: int, due: int) -> bool:
+        """
+        Counts a new rental against the fleet until it is due, unless bookings need it.
+
+        Args:
+            start (int): Rental start in microseconds.
+            due (int): Due time in microseconds.
+
+        Returns:
+            bool: True if the rental was counted.
+        """
+        first, last = self.rental_slots(start, due)
+        with self._lock:
+            # The shelf check already covers other rentals; only bookings can refuse this one.
+            if self.bookings and not self._fits(skis, snowboards, first, last):
+                return False
+            self.skis_due.add(last, skis)
+            self.snowboards_due.add(last, snowboards)
+            return True
+
+    def release(self, skis: int, snowboards: int, start: int, due: int) -> None:
+        """
+        Stops counting an open rental that was returned or failed.
+        """
+        _, last = self.rental_slots(start, due)
+        with self._lock:
+            self.skis_due.add(last, -skis)
+            self.snowboards_due.add(last, -snowboards)
+
+    def hold_rentals(self, starts, dues, skis, snowboards) -> None:
+        """
+        Counts every open rental again after a restore, without checking bookings.
+        """
+        with self._lock:
+            rental_slots = self.rental_slots
+            for start, due, ski_count, snowboard_count in zip(starts, dues, skis, snowboards):
+                last = rental_slots(start, due)[1]
+                self.skis_due.add(last, ski_count)
+                self.snowboards_due.add(last, snowboard_count)
+
+    def cancel(self, reservation_id: int) -> bool:
+        """
+        Removes a booking and frees its equipment.
+
+        Returns:
+            bool: True if the reservation existed.
+        """
+        with self._lock:
+            booking = self.bookings.pop(reservation_id, None)
+            if booking is None:
+                return False
+            _, skis, snowboards, first, last = booking
+            self.skis.add(first, last, -skis)
+            self.snowboards.add(first, last, -snowboards)
+            return True
+
+    def window(self, reservation_id: int) -> tuple:
+        """
+        Returns the (start, end) datetimes a booking covers, widened to whole slots.
+        """
+        _, _, _, first, last = self.bookings[reservation_id]
+        return self.origin + first * self.SLOT, self.origin + last * self.SLOT
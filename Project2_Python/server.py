@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+from datetime import datetime
+
+from ConsoleUI import RentalUILogic
+from journal import RentalJournal
+from partitions import PartitionStore
+from invoices import InvoiceArchive
+from sinks import NullSink
+
+
+class RentalServer:
+    """
+    Serves one RentalUILogic to many clients over line-delimited JSON.
+
+    Each request is a JSON object on its own line with an "op" field and an
+    optional "id" that is echoed back. Requests on a connection are answered
+    in order, so clients may pipeline without waiting for replies. With a
+    journal, replies are only sent once the events they caused are on disk.
+
+    Supported ops:
+        new_rental: customer_id, customer_name, skis, snowboards, rental_type,
+            time (ISO 8601, default now), discount_code, rental_period,
+            reservation_id (optional; picks up the customer's booking)
+        return_rental: customer_id, time (ISO 8601, default now)
+        estimate: skis, snowboards, rental_type, rental_period, discount_code
+        inventory: no arguments; shelf counts from the latest published view
+        roll_over_day: no arguments; seals the business day and starts the next
+        stats: no arguments; operation latencies, if the server runs with --metrics
+        reprint: customer_id; the customer's latest summary or invoice, if the
+            server runs with --state-dir
+    """
+
+    def __init__(self, logic: RentalUILogic, max_pipeline: int = 128):
+        """
+        Args:
+            logic (RentalUILogic): Shared rental logic with a shop already set.
+            max_pipeline (int): Requests buffered per connection before the
+                server stops reading from that client.
+        """
+        self.logic = logic
+        self.max_pipeline = max_pipeline
+        self.connections: dict = {}                 # task -> writer of each open connection
+        self.handlers = {
+            "new_rental": self.handle_new_rental,
+            "return_rental": self.handle_return_rental,
+            "estimate": self.handle_estimate,
+            "inventory": self.handle_inventory,
+            "roll_over_day": self.handle_roll_over_day,
+            "stats": self.handle_stats,
+            "reprint": self.handle_reprint,
+        }
+
+    @staticmethod
+    def parse_time(request: dict) -> datetime:
+        value = request.get("time")
+        return datetime.fromisoformat(value) if value else datetime.now()
+
+    def handle_new_rental(self, request: dict) -> str:
+        return self.logic.new_rental(
+            str(request["customer_id"]), request.get("customer_name", ""),
+            int(request["skis"]), int(request["snowboards"]), int(request["rental_type"]),
+            self.parse_time(request), request.get("discount_code", ""),
+            rental_period=int(request.get("rental_period", 1)),
+            reservation_id=(int(request["reservation_id"])
+                            if request.get("reservation_id") is not None else None))
+
+    def handle_return_rental(self, request: dict) -> str:
+        return self.logic.return_rental(str(request["customer_id"]), self.parse_time(request))
+
+    def handle_estimate(self, request: dict) -> str:
+        return self.logic.estimate(
+            int(request["skis"]), int(request["snowboards"]), int(request["rental_type"]),
+            int(request["rental_period"]), request.get("discount_code", ""))
+
+    def handle_inventory(self, request: dict) -> dict:
+        view = self.logic.snapshot()
+        return {"skis": view.skis, "snowboards": view.snowboards, "version": view.version}
+
+    def handle_roll_over_day(self, request: dict) -> dict:
+        partition = self.logic.roll_over_day()
+        self.logic.sync()
+        return {"day": partition.first_day, "skis": partition.ski_rentals,
+                "snowboards": partition.snowboard_rentals, "revenue": partition.revenue,
+                "next_day": self.logic.business_day}
+
+    def handle_stats(self, request: dict) -> dict:
+        metrics = self.logic.metrics
+        return metrics.to_json() if metrics is not None else {}
+
+    def handle_reprint(self, request: dict) -> str:
+        return self.logic.reprint(str(request["customer_id"]))
+
+    def dispatch(self, line: bytes) -> bytes:
+        """
+        Runs one request line and returns the encoded response line.
+        """
+        return json.dumps(self.answer(line), separators=(",", ":")).encode() + b"\n"
+
+    def answer(self, line: bytes) -> dict:
+        """
+        Runs one request line and returns the response object.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            handler = self.handlers.get(request.get("op"))
+            if handler is None:
+                response = {"id": request_id, "ok": False,
+                            "error": f"unknown op {request.get('op')!r}"}
+            else:
+                response = {"id": request_id, "ok": True, "result": handler(request)}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            response = {"id": request_id, "ok": False, "error": f"bad request: {e}"}
+        return response
+
+    async def handle_connection(self, reader: asyncio.StreamReader,
+                                writer: asyncio.StreamWriter) -> None:
+        """
+        Reads pipelined requests and answers them in order.
+
+        The bounded queue between the reader and the responder gives
+        back-pressure: once it is full the server stops reading, so a client
+        that floods requests without reading replies is throttled by TCP.
+        """
+        queue = asyncio.Queue(self.max_pipeline)
+        self.connections[asyncio.current_task()] = writer
+
+        async def respond() -> None:
+            broken = False
+            finished = False
+            while not finished:
+                lines = [await queue.get()]
+                while not queue.empty():
+                    lines.append(queue.get_nowait())
+                if lines[-1] is None:
+                    finished = True
+                    lines.pop()
+                if broken or not lines:
+                    continue                    # Keep draining so the reader never blocks.
+                replies = [self.dispatch(line) for line in lines]
+                try:
+                    # One fsync acknowledges every request handled in this batch.
+                    await self.make_durable()
+                    writer.write(b"".join(replies))
+                    await writer.drain()
+                except ConnectionError:
+                    broken = True
+                    writer.close()
+
+        responder = asyncio.create_task(respond())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await queue.put(line)
+        except ConnectionError:
+            pass
+        finally:
+            await queue.put(None)
+            try:
+                await responder
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+            self.connections.pop(asyncio.current_task(), None)
+
+    async def shutdown(self) -> None:
+        """
+        Closes every client connection and waits for their handlers to answer
+        what they have already read.
+        """
+        tasks = list(self.connections)
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def make_durable(self) -> None:
+        """
+        Waits until every journaled event is on disk, fsyncing in a worker
+        thread so the event loop keeps serving other connections.
+        """
+        journal = self.logic.journal
+        if journal is not None and journal.durable_seq < journal.seq:
+            await asyncio.get_running_loop().run_in_executor(None, journal.commit)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix_path: str = None):
+        """
+        Starts listening on a TCP port or, if unix_path is given, a Unix socket.
+
+        Returns:
+            asyncio.Server: The running server.
+        """
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(args, server_class=RentalServer) -> None:
+    journal = partitions = invoices = None
+    if args.state_dir:
+        # Commits come from make_durable and the flusher, never from the event loop.
+        journal = RentalJournal(args.state_dir, commit_every=None)
+        partitions = PartitionStore(os.path.join(args.state_dir, "partitions"))
+        invoices = InvoiceArchive(os.path.join(args.state_dir, "invoices"))
+    logic = RentalUILogic(journal=journal, partitions=partitions, output=NullSink(),
+                          invoices=invoices)
+    if not logic.restore():
+        logic.set_shop(args.skis, args.snowboards)
+    if args.metrics:
+        logic.enable_metrics()
+    rental_server = server_class(logic, args.pipeline)
+    server = await rental_server.start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Rental service listening on {where}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signal_number, stop.set)
+        except (NotImplementedError, AttributeError):
+            pass                                # Windows: Ctrl+C still ends asyncio.run.
+    try:
+        async with server:
+            await stop.wait()
+            server.close()
+            await rental_server.shutdown()
+    finally:
+        if args.metrics:
+            logic.metrics.write(args.metrics)
+        logic.close()
+
+
+def build_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Returns the command-line options shared by the rental service and the coordinator.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument("--skis", type=int, default=100, help="Skis in a new shop")
+    parser.add_argument("--snowboards", type=int, default=100, help="Snowboards in a new shop")
+    parser.add_argument("--state-dir", help="Journal folder to restore from and write to")
+    parser.add_argument("--pipeline", type=int, default=128,
+                        help="Requests buffered per connection")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="Time operations and write them here on shutdown "
+                             "(.json for JSON, anything else for Prometheus text)")
+    return parser
+
+
+def main(argv=None) -> None:
+    args = build_parser("Headless rental service").parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import sys
+from collections import namedtuple
+
+
+# One message from the rental classes. kind groups messages for filtering:
+# "invalid_request", "insufficient_stock", "discount" or "screen".
+OutputEvent = namedtuple("OutputEvent", ["kind", "message"])
+
+
+class NullSink:
+    """
+    Drops every message. Used by batch imports, the server and benchmarks.
+    """
+
+    def emit(self, kind: str, message: str) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ConsoleSink:
+    """
+    Writes messages to stdout.
+
+    Unbuffered, each message is printed as it arrives, exactly like the
+    print() calls it replaces. Buffered, messages collect until flush(), so
+    a whole screen goes out in one write.
+    """
+
+    def __init__(self, buffered: bool = False, stream=None):
+        """
+        Args:
+            buffered (bool): Hold messages until flush() is called.
+            stream (TextIO, optional): Where to write; sys.stdout at write time by default.
+        """
+        self.buffered = buffered
+        self.stream = stream
+        self._pending: list[str] = []
+
+    def emit(self, kind: str, message: str) -> None:
+        if self.buffered:
+            self._pending.append(message)
+        else:
+            (self.stream or sys.stdout).write(message + "\n")
+
+    def flush(self) -> None:
+        if self._pending:
+            self._pending.append("")
+            (self.stream or sys.stdout).write("\n".join(self._pending))
+            self._pending.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemorySink:
+    """
+    Keeps every message as an OutputEvent, for tests and reports.
+    """
+
+    def __init__(self):
+        self.events: list[OutputEvent] = []
+
+    def emit(self, kind: str, message: str) -> None:
+        self.events.append(OutputEvent(kind, message))
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def messages(self, kind: str = None) -> list:
+        """
+        Returns the message texts, optionally only those of one kind.
+        """
+        return [event.message for event in self.events if kind is None or event.kind == kind]
+
+
+class FileSink:
+    """
+    Appends messages to a text file through a large write buffer.
+
+    Each line is the event kind, a tab and the message, with newlines in
+    the message written as a literal backslash-n.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        self.file = open(path, "a", encoding="utf-8", buffering=buffer_size)
+
+    def emit(self, kind: str, message: str) -> None:
+        message = message.replace("\n", "\\n")
+        self.file.write(f"{kind}\t{message}\n")
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def close(self) -> None:
+        self.file.close()
@@ -0,0 +1,71 @@
+import json
+import os
+import struct
+
+from rental_table import ActiveRentalTable
+
+
+STATE_FILE = "state.bin"
+MAGIC = b"RNTSTATE"
+VERSION = 2                         # 2: open rentals carry their unit numbers.
+
+
+def write_state(path: str, state: dict, rentals: ActiveRentalTable, stamp: list) -> None:
+    """
+    Atomically writes a binary copy of the full state for fast startup.
+
+    The file is the magic bytes, a version and a length-prefixed JSON header
+    holding the stamp and every small part of the state, followed by the
+    open rentals packed by ActiveRentalTable.to_binary.
+
+    Args:
+        path (str): File to write.
+        state (dict): Snapshot state without its "rentals" entry.
+        rentals (ActiveRentalTable): Open rentals.
+        stamp (list): RentalJournal.state_stamp() the state corresponds to.
+    """
+    header = json.dumps({"stamp": stamp, "state": state},
+                        separators=(",", ":")).encode("utf-8")
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC + struct.pack("<HI", VERSION, len(header)))
+        file.write(header)
+        file.write(rentals.to_binary())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_state(path: str, stamp: list):
+    """
+    Reads a state file written by write_state, if it is still current.
+
+    Args:
+        path (str): File to read.
+        stamp (list): The journal's current state_stamp().
+
+    Returns:
+        dict | None: The snapshot state with "rentals" as an ActiveRentalTable,
+        or None if the file is missing, unreadable, from another version or
+        platform, or older than the journal.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    prefix = len(MAGIC) + struct.calcsize("<HI")
+    if len(data) < prefix or not data.startswith(MAGIC):
+        return None
+    version, length = struct.unpack_from("<HI", data, len(MAGIC))
+    if version != VERSION:
+        return None
+    try:
+        header = json.loads(data[prefix:prefix + length])
+        if header["stamp"] != stamp:
+            return None
+        state = header["state"]
+        state["rentals"] = ActiveRentalTable.from_binary(memoryview(data)[prefix + length:])
+    except (ValueError, KeyError, struct.error):
+        return None
+    return state
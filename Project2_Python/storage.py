@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+from rental_table import from_micros, to_micros
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rentals (
+    id INTEGER PRIMARY KEY,
+    customer_id TEXT NOT NULL,
+    customer_name TEXT NOT NULL,
+    rental_type INTEGER NOT NULL,
+    skis INTEGER NOT NULL,
+    snowboards INTEGER NOT NULL,
+    discount_code TEXT NOT NULL,
+    start_time INTEGER NOT NULL,
+    return_time INTEGER,
+    subtotal REAL,
+    final_total REAL
+);
+CREATE INDEX IF NOT EXISTS idx_rentals_customer ON rentals (customer_id);
+CREATE INDEX IF NOT EXISTS idx_rentals_start ON rentals (start_time);
+CREATE INDEX IF NOT EXISTS idx_rentals_return ON rentals (return_time);
+CREATE INDEX IF NOT EXISTS idx_rentals_open ON rentals (rental_type) WHERE return_time IS NULL;
+"""
+
+INSERT_RENTAL = """
+INSERT INTO rentals (customer_id, customer_name, rental_type, skis, snowboards,
+                     discount_code, start_time)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPDATE_RETURN = """
+UPDATE rentals SET return_time = ?, subtotal = ?, final_total = ?
+WHERE customer_id = ? AND return_time IS NULL
+"""
+
+
+class SQLiteRentalStore:
+    """
+    Optional SQLite backend that records rentals, returns and invoice totals.
+
+    Writes are queued and applied in batches inside one transaction. Times are
+    stored as integer microseconds since datetime.min, matching the journal.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        """
+        Opens (or creates) the database and its indexes.
+
+        Args:
+            path (str): Database file, or ":memory:".
+            batch_size (int): Queued writes that trigger a flush.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        # Counter threads share one connection; _lock serializes every use of it.
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._pending: list[tuple] = []
+
+    def record_rental(self, customer_id: str, customer_name: str, rental_type: int,
+                      skis: int, snowboards: int, discount_code: str,
+                      start_time: datetime) -> None:
+        """
+        Queues a new rental row.
+        """
+        with self._lock:
+            self._pending.append((INSERT_RENTAL, (customer_id, customer_name, rental_type, skis,
+                                                  snowboards, discount_code,
+                                                  to_micros(start_time))))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def record_return(self, customer_id: str, return_time: datetime,
+                      subtotal: float, final_total: float) -> None:
+        """
+        Queues the return and invoice totals for a customer's open rental.
+        """
+        with self._lock:
+            self._pending.append((UPDATE_RETURN, (to_micros(return_time), subtotal, final_total,
+                                                  customer_id)))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Applies queued writes in a single transaction.
+
+        Consecutive writes of the same kind go through one executemany call;
+        the original order is kept so a return never precedes its rental.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            with self.connection:
+                start = 0
+                pending = self._pending
+                while start < len(pending):
+                    sql = pending[start][0]
+                    end = start + 1
+                    while end < len(pending) and pending[end][0] is sql:
+                        end += 1
+                    self.connection.executemany(sql,
+                                                [params for _, params in pending[start:end]])
+                    start = end
+            pending.clear()
+
+    def revenue_between(self, start: datetime, end: datetime) -> float:
+        """
+        Returns revenue from rentals returned in [start, end).
+        """
+        with self._lock:
+            self.flush()
+            row = self.connection.execute(
+                "SELECT COALESCE(SUM(final_total), 0) FROM rentals "
+                "WHERE return_time >= ? AND return_time < ?",
+                (to_micros(start), to_micros(end))).fetchone()
+        return row[0]
+
+    def open_rentals(self, rental_type: int = None) -> list:
+        """
+        Returns open rentals, optionally only those of one rental type.
+
+        Returns:
+            list[tuple]: (customer_id, customer_name, rental_type, skis,
+            snowboards, discount_code, start_time) rows, with start_time as a datetime.
+        """
+        sql = ("SELECT customer_id, customer_name, rental_type, skis, snowboards, "
+               "discount_code, start_time FROM rentals WHERE return_time IS NULL")
+        with self._lock:
+            self.flush()
+            if rental_type is None:
+                rows = self.connection.execute(sql).fetchall()
+            else:
+                rows = self.connection.execute(sql + " AND rental_type = ?",
+                                               (rental_type,)).fetchall()
+        return [(*row[:6], from_micros(row[6])) for row in rows]
+
+    def customer_history(self, customer_id: str) -> list:
+        """
+        Returns every rental recorded for a customer, oldest first.
+
+        Returns:
+            list[tuple]: (rental_type, skis, snowboards, start_time, return_time,
+            final_total) rows, with the times as datetimes and return_time None
+            while the rental is open.
+        """
+        with self._lock:
+            self.flush()
+            rows = self.connection.execute(
+                "SELECT rental_type, skis, snowboards, start_time, return_time, final_total "
+                "FROM rentals WHERE customer_id = ? ORDER BY start_time",
+                (customer_id,)).fetchall()
+        return [(rental_type, skis, snowboards, from_micros(started),
+                 None if returned is None else from_micros(returned), total)
+                for rental_type, skis, snowboards, started, returned, total in rows]
+
+    def close(self) -> None:
+        """
+        Flushes queued writes and closes the database.
+        """
+        with self._lock:
+            self.flush()
+            self.connection.close()
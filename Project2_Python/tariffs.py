@@ -0,0 +1,165 @@
+import json
+import os
+
+
+DEFAULT_TARIFF = {
+    "tiers": [
+        {"type": 1, "name": "Hourly", "unit_seconds": 3600, "measure": "seconds",
+         "skis": 1500, "snowboards": 1000, "escalate_at": 4, "escalate_to": 2, "bonus_days": 1},
+        {"type": 2, "name": "Daily", "unit_seconds": 86400, "measure": "days",
+         "skis": 5000, "snowboards": 4000, "escalate_at": 4, "escalate_to": 3, "bonus_days": 7},
+        {"type": 3, "name": "Weekly", "unit_seconds": 604800, "measure": "days",
+         "skis": 20000, "snowboards": 16000},
+    ],
+    "family_discount": {"min_items": 3, "max_items": 5, "percent": 25},
+}
+
+TARIFF_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tariffs.json")
+
+
+def round_cents(numerator: int, denominator: int) -> int:
+    """
+    Divides and rounds half up, keeping the arithmetic in integers.
+    """
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+class Tariff:
+    """
+    Rental prices compiled from a tariff table into flat lookups by rental type.
+
+    Every amount is in integer cents. A tier is charged per unit of its
+    measure: "seconds" counts the hours-minutes-seconds part of the rental
+    period, "days" counts whole days. When a rental reaches a tier's
+    escalate_at units it moves to escalate_to and gains bonus_days, which is
+    how a long hourly rental becomes a daily one and a long daily rental a
+    weekly one. Estimates and final costs go through the same charge().
+    """
+
+    def __init__(self, table: dict):
+        """
+        Args:
+            table (dict): Tariff table in the layout of DEFAULT_TARIFF.
+
+        Raises:
+            ValueError: If a tier is malformed or escalates to an unknown type.
+        """
+        self.table = table
+        self.types = frozenset(tier["type"] for tier in table["tiers"])
+        self.names: dict[int, str] = {}
+        # type -> (ski rate, snowboard rate, measured in seconds?, units divisor,
+        #          escalate_at, escalate_to or 0, bonus_days, units per next-tier unit)
+        self.tiers: dict[int, tuple] = {}
+        unit_seconds = {tier["type"]: tier["unit_seconds"] for tier in table["tiers"]}
+        for tier in table["tiers"]:
+            rental_type = tier["type"]
+            if tier["measure"] not in ("seconds", "days"):
+                raise ValueError(f"Tier {rental_type} has unknown measure {tier['measure']!r}.")
+            by_seconds = tier["measure"] == "seconds"
+            escalate_to = tier.get("escalate_to") or 0
+            if escalate_to and escalate_to not in self.types:
+                raise ValueError(f"Tier {rental_type} escalates to unknown type {escalate_to}.")
+            self.names[rental_type] = tier["name"]
+            self.tiers[rental_type] = (
+                int(tier["skis"]), int(tier["snowboards"]), by_seconds,
+                tier["unit_seconds"] if by_seconds else tier["unit_seconds"] // 86400,
+                tier.get("escalate_at", 0), escalate_to, tier.get("bonus_days", 0),
+                unit_seconds[escalate_to] // tier["unit_seconds"] if escalate_to else 1)
+
+        family = table["family_discount"]
+        self.family_min = family["min_items"]
+        self.family_max = family["max_items"]
+        self.family_percent = family["percent"]
+        self.family_keep = 100 - family["percent"]
+
+    @staticmethod
+    def charge(tier: tuple, units: int, per: int, skis: int, snowboards: int) -> int:
+        """
+        Prices units / per units of a tier, in cents. This is the one place
+        rates are applied.
+        """
+        return round_cents(units * (tier[0] * skis + tier[1] * snowboards), per)
+
+    def subtotal_cents(self, rental_type: int, days: int, seconds: int,
+                       skis: int, snowboards: int) -> int:
+        """
+        Prices a finished rental from its period, split like a timedelta.
+
+        Raises:
+            ValueError: If rental_type is not in the table.
+        """
+        tiers = self.tiers
+        tier = tiers.get(rental_type)
+        if tier is None:
+            raise ValueError(f"Unknown rental type {rental_type}.")
+        while tier[5]:
+            if round((seconds if tier[2] else days) / tier[3]) < tier[4]:
+                break
+            days += tier[6]
+            tier = tiers[tier[5]]
+        units = seconds if tier[2] else days
+        per = tier[3]
+        if units < per:                                     # At least one unit is charged.
+            units = per = 1
+        return self.charge(tier, units, per, skis, snowboards)
+
+    def estimate_cents(self, rental_type: int, period: int, skis: int, snowboards: int) -> int:
+        """
+        Prices a planned rental of period units of its tier, in cents.
+
+        Returns:
+            int: The estimate, or 0 if rental_type is not in the table.
+        """
+        tiers = self.tiers
+        tier = tiers.get(rental_type)
+        if tier is None:
+            return 0
+        while tier[5] and period >= tier[4]:
+            period = (period - tier[4]) // tier[7] + 1
+            tier = tiers[tier[5]]
+        return self.charge(tier, period, 1, skis, snowboards)
+
+    def family_discount(self, cents: int, items: int) -> int:
+        """
+        Returns cents after the family discount, or -1 if it does not apply.
+        """
+        if self.family_min <= items <= self.family_max:
+            return round_cents(cents * self.family_keep, 100)
+        return -1
+
+
+def load_tariff(path: str = None) -> Tariff:
+    """
+    Compiles a tariff table from a JSON file.
+
+    Args:
+        path (str, optional): File to read. Defaults to the RENTAL_TARIFFS
+            environment variable, then tariffs.json next to this module, then
+            DEFAULT_TARIFF if neither exists.
+    """
+    path = path or os.environ.get("RENTAL_TARIFFS") or TARIFF_FILE
+    if not os.path.exists(path):
+        return Tariff(DEFAULT_TARIFF)
+    with open(path, "r", encoding="utf-8") as file:
+        return Tariff(json.load(file))
+
+
+_active = None
+
+
+def active_tariff() -> Tariff:
+    """
+    Returns the tariff used by Rental, loading it on first use.
+    """
+    global _active
+    if _active is None:
+        _active = load_tariff()
+    return _active
+
+
+def set_tariff(tariff: Tariff) -> None:
+    """
+    Replaces the tariff used by Rental. Cached estimates must be cleared separately.
+    """
+    global _active
+    _active = tariff
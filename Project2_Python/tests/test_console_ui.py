@@ -0,0 +1,127 @@
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ConsoleUI import RentalUI                                      # noqa: E402
+
+
+class ScriptedRentalUI(RentalUI):
+    """
+    RentalUI that skips clearing the screen, for driving it from a script.
+    """
+
+    def clear_console(self) -> None:
+        pass
+
+
+def rental(name: str, customer_id: int, skis: int, snowboards: int, rental_type: int,
+           period: int, when: str) -> list:
+    """
+    Console input for one completed rental, estimate skipped.
+    """
+    return ["1", name, str(customer_id), str(skis), str(snowboards), str(rental_type),
+            str(period), "", "n", "y", when, ""]
+
+
+def rental_return(customer_id: int, when: str) -> list:
+    return ["2", str(customer_id), when, ""]
+
+
+def run_session(lines: list, state_dir: str = None) -> tuple:
+    """
+    Feeds lines to a new RentalUI until it exits.
+
+    Returns:
+        tuple[RentalUI, str]: The UI after the session and everything it printed.
+    """
+    stdin = io.StringIO("\n".join(lines) + "\n")
+    stdout = io.StringIO()
+    with mock.patch("sys.stdin", stdin), redirect_stdout(stdout):
+        ui = ScriptedRentalUI(debug=True, state_dir=state_dir)
+        try:
+            ui.main_menu()
+        except SystemExit:
+            pass
+    return ui, stdout.getvalue()
+
+
+class RentalUITest(unittest.TestCase):
+
+    def test_rentals_and_returns_update_inventory_and_counters(self):
+        lines = ["10", "10"]
+        lines += rental("Ann", 1, 3, 2, 2, 2, "1:6:2024:09:00")
+        lines += ["1", "Bob", "2", "8", "0", ""]                 # more skis than are left
+        lines += rental("Bob", 2, 2, 0, 1, 3, "1:6:2024:10:00")
+        lines += rental_return(1, "1:7:2024:10:30")
+        lines += ["3", ""]
+        lines += ["x", ""]
+        lines += ["7"]
+
+        ui, output = run_session(lines)
+        logic = ui.logic
+
+        self.assertEqual(logic.get_current_skis(), 8)
+        self.assertEqual(logic.get_current_snowboards(), 10)
+        self.assertEqual(list(logic.customer_rentals), ["2"])
+        self.assertEqual((logic.daily_ski_rentals, logic.daily_snowboard_rentals), (5, 2))
+        self.assertEqual(output.count("Order Summary"), 2)
+        self.assertEqual(output.count("RENTAL RETURN INVOICE"), 1)
+        self.assertIn("Inventory is not sufficient.", output)
+        self.assertIn("Invalid choice. Please try again.", output)
+        self.assertIn("Skis: 8\nSnowboards: 10", output)
+        self.assertGreater(logic.revenu, 0)
+        self.assertEqual(logic.revenu, logic.shop.dblTotalTransaction)
+
+    def test_returning_unknown_customer_changes_nothing(self):
+        lines = ["5", "5"]
+        lines += rental("Ann", 1, 1, 1, 2, 1, "1:6:2024:09:00")
+        lines += rental_return(2, "1:6:2024:12:00")
+        lines += ["7"]
+
+        ui, output = run_session(lines)
+
+        self.assertIn("Such ID does not exist", output)
+        self.assertEqual((ui.logic.get_current_skis(), ui.logic.get_current_snowboards()),
+                         (4, 4))
+        self.assertEqual(ui.logic.revenu, 0)
+
+    def test_long_session_does_not_grow_the_stack(self):
+        transactions = sys.getrecursionlimit() + 200
+        lines = ["100", "100"]
+        for i in range(transactions // 2):
+            lines += rental("Guest", i + 1, 1, 1, 1, 2, "1:6:2024:09:00")
+            lines += rental_return(i + 1, "1:6:2024:10:30")
+        lines += ["7"]
+
+        ui, output = run_session(lines)
+
+        self.assertEqual(output.count("RENTAL RETURN INVOICE"), transactions // 2)
+        self.assertEqual(len(ui.logic.customer_rentals), 0)
+        self.assertEqual(ui.logic.get_current_skis(), 100)
+        self.assertEqual(ui.logic.daily_ski_rentals, transactions // 2)
+
+    def test_session_is_restored_from_its_state_dir(self):
+        with tempfile.TemporaryDirectory() as state_dir:
+            lines = ["6", "4"]
+            lines += rental("Ann", 1, 2, 1, 2, 1, "1:6:2024:09:00")
+            lines += rental("Bob", 2, 1, 1, 3, 1, "1:6:2024:09:30")
+            lines += rental_return(1, "1:7:2024:09:00")
+            lines += ["7"]
+            first, _ = run_session(lines, state_dir)
+
+            second, output = run_session(["3", "", "7"], state_dir)
+
+        self.assertIn("Skis: 5\nSnowboards: 3", output)
+        self.assertEqual(list(second.logic.customer_rentals), ["2"])
+        self.assertEqual(second.logic.revenu, first.logic.revenu)
+        self.assertEqual(second.logic.daily_ski_rentals, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,230 @@
+import base64
+from array import array
+from collections import deque
+
+
+# Unit states, one byte per unit.
+UNUSED, FREE, OUT, RETIRED, RETIRING = range(5)
+STATE_NAMES = ("on the shelf", "on the shelf", "rented out", "retired", "retired on return")
+
+
+class UnitPool:
+    """
+    Serial-numbered units of one kind of equipment, numbered 0 to size - 1.
+
+    Units go out in first-in, first-out order so wear spreads over the
+    fleet: units that have never left the shop first, in serial order, then
+    returned units in the order they came back. Taking or returning N units
+    costs O(N) whatever the fleet size.
+
+    A byte per unit records its state and a counter per unit records how
+    many rentals it has gone out on since its last service. Both arrays only
+    grow as far as the highest unit that has been used, so a large fleet
+    costs nothing until its units move. Queue entries carry a ticket and are
+    skipped when the unit has since been taken, retired or queued again.
+    """
+
+    def __init__(self, size: int, prefix: str = ""):
+        """
+        Args:
+            size (int): Units in the fleet.
+            prefix (str): Serial number prefix, e.g. "SKI-".
+        """
+        self.size = size
+        self.prefix = prefix
+        self.available = size
+        self.fresh = 0                      # Units from here on may never have left the shop.
+        self.states = bytearray()
+        self.uses = array("q")
+        self.tickets = array("q")
+        self.queue = deque()                # (unit, ticket) of returned units, oldest first.
+        self._ticket = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def serial(self, unit: int) -> str:
+        return f"{self.prefix}{unit:06d}"
+
+    def state(self, unit: int) -> int:
+        if not 0 <= unit < self.size:
+            raise ValueError(f"No unit {self.serial(unit)} in a fleet of {self.size}.")
+        return self.states[unit] if unit < len(self.states) else UNUSED
+
+    def _grow(self, unit: int) -> None:
+        length = len(self.states)
+        if unit >= length:
+            extra = min(max(unit + 1 - length, length, 1024), self.size - length)
+            self.states.extend(bytes(extra))
+            self.uses.extend(array("q", bytes(8 * extra)))
+            self.tickets.extend(array("q", bytes(8 * extra)))
+
+    def _enqueue(self, unit: int) -> None:
+        self.states[unit] = FREE
+        self._ticket += 1
+        self.tickets[unit] = self._ticket
+        self.queue.append((unit, self._ticket))
+
+    def allocate(self, count: int):
+        """
+        Takes count units off the shelf.
+
+        Returns:
+            list[int] | None: The units, or None if fewer than count are available.
+        """
+        if count > self.available:
+            return None
+        units = []
+        states = self.states
+        while len(units) < count and self.fresh < self.size:
+            unit = self.fresh
+            self.fresh += 1
+            if unit >= len(states):
+                self._grow(unit)
+                states = self.states
+            if states[unit] == UNUSED:
+                units.append(unit)
+        queue = self.queue
+        tickets = self.tickets
+        while len(units) < count:
+            unit, ticket = queue.popleft()
+            if states[unit] == FREE and tickets[unit] == ticket:
+                units.append(unit)
+        uses = self.uses
+        for unit in units:
+            states[unit] = OUT
+            uses[unit] += 1
+        self.available -= count
+        return units
+
+    def take(self, units) -> None:
+        """
+        Marks specific units as rented out, e.g. when replaying a journal.
+
+        Raises:
+            ValueError: If a unit is not on the shelf.
+        """
+        for unit in units:
+            if self.state(unit) not in (UNUSED, FREE):
+                raise ValueError(f"Unit {self.serial(unit)} is {STATE_NAMES[self.state(unit)]}.")
+            self._grow(unit)
+            self.states[unit] = OUT
+            self.uses[unit] += 1
+        self.available -= len(units)
+
+    def release(self, units) -> int:
+        """
+        Puts returned units back on the shelf, or retires those marked for it.
+
+        Returns:
+            int: Units that became available.
+        """
+        states = self.states
+        shelved = 0
+        for unit in units:
+            if states[unit] == RETIRING:
+                states[unit] = RETIRED
+            else:
+                self._enqueue(unit)
+                shelved += 1
+        self.available += shelved
+        return shelved
+
+    def retire(self, unit: int) -> bool:
+        """
+        Takes a unit out of the fleet for good; a rented unit is retired when it comes back.
+
+        Returns:
+            bool: True if the unit was on the shelf.
+
+        Raises:
+            ValueError: If the unit does not exist or is already retired.
+        """
+        state = self.state(unit)
+        if state in (RETIRED, RETIRING):
+            raise ValueError(f"Unit {self.serial(unit)} is already retired.")
+        self._grow(unit)
+        if state == OUT:
+            self.states[unit] = RETIRING
+            return False
+        self.states[unit] = RETIRED
+        self.available -= 1
+        return True
+
+    def reinstate(self, unit: int) -> bool:
+        """
+        Brings a retired unit back into the fleet.
+
+        Returns:
+            bool: True if the unit went back on the shelf (False if it is still rented out).
+
+        Raises:
+            ValueError: If the unit is not retired.
+        """
+        state = self.state(unit)
+        if state == RETIRING:
+            self.states[unit] = OUT
+            return False
+        if state != RETIRED:
+            raise ValueError(f"Unit {self.serial(unit)} is not retired.")
+        self._enqueue(unit)
+        self.available += 1
+        return True
+
+    def service(self, unit: int) -> None:
+        """
+        Resets a unit's usage counter after maintenance.
+        """
+        self.state(unit)
+        if unit < len(self.uses):
+            self.uses[unit] = 0
+
+    def usage(self, unit: int) -> int:
+        self.state(unit)
+        return self.uses[unit] if unit < len(self.uses) else 0
+
+    def needs_service(self, limit: int) -> list:
+        """
+        Returns the units that have gone out at least limit times since their last service.
+        """
+        return [unit for unit, used in enumerate(self.uses)
+                if used >= limit and self.states[unit] not in (RETIRED, RETIRING)]
+
+    def count(self, state: int) -> int:
+        """
+        Counts the units in one state; UNUSED and FREE together are "on the shelf".
+        """
+        if state in (UNUSED, FREE):
+            return self.available
+        return self.states.count(state)
+
+    def to_state(self) -> dict:
+        """
+        Returns the pool as JSON-friendly values, with the byte arrays base64 encoded.
+        """
+        queued = array("q", (unit for unit, ticket in self.queue
+                             if self.states[unit] == FREE and self.tickets[unit] == ticket))
+        return {
+            "size": self.size,
+            "prefix": self.prefix,
+            "fresh": self.fresh,
+            "states": base64.b64encode(self.states).decode("ascii"),
+            "uses": base64.b64encode(self.uses.tobytes()).decode("ascii"),
+            "queue": base64.b64encode(queued.tobytes()).decode("ascii"),
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "UnitPool":
+        """
+        Rebuilds a pool from the output of to_state.
+        """
+        pool = cls(state["size"], state["prefix"])
+        pool.fresh = state["fresh"]
+        pool.states = bytearray(base64.b64decode(state["states"]))
+        pool.uses = array("q", base64.b64decode(state["uses"]))
+        pool.tickets = array("q", bytes(8 * len(pool.states)))
+        for unit in array("q", base64.b64decode(state["queue"])):
+            pool._enqueue(unit)
+        unused = pool.size - len(pool.states) + pool.states.count(UNUSED)
+        pool.available = unused + pool.states.count(FREE)
+        return pool